@@ -1,16 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
-from .database import get_db
+from .database import get_async_db
 from .auth import get_current_user
 from .models.user import User
-from .models.achievement import Achievement
 from .models.user_achievement import UserAchievement
-from .services.achievement_service import AchievementService
+from .services.achievement_catalog import CatalogEntry, achievement_catalog
+from .services.achievement_summary import achievement_summaries, etag_matches, unlocked_query
 from .utils.achievement_utils import calculate_progress_percentage
 
 router = APIRouter(prefix="/achievements", tags=["成就"])
@@ -46,51 +46,61 @@ class UserAchievementSummary(BaseModel):
     completion_rate: float
     recent_unlocked: List[UserAchievementResponse]
 
+def build_user_achievement(achievement: CatalogEntry, user_achievement) -> UserAchievementResponse:
+    """由成就定义和用户进度构建响应，用户没有该成就的记录时进度为0"""
+    if not user_achievement:
+        progress = 0
+        is_unlocked = False
+        unlocked_at = None
+    else:
+        progress = user_achievement.current_progress
+        is_unlocked = user_achievement.is_unlocked
+        unlocked_at = user_achievement.unlocked_at
+    
+    return UserAchievementResponse(
+        achievement=achievement,
+        current_progress=progress,
+        is_unlocked=is_unlocked,
+        unlocked_at=unlocked_at,
+        progress_percentage=calculate_progress_percentage(progress, achievement.target_value)
+    )
+
+# 成就定义来自进程内成就目录，每个请求只查询一次 user_achievements
+
 # 获取当前用户的成就摘要
 @router.get("/summary", response_model=UserAchievementSummary)
 async def get_user_achievement_summary(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取当前用户的成就摘要信息，包括总成就数、已解锁成就数、完成率和最近解锁的成就
+    
+    摘要按用户缓存，支持 If-None-Match 条件请求（未变化时返回304）
     """
     try:
-        # 获取总成就数
-        total_achievements = db.query(Achievement).count()
+        await achievement_catalog.ensure_fresh()
         
-        # 获取已解锁成就数
-        unlocked_achievements = db.query(UserAchievement).filter(
-            and_(
-                UserAchievement.user_id == current_user.id,
-                UserAchievement.is_unlocked == True
-            )
-        ).count()
+        # 已解锁的成就数量不超过成就总数，缓存未命中时一次查询全部取出
+        summary = await achievement_summaries.get(db, current_user.id)
+        headers = {"ETag": summary.etag(achievement_catalog), "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        
+        unlocked = [(achievement_catalog.get(ua.achievement_id), ua) for ua in summary.unlocked]
+        unlocked = [(achievement, ua) for achievement, ua in unlocked if achievement]
+        
+        total_achievements = len(achievement_catalog)
+        unlocked_achievements = len(unlocked)
         
         # 计算完成率
         completion_rate = (unlocked_achievements / total_achievements * 100) if total_achievements > 0 else 0
         
-        # 获取最近解锁的成就（最多5个）
-        recent_user_achievements = db.query(UserAchievement).filter(
-            and_(
-                UserAchievement.user_id == current_user.id,
-                UserAchievement.is_unlocked == True
-            )
-        ).order_by(UserAchievement.unlocked_at.desc()).limit(5).all()
-        
-        # 构建最近解锁的成就响应
-        recent_unlocked = []
-        for ua in recent_user_achievements:
-            achievement = db.query(Achievement).filter(Achievement.id == ua.achievement_id).first()
-            if achievement:
-                progress_percentage = calculate_progress_percentage(ua.current_progress, achievement.target_value)
-                recent_unlocked.append(UserAchievementResponse(
-                    achievement=achievement,
-                    current_progress=ua.current_progress,
-                    is_unlocked=ua.is_unlocked,
-                    unlocked_at=ua.unlocked_at,
-                    progress_percentage=progress_percentage
-                ))
+        # 最近解锁的成就（最多5个）
+        recent_unlocked = [build_user_achievement(achievement, ua) for achievement, ua in unlocked[:5]]
         
         return UserAchievementSummary(
             total_achievements=total_achievements,
@@ -109,7 +119,7 @@ async def get_user_achievement_summary(
 async def get_user_unlocked_achievements(
     game_type: Optional[str] = Query(None, description="游戏类型，为空表示所有游戏"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取当前用户已解锁的所有成就
@@ -117,34 +127,18 @@ async def get_user_unlocked_achievements(
     - **game_type**: 可选的游戏类型筛选
     """
     try:
-        # 构建查询
-        query = db.query(UserAchievement).join(Achievement).filter(
-            and_(
-                UserAchievement.user_id == current_user.id,
-                UserAchievement.is_unlocked == True
-            )
-        )
-        
-        # 如果指定了游戏类型，则添加筛选条件
-        if game_type:
-            query = query.filter(Achievement.game_type == game_type)
+        await achievement_catalog.ensure_fresh()
         
         # 按解锁时间倒序排列
-        user_achievements = query.order_by(UserAchievement.unlocked_at.desc()).all()
+        user_achievements = (await db.execute(unlocked_query(current_user.id))).scalars().all()
         
         # 构建响应
         result = []
         for ua in user_achievements:
-            achievement = db.query(Achievement).filter(Achievement.id == ua.achievement_id).first()
-            if achievement:
-                progress_percentage = calculate_progress_percentage(ua.current_progress, achievement.target_value)
-                result.append(UserAchievementResponse(
-                    achievement=achievement,
-                    current_progress=ua.current_progress,
-                    is_unlocked=ua.is_unlocked,
-                    unlocked_at=ua.unlocked_at,
-                    progress_percentage=progress_percentage
-                ))
+            achievement = achievement_catalog.get(ua.achievement_id)
+            # 如果指定了游戏类型，则只返回该游戏的成就
+            if achievement and (not game_type or achievement.game_type == game_type):
+                result.append(build_user_achievement(achievement, ua))
         
         return result
     except Exception as e:
@@ -159,7 +153,7 @@ async def get_user_all_achievements(
     game_type: Optional[str] = Query(None, description="游戏类型，为空表示所有游戏"),
     achievement_type: Optional[str] = Query(None, description="成就类型"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取当前用户的所有成就，包括已解锁和未解锁的，显示每个成就的进度
@@ -168,50 +162,18 @@ async def get_user_all_achievements(
     - **achievement_type**: 可选的成就类型筛选
     """
     try:
-        # 构建成就查询
-        achievement_query = db.query(Achievement)
-        
-        # 如果指定了游戏类型，则添加筛选条件
-        if game_type:
-            achievement_query = achievement_query.filter(Achievement.game_type == game_type)
-        
-        # 如果指定了成就类型，则添加筛选条件
-        if achievement_type:
-            achievement_query = achievement_query.filter(Achievement.achievement_type == achievement_type)
+        await achievement_catalog.ensure_fresh()
         
         # 获取所有符合条件的成就
-        achievements = achievement_query.all()
+        achievements = achievement_catalog.achievements(game_type or None, achievement_type or None)
         
-        # 构建响应
-        result = []
-        for achievement in achievements:
-            # 查询用户的该成就进度
-            user_achievement = db.query(UserAchievement).filter(
-                and_(
-                    UserAchievement.user_id == current_user.id,
-                    UserAchievement.achievement_id == achievement.id
-                )
-            ).first()
-            
-            # 如果用户没有该成就的记录，则创建一个默认记录
-            if not user_achievement:
-                progress = 0
-                is_unlocked = False
-                unlocked_at = None
-            else:
-                progress = user_achievement.current_progress
-                is_unlocked = user_achievement.is_unlocked
-                unlocked_at = user_achievement.unlocked_at
-            
-            progress_percentage = calculate_progress_percentage(progress, achievement.target_value)
-            
-            result.append(UserAchievementResponse(
-                achievement=achievement,
-                current_progress=progress,
-                is_unlocked=is_unlocked,
-                unlocked_at=unlocked_at,
-                progress_percentage=progress_percentage
-            ))
+        # 一次查询取出用户的全部成就进度，在内存中与成就定义做外连接
+        user_achievements = (await db.execute(
+            select(UserAchievement).where(UserAchievement.user_id == current_user.id)
+        )).scalars().all()
+        progress = {ua.achievement_id: ua for ua in user_achievements}
+        
+        result = [build_user_achievement(achievement, progress.get(achievement.id)) for achievement in achievements]
         
         # 按已解锁状态和进度百分比排序（已解锁的在前，未解锁的按进度倒序）
         result.sort(key=lambda x: (0 if x.is_unlocked else 1, -x.progress_percentage))
@@ -228,14 +190,16 @@ async def get_user_all_achievements(
 async def get_achievement_detail(
     achievement_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取指定成就的详细信息和当前用户的进度
     """
     try:
+        await achievement_catalog.ensure_fresh()
+        
         # 查询成就
-        achievement = db.query(Achievement).filter(Achievement.id == achievement_id).first()
+        achievement = achievement_catalog.get(achievement_id)
         if not achievement:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -243,36 +207,13 @@ async def get_achievement_detail(
             )
         
         # 查询用户的该成就进度
-        user_achievement = db.query(UserAchievement).filter(
-            and_(
-                UserAchievement.user_id == current_user.id,
-                UserAchievement.achievement_id == achievement_id
-            )
-        ).first()
-        
-        # 如果用户没有该成就的记录，则创建一个默认记录
-        if not user_achievement:
-            progress = 0
-            is_unlocked = False
-            unlocked_at = None
-        else:
-            progress = user_achievement.current_progress
-            is_unlocked = user_achievement.is_unlocked
-            unlocked_at = user_achievement.unlocked_at
-        
-        progress_percentage = calculate_progress_percentage(progress, achievement.target_value)
+        user_achievement = await db.get(UserAchievement, (current_user.id, achievement_id))
         
-        return UserAchievementResponse(
-            achievement=achievement,
-            current_progress=progress,
-            is_unlocked=is_unlocked,
-            unlocked_at=unlocked_at,
-            progress_percentage=progress_percentage
-        )
+        return build_user_achievement(achievement, user_achievement)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取成就详情失败: {str(e)}"
-        )
\ No newline at end of file
+        )
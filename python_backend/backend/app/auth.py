@@ -1,13 +1,17 @@
 from fastapi import HTTPException, status, Depends, Cookie
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import bcrypt
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Dict, Any
-from .database import SessionLocal, get_db
+from typing import Dict, Any, Optional
+from .database import AsyncSessionLocal, get_async_db
 from .models.user import User
+from .utils.lru_cache import LRUCache
+from .utils.password_pool import password_pool
 import os
+import time
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -21,6 +25,16 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '120'
 # OAuth2配置
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# 认证缓存配置
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', '10000'))
+# 用户行的缓存时间（秒），其他worker上的资料修改最多延迟这么久可见
+AUTH_USER_CACHE_TTL = float(os.getenv('AUTH_USER_CACHE_TTL', '30'))
+
+# 已验证令牌的声明：token -> 用户名，条目不会比令牌本身更晚过期
+_token_cache = LRUCache(AUTH_CACHE_SIZE)
+# 用户行：用户名 -> User（已脱离会话，只读）
+_user_cache = LRUCache(AUTH_CACHE_SIZE, AUTH_USER_CACHE_TTL)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
     # 直接使用bcrypt验证密码
@@ -39,6 +53,14 @@ def get_password_hash(password: str) -> str:
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在密码哈希线程池中验证密码，线程池繁忙时抛出 PasswordPoolBusy"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """在密码哈希线程池中生成密码哈希，线程池繁忙时抛出 PasswordPoolBusy"""
+    return await password_pool.run(get_password_hash, password)
+
 def create_access_token(data: Dict[str, Any]):
     """创建JWT令牌"""
     to_encode = data.copy()
@@ -47,39 +69,73 @@ def create_access_token(data: Dict[str, Any]):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_user_by_username(db: Session, username: str):
+async def get_user_by_username(db: AsyncSession, username: str):
     """根据用户名获取用户"""
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
-def get_user_by_email(db: Session, email: str):
+async def get_user_by_email(db: AsyncSession, email: str):
     """根据邮箱获取用户"""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, username: str, password: str):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
     """验证用户身份"""
-    user = get_user_by_username(db, username)
+    user = await get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
+def decode_token(token: str) -> Optional[str]:
+    """验证令牌并返回其中的用户名（sub），已验证过的令牌直接从缓存返回
+
+    令牌无效或已过期时抛出 JWTError
+    """
+    username = _token_cache.get(token)
+    if username is not None:
+        return username
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username = payload.get("sub")
+    if username is None:
+        return None
+    expire = payload.get("exp")
+    ttl = expire - time.time() if expire is not None else AUTH_USER_CACHE_TTL
+    if ttl > 0:
+        _token_cache.set(token, username, ttl=ttl)
+    return username
+
+async def get_cached_user(db: AsyncSession, username: str):
+    """根据用户名获取用户，优先使用缓存"""
+    user = _user_cache.get(username)
+    if user is None:
+        user = await get_user_by_username(db, username)
+        if user is None:
+            return None
+        # 脱离会话后缓存，供之后的请求只读使用
+        db.expunge(user)
+        _user_cache.set(username, user)
+    return user
+
+def invalidate_user_cache(username: str, token: Optional[str] = None):
+    """用户资料修改或登出后清除缓存"""
+    _user_cache.pop(username)
+    if token:
+        _token_cache.pop(token)
+
 async def get_current_user(
     token: str = None,  # 不再强制依赖oauth2_scheme，改为可选参数
     cookie_token: str = Cookie(None, alias="access_token"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    print("get_current_user被执行了")
-    """获取当前用户 - 支持从Authorization头或cookie中获取token"""
+    """获取当前用户 - 支持从Authorization头或cookie中获取token
+
+    令牌声明和用户行都有缓存，命中时不访问数据库
+    """
     # 优先使用cookie中的token，如果没有则使用Authorization头中的token
     token_to_use = cookie_token if cookie_token else token
     
-    # 记录token来源，便于调试
-    token_source = "cookie" if cookie_token else "header" if token else "none"
-    print(f"🔐 认证请求 - Token来源: {token_source}")
-    print(f"🔐 Cookie token存在: {cookie_token is not None}")
-    print(f"🔐 Header token存在: {token is not None}")
-    
     if not token_to_use:
         print("🔐 错误: 未提供任何认证令牌 (Cookie和Header都为空)")
         raise HTTPException(
@@ -94,10 +150,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        print(f"🔐 正在验证token，长度: {len(token_to_use) if token_to_use else 0}")
-        payload = jwt.decode(token_to_use, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        print(f"🔐 Token解析成功，用户名: {username}")
+        username = decode_token(token_to_use)
         if username is None:
             print("🔐 错误: Token中没有用户名(sub)字段")
             raise credentials_exception
@@ -105,10 +158,32 @@ async def get_current_user(
         print(f"🔐 JWT错误: {str(e)}")
         raise credentials_exception
     
-    user = get_user_by_username(db, username=username)
-    print(f"🔐 根据用户名查询用户: {username}, 结果: {user is not None}")
+    user = await get_cached_user(db, username)
     if user is None:
         print(f"🔐 错误: 找不到用户 {username}")
         raise credentials_exception
-    print(f"🔐 用户认证成功: {username}")
-    return user
\ No newline at end of file
+    return user
+
+class WebSocketAuthError(Exception):
+    """WebSocket握手认证失败"""
+
+async def authenticate_websocket(websocket) -> Optional[User]:
+    """WebSocket握手时验证一次身份：优先 access_token cookie，其次查询参数 token
+
+    没有令牌时返回None（游客），令牌无效时抛出 WebSocketAuthError。
+    之后的消息不再验证，解析出的用户保存在 Player.user_id 上。
+    """
+    token = websocket.cookies.get("access_token") or websocket.query_params.get("token")
+    if not token:
+        return None
+    try:
+        username = decode_token(token)
+    except JWTError as e:
+        raise WebSocketAuthError(f"无效的令牌或令牌已过期: {e}")
+    if username is None:
+        raise WebSocketAuthError("令牌中没有用户名")
+    async with AsyncSessionLocal() as db:
+        user = await get_cached_user(db, username)
+    if user is None:
+        raise WebSocketAuthError(f"找不到用户 {username}")
+    return user
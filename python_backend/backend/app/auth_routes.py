@@ -1,18 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Cookie, Depends, HTTPException, status, Response
+from sqlalchemy import select
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 
-from .database import SessionLocal
+from .database import AsyncSessionLocal
 from .auth import (
-    get_password_hash, create_access_token, authenticate_user,
+    get_password_hash_async, create_access_token, authenticate_user,
     get_user_by_username, get_user_by_email, oauth2_scheme,
-    get_current_user
+    get_current_user, decode_token, invalidate_user_cache
 )
+from jose import JWTError
+from .utils.password_pool import PasswordPoolBusy
 from .models.user import User
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 
+def service_busy(e: PasswordPoolBusy) -> HTTPException:
+    """密码哈希线程池繁忙，请客户端稍后重试"""
+    print(f"⚠️ {e}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="服务器繁忙，请稍后重试",
+        headers={"Retry-After": "1"},
+    )
+
 # Pydantic模型
 class UserCreate(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -44,10 +55,9 @@ class Token(BaseModel):
 # 注册用户
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user: UserCreate):
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         # 检查用户名是否已存在
-        existing_user = get_user_by_username(db, user.username)
+        existing_user = await get_user_by_username(db, user.username)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,7 +65,7 @@ async def register(user: UserCreate):
             )
         
         # 检查邮箱是否已存在
-        existing_email = get_user_by_email(db, user.email)
+        existing_email = await get_user_by_email(db, user.email)
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -63,23 +73,33 @@ async def register(user: UserCreate):
             )
         
         # 创建用户
-        hashed_password = get_password_hash(user.password)
+        try:
+            hashed_password = await get_password_hash_async(user.password)
+        except PasswordPoolBusy as e:
+            raise service_busy(e)
         db_user = User(
             username=user.username,
             email=user.email,
             hashed_password=hashed_password
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
         return db_user
-    finally:
-        db.close()
 
 # 用户登出
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(response: Response, cookie_token: str = Cookie(None, alias="access_token")):
+    # 清除该令牌和用户的认证缓存
+    if cookie_token:
+        try:
+            username = decode_token(cookie_token)
+        except JWTError:
+            username = None
+        if username:
+            invalidate_user_cache(username, cookie_token)
+    
     # 清除cookie
     response.delete_cookie(
         key="access_token",
@@ -93,10 +113,12 @@ async def login(user_login: UserLogin, response: Response):
     print("🔐🔐🔐 登录端点被调用 🔐🔐🔐")
     print(f"🔐 登录请求参数: username={user_login.username}")
     
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         # 验证用户
-        user = authenticate_user(db, user_login.username, user_login.password)
+        try:
+            user = await authenticate_user(db, user_login.username, user_login.password)
+        except PasswordPoolBusy as e:
+            raise service_busy(e)
         if not user:
             print("🔐 登录失败: 用户名或密码错误")
             raise HTTPException(
@@ -131,8 +153,6 @@ async def login(user_login: UserLogin, response: Response):
             "token_type": "bearer",
             "user": user
         }
-    finally:
-        db.close()
 
 # 获取当前用户信息
 @router.get("/profile", response_model=UserResponse)
@@ -153,10 +173,10 @@ async def update_user_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user)
 ):
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         # 从当前会话中获取用户对象
-        db_user = db.query(User).filter(User.id == current_user.id).first()
+        result = await db.execute(select(User).where(User.id == current_user.id))
+        db_user = result.scalars().first()
         
         if not db_user:
             raise HTTPException(status_code=404, detail="用户不存在")
@@ -165,8 +185,8 @@ async def update_user_profile(
         if user_update.avatar:
             db_user.avatar = user_update.avatar
             
-        db.commit()
-        db.refresh(db_user)
-        return db_user
-    finally:
-        db.close()
\ No newline at end of file
+        await db.commit()
+        await db.refresh(db_user)
+        # 之后的请求重新读取用户资料
+        invalidate_user_cache(db_user.username)
+        return db_user
\ No newline at end of file
@@ -0,0 +1,17 @@
+# 集群模式：多worker/多节点部署时的房间归属路由和跨worker消息总线
+from .bus import Bus, InProcessBus, InProcessHub, RedisBus
+from .ownership import OwnershipTable, MemoryOwnershipTable, RedisOwnershipTable
+from .node import ClusterNode, RemoteWebSocket, create_cluster_node
+
+__all__ = [
+    "Bus",
+    "InProcessBus",
+    "InProcessHub",
+    "RedisBus",
+    "OwnershipTable",
+    "MemoryOwnershipTable",
+    "RedisOwnershipTable",
+    "ClusterNode",
+    "RemoteWebSocket",
+    "create_cluster_node"
+]
@@ -0,0 +1,185 @@
+"""集群消息总线
+
+worker之间通过频道发布/订阅JSON消息：
+- InProcessBus：同一进程内模拟多个worker，用于测试和本地调试
+- RedisBus：基于 Redis Pub/Sub，用于多进程/多节点部署（需要安装 redis）
+没有跨进程的本地实现（如 UNIX socket），同一台机器上运行多个worker也需要 Redis。
+同一频道的消息按发布顺序投递，处理函数按顺序逐条执行。
+"""
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis 为可选依赖，只有使用 RedisBus 时才需要
+    aioredis = None
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Redis 连接断开后重新订阅的等待时间（秒），连续失败时翻倍直到上限
+RESUBSCRIBE_DELAY = 0.5
+RESUBSCRIBE_MAX_DELAY = 10.0
+
+
+class Bus(ABC):
+    """消息总线接口"""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """向频道发布一条消息"""
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        """订阅频道，消息按顺序交给 handler 处理"""
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str) -> None:
+        """取消订阅频道"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """关闭总线，停止所有订阅"""
+
+
+async def _dispatch(channel: str, handler: Handler, message: Dict[str, Any]) -> None:
+    try:
+        await handler(message)
+    except Exception as e:
+        # 单条消息处理失败不影响后续消息
+        print(f"总线消息处理失败 [{channel}]: {e!r}")
+
+
+class InProcessHub:
+    """进程内的频道表，多个 InProcessBus 共享同一个 hub 即可互相通信"""
+    def __init__(self):
+        self.channels: Dict[str, List[asyncio.Queue]] = {}
+
+
+class InProcessBus(Bus):
+    """进程内消息总线
+
+    消息经过一次JSON编解码，和真实网络传输一样不共享对象。
+    """
+    def __init__(self, hub: Optional[InProcessHub] = None):
+        self.hub = hub or InProcessHub()
+        self._subscriptions: Dict[str, asyncio.Queue] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        text = json.dumps(message)
+        for queue in self.hub.channels.get(channel, []):
+            queue.put_nowait(text)
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        if channel in self._subscriptions:
+            raise ValueError(f"已订阅频道 {channel}")
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscriptions[channel] = queue
+        self.hub.channels.setdefault(channel, []).append(queue)
+        self._tasks[channel] = asyncio.create_task(self._consume(channel, queue, handler))
+
+    async def _consume(self, channel: str, queue: asyncio.Queue, handler: Handler) -> None:
+        while True:
+            text = await queue.get()
+            await _dispatch(channel, handler, json.loads(text))
+
+    async def unsubscribe(self, channel: str) -> None:
+        queue = self._subscriptions.pop(channel, None)
+        if queue is None:
+            return
+        self.hub.channels[channel].remove(queue)
+        if not self.hub.channels[channel]:
+            del self.hub.channels[channel]
+        task = self._tasks.pop(channel)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def close(self) -> None:
+        for channel in list(self._subscriptions):
+            await self.unsubscribe(channel)
+
+
+class RedisBus(Bus):
+    """基于 Redis Pub/Sub 的消息总线（兼容 Redis 协议的服务均可）"""
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("CLUSTER_BUS=redis 需要安装 redis: pip install redis")
+        self.url = url
+        self.redis = aioredis.from_url(url)
+        self.pubsub = self.redis.pubsub()
+        self._handlers: Dict[str, Handler] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        await self.redis.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers[channel] = handler
+        await self.pubsub.subscribe(channel)
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        """读取订阅消息；连接出错时记录日志，等待后重建订阅，读取协程不会因此退出"""
+        delay = RESUBSCRIBE_DELAY
+        broken = False
+        while True:
+            try:
+                if broken:
+                    await self._resubscribe()
+                    broken = False
+                    print(f"✅ Redis总线已重新订阅 {len(self._handlers)} 个频道")
+                item = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Redis总线读取失败，{delay}s后重新订阅: {e!r}")
+                broken = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RESUBSCRIBE_MAX_DELAY)
+                continue
+            delay = RESUBSCRIBE_DELAY
+            if item is None:
+                continue
+            channel = item["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode("utf-8")
+            handler = self._handlers.get(channel)
+            if handler is None:
+                continue
+            try:
+                message = json.loads(item["data"])
+            except (ValueError, TypeError) as e:
+                print(f"总线消息解码失败 [{channel}]: {e!r}")
+                continue
+            await _dispatch(channel, handler, message)
+
+    async def _resubscribe(self) -> None:
+        """丢弃出错的订阅连接，用新的连接重新订阅所有频道"""
+        try:
+            await self.pubsub.aclose()
+        except Exception:
+            pass
+        self.pubsub = self.redis.pubsub()
+        if self._handlers:
+            await self.pubsub.subscribe(*self._handlers)
+
+    async def unsubscribe(self, channel: str) -> None:
+        self._handlers.pop(channel, None)
+        await self.pubsub.unsubscribe(channel)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        await self.pubsub.aclose()
+        await self.redis.aclose()
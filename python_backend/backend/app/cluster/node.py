@@ -0,0 +1,251 @@
+"""集群节点：房间归属路由和跨worker转发
+
+每个房间只在一个worker（房主worker）上运行。客户端连接到其他worker时：
+1. 该worker通过归属表查到房主worker
+2. 把连接、客户端消息和断开事件经总线转发到房主worker
+3. 房主worker用 RemoteWebSocket 代表这个连接加入房间，房间发给它的消息再经总线发回
+
+频道约定：
+- cluster:worker:{worker_id}  发给某个worker的转发消息
+- cluster:lobby               各worker的房间大厅事件，用于同步全局房间列表
+"""
+import asyncio
+import json
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import WebSocket
+
+from ..models.player import Player
+from ..room_registry import RoomRegistry
+from ..rooms import Room
+from ..utils.fanout import fanout
+from .bus import Bus, InProcessBus, RedisBus
+from .ownership import OwnershipTable, MemoryOwnershipTable, RedisOwnershipTable, OWNERSHIP_TTL
+
+LOBBY_CHANNEL = "cluster:lobby"
+
+RoomProvider = Callable[[str, str], Awaitable[Room]]
+
+
+def worker_channel(worker_id: str) -> str:
+    return f"cluster:worker:{worker_id}"
+
+
+class RemoteWebSocket:
+    """房主worker上代表其他worker客户端连接的代理对象
+
+    只实现房间和游戏用到的 send_text / close，发送的文本经总线交给客户端所在的worker。
+    """
+    def __init__(self, node: "ClusterNode", conn_id: str, worker_id: str):
+        self.node = node
+        self.conn_id = conn_id
+        self.worker_id = worker_id
+
+    async def send_text(self, text: str) -> None:
+        await self.node.bus.publish(worker_channel(self.worker_id), {
+            "op": "send", "conn_id": self.conn_id, "text": text
+        })
+
+    async def close(self, code: int = 1000) -> None:
+        await self.node.bus.publish(worker_channel(self.worker_id), {
+            "op": "close", "conn_id": self.conn_id, "code": code
+        })
+
+
+class ClusterNode:
+    """单个worker在集群中的代表"""
+    def __init__(
+        self,
+        worker_id: str,
+        bus: Bus,
+        ownership: OwnershipTable,
+        registry: RoomRegistry,
+        room_provider: RoomProvider,
+        renew_interval: float = OWNERSHIP_TTL / 3
+    ):
+        self.worker_id = worker_id
+        self.bus = bus
+        self.ownership = ownership
+        self.registry = registry
+        self.room_provider = room_provider
+        self.renew_interval = renew_interval
+        self.local_sockets: Dict[str, WebSocket] = {}  # conn_id -> 本worker的客户端连接（房间在其他worker）
+        self.remote_sockets: Dict[str, Tuple[RemoteWebSocket, Room]] = {}  # conn_id -> (代理连接, 房间)
+        self.remote_owners: Dict[str, str] = {}  # room_id -> 其他worker的ID
+        self._lobby_outbox: asyncio.Queue = asyncio.Queue()
+        self._tasks = []
+        self.started = False
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        self.started = True
+        await self.bus.subscribe(worker_channel(self.worker_id), self._on_worker_message)
+        await self.bus.subscribe(LOBBY_CHANNEL, self._on_lobby_message)
+        self.registry.add_listener(self._on_registry_event)
+        self._tasks = [
+            asyncio.create_task(self._publish_lobby_events()),
+            asyncio.create_task(self._renew_loop()),
+        ]
+        # 请求其他worker重新发布各自的房间，建立全局大厅列表
+        await self.bus.publish(LOBBY_CHANNEL, {"op": "sync_request", "worker": self.worker_id})
+        print(f"🌐 集群节点 {self.worker_id} 已启动")
+
+    async def stop(self) -> None:
+        if not self.started:
+            return
+        self.started = False
+        self.registry.remove_listener(self._on_registry_event)
+        await self.bus.publish(LOBBY_CHANNEL, {"op": "worker_down", "worker": self.worker_id})
+        for room in list(self.registry):
+            await self.ownership.release(room.room_id, self.worker_id)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.bus.close()
+
+    # ---- 房间归属 ----
+
+    async def claim(self, room_id: str) -> str:
+        """认领房间，返回房主worker"""
+        return await self.ownership.claim(room_id, self.worker_id)
+
+    async def release(self, room_id: str) -> None:
+        await self.ownership.release(room_id, self.worker_id)
+
+    async def _renew_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self.ownership.renew([room.room_id for room in self.registry], self.worker_id)
+            except Exception as e:
+                print(f"房间归属续期失败: {e!r}")
+
+    # ---- 客户端所在worker：转发连接 ----
+
+    async def forward(self, websocket: WebSocket, room_id: str, game_type: str, player_info: Dict[str, Any], owner: str) -> None:
+        """把客户端连接转发到房主worker，直到客户端断开（断开异常会继续向上抛出）"""
+        conn_id = uuid.uuid4().hex
+        channel = worker_channel(owner)
+        self.local_sockets[conn_id] = websocket
+        fanout.attach(websocket)
+        await self.bus.publish(channel, {
+            "op": "connect",
+            "conn_id": conn_id,
+            "reply_to": self.worker_id,
+            "room_id": room_id,
+            "game_type": game_type,
+            "player": player_info
+        })
+        try:
+            while True:
+                data = await websocket.receive_text()
+                await self.bus.publish(channel, {"op": "event", "conn_id": conn_id, "data": data})
+        finally:
+            self.local_sockets.pop(conn_id, None)
+            await fanout.detach(websocket)
+            await self.bus.publish(channel, {"op": "disconnect", "conn_id": conn_id})
+
+    # ---- 总线消息处理 ----
+
+    async def _on_worker_message(self, message: Dict[str, Any]) -> None:
+        op = message.get("op")
+        conn_id = message.get("conn_id")
+
+        # 房主worker发回给客户端的消息
+        if op == "send":
+            websocket = self.local_sockets.get(conn_id)
+            if websocket is not None:
+                fanout.enqueue_all([websocket], message["text"])
+        elif op == "close":
+            websocket = self.local_sockets.get(conn_id)
+            if websocket is not None:
+                asyncio.create_task(websocket.close(code=message.get("code", 1000)))
+
+        # 其他worker转发来的连接和事件
+        elif op == "connect":
+            room = await self.room_provider(message["room_id"], message["game_type"])
+            remote = RemoteWebSocket(self, conn_id, message["reply_to"])
+            self.remote_sockets[conn_id] = (remote, room)
+            info = message["player"]
+            # 身份已在客户端所在worker握手时验证
+            player = Player(id=info["id"], name=info["name"], avatar=info.get("avatar", ""), user_id=info.get("user_id"))
+            await room.connect(remote, player)
+        elif op == "event":
+            item = self.remote_sockets.get(conn_id)
+            if item is not None:
+                remote, room = item
+                await room.handle_event(remote, json.loads(message["data"]))
+        elif op == "disconnect":
+            item = self.remote_sockets.pop(conn_id, None)
+            if item is not None:
+                remote, room = item
+                await room.disconnect(remote)
+
+    def _on_registry_event(self, event: str, game_type: str, room_id: str, entry: Optional[Dict[str, Any]], remote: bool = False) -> None:
+        # 只发布本worker拥有的房间，保证事件按发生顺序发出
+        if not remote:
+            self._lobby_outbox.put_nowait({
+                "op": "room", "worker": self.worker_id, "event": event,
+                "game_type": game_type, "room_id": room_id, "entry": entry
+            })
+
+    async def _publish_lobby_events(self) -> None:
+        while True:
+            message = await self._lobby_outbox.get()
+            try:
+                await self.bus.publish(LOBBY_CHANNEL, message)
+            except Exception as e:
+                print(f"发布大厅事件失败: {e!r}")
+
+    async def _on_lobby_message(self, message: Dict[str, Any]) -> None:
+        worker = message.get("worker")
+        if worker == self.worker_id:
+            return
+        op = message.get("op")
+        if op == "room":
+            room_id = message["room_id"]
+            if message["event"] == "destroyed":
+                self.remote_owners.pop(room_id, None)
+            else:
+                self.remote_owners[room_id] = worker
+            self.registry.apply_remote(message["event"], message["game_type"], room_id, message["entry"])
+        elif op == "sync_request":
+            for room in list(self.registry):
+                self._on_registry_event("created", room.gameType, room.room_id, self.registry.entry(room.room_id))
+        elif op == "worker_down":
+            self.registry.drop_remote(lambda room_id: self.remote_owners.get(room_id) == worker)
+            for room_id in [r for r, w in self.remote_owners.items() if w == worker]:
+                del self.remote_owners[room_id]
+
+
+def create_cluster_node(registry: RoomRegistry, room_provider: RoomProvider) -> Optional[ClusterNode]:
+    """根据环境变量创建集群节点，CLUSTER_MODE 未开启时返回None（单进程模式）
+
+    - CLUSTER_MODE: on / off（默认off）
+    - WORKER_ID: worker标识，默认 主机名-进程号
+    - CLUSTER_BUS: redis / memory（默认redis）
+    - CLUSTER_BUS_URL: Redis地址，默认 redis://localhost:6379/0
+
+    多worker（uvicorn --workers N）或多节点部署必须使用 Redis：没有跨进程的本地总线，
+    memory 总线和归属表只在同一进程内有效，只用于测试和单进程调试。
+    """
+    if os.getenv('CLUSTER_MODE', 'off').lower() not in ('on', 'true', '1'):
+        return None
+    worker_id = os.getenv('WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}"
+    bus_type = os.getenv('CLUSTER_BUS', 'redis')
+    if bus_type not in ('redis', 'memory'):
+        raise ValueError(f"不支持的集群总线: {bus_type}（多worker部署请使用 redis）")
+    if bus_type == 'memory':
+        print("⚠️ CLUSTER_BUS=memory 只在单个进程内有效，多worker部署必须使用 CLUSTER_BUS=redis")
+        bus: Bus = InProcessBus()
+        ownership: OwnershipTable = MemoryOwnershipTable()
+    else:
+        url = os.getenv('CLUSTER_BUS_URL', 'redis://localhost:6379/0')
+        bus = RedisBus(url)
+        ownership = RedisOwnershipTable(url)
+    print(f"🌐 集群模式: worker={worker_id}, bus={bus_type}")
+    return ClusterNode(worker_id, bus, ownership, registry, room_provider)
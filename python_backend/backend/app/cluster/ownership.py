@@ -0,0 +1,117 @@
+"""房间归属表：记录每个房间由哪个worker负责
+
+claim 是"不存在才写入"的原子操作，多个worker同时为同一房间建立连接时只有一个会成为房主worker。
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis 为可选依赖
+    aioredis = None
+
+# 归属记录的过期时间（秒），房主worker会定期续期，worker异常退出后记录自动失效
+OWNERSHIP_TTL = 30
+
+
+class OwnershipTable(ABC):
+    """房间归属表接口"""
+
+    @abstractmethod
+    async def claim(self, room_id: str, worker_id: str) -> str:
+        """尝试认领房间，返回实际的房主worker"""
+
+    @abstractmethod
+    async def owner(self, room_id: str) -> Optional[str]:
+        """查询房间的房主worker，不存在时返回None"""
+
+    @abstractmethod
+    async def renew(self, room_ids: Iterable[str], worker_id: str) -> None:
+        """为本worker拥有的房间续期"""
+
+    @abstractmethod
+    async def release(self, room_id: str, worker_id: str) -> None:
+        """释放房间（只有房主worker可以释放）"""
+
+
+class MemoryOwnershipTable(OwnershipTable):
+    """进程内归属表，多个worker共享同一个实例即可（用于测试）"""
+    def __init__(self, ttl: float = OWNERSHIP_TTL):
+        self.ttl = ttl
+        self.records: Dict[str, Tuple[str, float]] = {}  # room_id -> (worker_id, 过期时间)
+
+    def _current(self, room_id: str) -> Optional[str]:
+        record = self.records.get(room_id)
+        if record is None:
+            return None
+        if time.monotonic() >= record[1]:
+            del self.records[room_id]
+            return None
+        return record[0]
+
+    async def claim(self, room_id: str, worker_id: str) -> str:
+        current = self._current(room_id)
+        if current is None:
+            self.records[room_id] = (worker_id, time.monotonic() + self.ttl)
+            return worker_id
+        return current
+
+    async def owner(self, room_id: str) -> Optional[str]:
+        return self._current(room_id)
+
+    async def renew(self, room_ids: Iterable[str], worker_id: str) -> None:
+        expires = time.monotonic() + self.ttl
+        for room_id in room_ids:
+            if self._current(room_id) == worker_id:
+                self.records[room_id] = (worker_id, expires)
+
+    async def release(self, room_id: str, worker_id: str) -> None:
+        if self._current(room_id) == worker_id:
+            del self.records[room_id]
+
+
+# 只删除属于自己的记录，避免误删其他worker刚认领的房间
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisOwnershipTable(OwnershipTable):
+    """基于 Redis 的归属表，键为 room_owner:{room_id}"""
+    def __init__(self, url: str, ttl: int = OWNERSHIP_TTL):
+        if aioredis is None:
+            raise RuntimeError("集群模式使用 Redis 归属表需要安装 redis: pip install redis")
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(room_id: str) -> str:
+        return f"room_owner:{room_id}"
+
+    async def claim(self, room_id: str, worker_id: str) -> str:
+        if await self.redis.set(self._key(room_id), worker_id, nx=True, ex=self.ttl):
+            return worker_id
+        owner = await self.redis.get(self._key(room_id))
+        # 记录恰好在两次调用之间过期时重试一次
+        return owner if owner is not None else await self.claim(room_id, worker_id)
+
+    async def owner(self, room_id: str) -> Optional[str]:
+        return await self.redis.get(self._key(room_id))
+
+    async def renew(self, room_ids: Iterable[str], worker_id: str) -> None:
+        for room_id in room_ids:
+            await self.redis.eval(_RENEW_SCRIPT, 1, self._key(room_id), worker_id, self.ttl)
+
+    async def release(self, room_id: str, worker_id: str) -> None:
+        await self.redis.eval(_RELEASE_SCRIPT, 1, self._key(room_id), worker_id)
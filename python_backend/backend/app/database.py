@@ -1,15 +1,21 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
 from sqlalchemy.orm import sessionmaker
-from .models.user import Base as UserBase
-from .models.game_record import Base as GameRecordBase
-from .models.achievement import Base as AchievementBase
-from .models.user_achievement import Base as UserAchievementBase
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from .models import Base
+from .utils.pool_metrics import PoolMetrics, instrumented_pool_class
 import os
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+# 数据库类型：mysql（默认）或 sqlite（本地开发、测试和基准测试，不依赖外部服务）
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'mysql').lower()
+# sqlite 类型下的数据库文件路径，:memory: 表示进程内的内存数据库（同步、异步引擎共享同一个库）
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'quizarena.db')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
 # 数据库配置 - 使用MySQL
 MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
 MYSQL_PORT = os.getenv('MYSQL_PORT', '3306')
@@ -17,47 +23,108 @@ MYSQL_USER = os.getenv('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
 MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'quizarena')
 
-# 创建MySQL数据库连接URL
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
+def sqlite_urls(path: str):
+    """SQLite 的 (同步, 异步) 连接URL；内存库使用命名的共享缓存库，两个引擎看到同一份数据"""
+    if path == ":memory:":
+        path = "file:quizarena?mode=memory&cache=shared&uri=true"
+    return f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}"
 
-# 创建数据库引擎 - 去除check_same_thread参数，这是SQLite特有的
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def is_memory_sqlite(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and (url.database in (None, "", ":memory:") or url.query.get("mode") == "memory")
+
+# 创建数据库连接URL
+if DATABASE_PROFILE == 'sqlite':
+    SQLALCHEMY_DATABASE_URL, _DEFAULT_ASYNC_URL = sqlite_urls(SQLITE_PATH)
+else:
+    SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
+    _DEFAULT_ASYNC_URL = f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
+
+# 连接池配置（同步、异步引擎各自一个池）
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # 等待空闲连接的超时（秒）
+# 连接最长使用时间（秒），应小于 MySQL wait_timeout 和中间代理的空闲超时
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'on').lower() == 'on'
+
+# 连接池指标，通过 /api/metrics/db-pool 查看
+pool_metrics = {
+    "sync": PoolMetrics("sync"),
+    "async": PoolMetrics("async")
+}
 
-# 检查是否成功连接到MySQL数据库
-try:
-    connection = engine.connect()
-    connection.close()
-    print(f"✅ 成功连接到MySQL数据库: {MYSQL_DATABASE}@{MYSQL_HOST}:{MYSQL_PORT}")
-except Exception as e:
-    print(f"❌ 无法连接到MySQL数据库: {str(e)}")
-    print("⚠️ 请确保MySQL服务已启动，且.env文件中的配置正确")
+def pool_options(url: str, metrics: PoolMetrics, base_pool=QueuePool):
+    """连接池参数；SQLite 文件库使用 SQLAlchemy 的默认池，内存库整个进程共用一个连接"""
+    if is_memory_sqlite(url):
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": instrumented_pool_class(base_pool, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING
+    }
+
+# 创建数据库引擎 - 去除check_same_thread参数，这是SQLite特有的
+# 引擎在第一次使用时才建立连接，导入本模块不访问数据库；连通性由 app/readiness.py 在启动后检查
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL, pool_metrics["sync"]))
 
 # 创建SessionLocal类
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# 创建数据库表
+# 异步数据库连接 - 游戏协程和REST路由使用，避免数据库往返阻塞事件循环
+# 可通过 ASYNC_DATABASE_URL 单独指定（默认与同步引擎使用同一个库）
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', _DEFAULT_ASYNC_URL)
+
+# 创建异步数据库引擎，连接在第一次使用时才建立
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **pool_options(ASYNC_DATABASE_URL, pool_metrics["async"], AsyncAdaptedQueuePool)
+)
+
+def use_sqlite_pragmas(sync_engine):
+    """SQLite 连接参数：与 MySQL 一样检查外键；文件库使用 WAL 允许读写并发，写锁冲突时等待而不是立即报错"""
+    memory = is_memory_sqlite(sync_engine.url)
+
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if not memory:
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+for _engine in (engine, async_engine.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        use_sqlite_pragmas(_engine)
+
+pool_metrics["sync"].pool = engine.pool
+pool_metrics["async"].pool = async_engine.sync_engine.pool
+
+# 创建AsyncSessionLocal类，提交后不过期对象，避免在提交后访问属性时触发隐式查询
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# 创建数据库表（一次 create_all 覆盖全部模型，已存在的表不会修改）
+# 不在导入时执行：由 lifespan 后台预热（SCHEMA_BOOTSTRAP=on）或命令行 python -m app.database 显式调用
 def create_tables():
     """创建所有数据库表"""
     try:
-        # 创建用户相关表
-        UserBase.metadata.create_all(bind=engine)
-        print("用户表创建成功")
-        
-        # 创建游戏记录相关表
-        GameRecordBase.metadata.create_all(bind=engine)
-        print("游戏记录表创建成功")
-        
-        # 创建成就相关表
-        AchievementBase.metadata.create_all(bind=engine)
-        print("成就定义表创建成功")
-        
-        UserAchievementBase.metadata.create_all(bind=engine)
-        print("用户成就进度表创建成功")
-        
+        Base.metadata.create_all(bind=engine)
         print("所有数据库表创建完成")
     except Exception as e:
         print(f"数据库表创建失败: {e}")
 
+async def create_tables_async():
+    """创建所有数据库表（异步引擎，不阻塞事件循环），失败时抛出异常"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    print("所有数据库表创建完成")
+
 # 数据库依赖
 def get_db():
     """获取数据库会话"""
@@ -66,4 +133,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# 异步数据库依赖
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+if __name__ == "__main__":
+    create_tables()
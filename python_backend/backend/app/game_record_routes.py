@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
 from typing import List, Optional
 
-from .database import get_db
+from .database import get_async_db
 from .auth import get_current_user
 from .models.user import User
 from .models.game_record import GameSession, GameRound, PlayerStats
+from .services.player_stats import apply_session_change, completed_snapshot
 
 router = APIRouter(prefix="/game-records", tags=["游戏记录"])
 
@@ -74,7 +75,7 @@ class PlayerStatsResponse(BaseModel):
 async def create_game_session(
     session_data: GameSessionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建新的游戏会话记录"""
     try:
@@ -85,11 +86,14 @@ async def create_game_session(
             start_time=session_data.start_time or datetime.utcnow()
         )
         db.add(db_session)
-        db.commit()
-        db.refresh(db_session)
+        # 状态默认为 completed，新会话同样计入统计（与 reconcile_player_stats 重建结果一致）
+        await db.flush()
+        await apply_session_change(db, None, db_session)
+        await db.commit()
+        await db.refresh(db_session)
         return db_session
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"创建游戏会话失败: {str(e)}"
@@ -101,14 +105,16 @@ async def update_game_session(
     session_id: int,
     update_data: GameSessionUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新游戏会话记录（游戏结束时调用）"""
     try:
-        db_session = db.query(GameSession).filter(
-            GameSession.id == session_id,
-            GameSession.user_id == current_user.id
-        ).first()
+        db_session = (await db.execute(
+            select(GameSession).where(
+                GameSession.id == session_id,
+                GameSession.user_id == current_user.id
+            )
+        )).scalars().first()
         
         if not db_session:
             raise HTTPException(
@@ -116,6 +122,9 @@ async def update_game_session(
                 detail="游戏会话不存在"
             )
         
+        # 修改前已计入统计的部分
+        counted_before = completed_snapshot(db_session)
+        
         # 更新字段
         if update_data.end_time:
             db_session.end_time = update_data.end_time
@@ -131,18 +140,18 @@ async def update_game_session(
             db_session.rounds_total = update_data.rounds_total
         if update_data.status:
             db_session.status = update_data.status
-            
-        db.commit()
-        db.refresh(db_session)
         
-        # 更新玩家统计
-        await update_player_stats(db_session.user_id, db_session.game_type, db)
+        # 按修改前后的差值增量更新玩家统计，和会话修改在同一事务中提交
+        await db.flush()
+        await apply_session_change(db, counted_before, db_session)
+        await db.commit()
+        await db.refresh(db_session)
         
         return db_session
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"更新游戏会话失败: {str(e)}"
@@ -153,15 +162,17 @@ async def update_game_session(
 async def create_game_round(
     round_data: GameRoundCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建游戏回合记录"""
     try:
         # 验证会话属于当前用户
-        session = db.query(GameSession).filter(
-            GameSession.id == round_data.session_id,
-            GameSession.user_id == current_user.id
-        ).first()
+        session = (await db.execute(
+            select(GameSession).where(
+                GameSession.id == round_data.session_id,
+                GameSession.user_id == current_user.id
+            )
+        )).scalars().first()
         
         if not session:
             raise HTTPException(
@@ -179,14 +190,14 @@ async def create_game_round(
             round_score=round_data.round_score
         )
         db.add(db_round)
-        db.commit()
-        db.refresh(db_round)
+        await db.commit()
+        await db.refresh(db_round)
         
         return {"message": "回合记录创建成功", "round_id": db_round.id}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"创建回合记录失败: {str(e)}"
@@ -197,15 +208,17 @@ async def create_game_round(
 async def get_all_game_sessions(
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取所有游戏记录（仅用于调试）"""
     print("🔍 管理接口: 查询所有游戏记录")
     try:
         # 查询所有游戏记录，不限制用户
-        sessions = db.query(GameSession).order_by(
-            GameSession.start_time.desc()
-        ).offset(offset).limit(limit).all()
+        sessions = (await db.execute(
+            select(GameSession).order_by(
+                GameSession.start_time.desc()
+            ).offset(offset).limit(limit)
+        )).scalars().all()
         
         print(f"📊 找到 {len(sessions)} 条游戏记录")
         # 输出每条记录的关键信息用于调试
@@ -227,15 +240,15 @@ async def get_user_game_sessions(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取用户的游戏记录"""
     try:
-        query = db.query(GameSession).filter(GameSession.user_id == current_user.id)
+        query = select(GameSession).where(GameSession.user_id == current_user.id)
         if game_type:
-            query = query.filter(GameSession.game_type == game_type)
+            query = query.where(GameSession.game_type == game_type)
             
-        sessions = query.order_by(GameSession.start_time.desc()).offset(offset).limit(limit).all()
+        sessions = (await db.execute(query.order_by(GameSession.start_time.desc()).offset(offset).limit(limit))).scalars().all()
         return sessions
     except Exception as e:
         raise HTTPException(
@@ -248,7 +261,7 @@ async def get_user_game_sessions(
 async def get_player_stats(
     game_type: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取玩家的游戏统计信息"""
     print(f"/stats:获取用户 {current_user.username} id: {current_user.id} 的游戏统计信息")
@@ -261,71 +274,15 @@ async def get_player_stats(
             except AttributeError:
                 pass
     try:
-        query = db.query(PlayerStats).filter(PlayerStats.user_id == current_user.id)
+        query = select(PlayerStats).where(PlayerStats.user_id == current_user.id)
         
         if game_type:
-            query = query.filter(PlayerStats.game_type == game_type)
+            query = query.where(PlayerStats.game_type == game_type)
             
-        stats = query.all()
+        stats = (await db.execute(query)).scalars().all()
         return stats
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取统计信息失败: {str(e)}"
         )
-
-async def update_player_stats(user_id: int, game_type: str, db: Session):
-    """更新玩家统计信息"""
-    try:
-        # 计算统计信息
-        stats_query = db.query(
-            GameSession.user_id,
-            GameSession.game_type,
-            func.count().label('total_games'),
-            func.sum(GameSession.score).label('total_score'),
-            func.avg(GameSession.score).label('average_score'),
-            func.max(GameSession.score).label('best_score'),
-            func.avg(GameSession.accuracy).label('average_accuracy'),
-            func.sum(GameSession.duration_seconds).label('total_play_time'),
-            func.max(GameSession.end_time).label('last_played')
-        ).filter(
-            GameSession.user_id == user_id,
-            GameSession.game_type == game_type,
-            GameSession.status == 'completed'
-        ).group_by(GameSession.user_id, GameSession.game_type)
-        
-        stats_result = stats_query.first()
-        
-        if stats_result:
-            # 更新或插入统计记录
-            existing_stats = db.query(PlayerStats).filter(
-                PlayerStats.user_id == user_id,
-                PlayerStats.game_type == game_type
-            ).first()
-            
-            if existing_stats:
-                existing_stats.total_games = stats_result.total_games or 0
-                existing_stats.total_score = stats_result.total_score or 0
-                existing_stats.average_score = float(stats_result.average_score or 0)
-                existing_stats.best_score = stats_result.best_score or 0
-                existing_stats.average_accuracy = float(stats_result.average_accuracy or 0)
-                existing_stats.total_play_time_seconds = stats_result.total_play_time or 0
-                existing_stats.last_played = stats_result.last_played
-            else:
-                new_stats = PlayerStats(
-                    user_id=user_id,
-                    game_type=game_type,
-                    total_games=stats_result.total_games or 0,
-                    total_score=stats_result.total_score or 0,
-                    average_score=float(stats_result.average_score or 0),
-                    best_score=stats_result.best_score or 0,
-                    average_accuracy=float(stats_result.average_accuracy or 0),
-                    total_play_time_seconds=stats_result.total_play_time or 0,
-                    last_played=stats_result.last_played
-                )
-                db.add(new_stats)
-            
-            db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"更新玩家统计失败: {str(e)}")
\ No newline at end of file
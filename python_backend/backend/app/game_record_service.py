@@ -1,11 +1,11 @@
 """游戏记录服务 - 提供游戏记录相关的业务逻辑"""
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from datetime import datetime
 from typing import Optional
 
 from .models.game_record import GameSession, GameRound, PlayerStats
 from .models.user import User
+from .services.player_stats import apply_session_change_sync, completed_snapshot, reconcile_player_stats_sync
 
 class GameRecordService:
     """游戏记录服务类"""
@@ -45,18 +45,22 @@ class GameRecordService:
         if not session:
             return None
         
+        # 修改前已计入统计的部分
+        counted_before = completed_snapshot(session)
+        
         # 更新字段
         for key, value in kwargs.items():
             if hasattr(session, key) and value is not None:
                 setattr(session, key, value)
         
         session.end_time = session.end_time or datetime.utcnow()
+        
+        # 按修改前后的差值增量更新玩家统计，和会话修改在同一事务中提交
+        db.flush()
+        apply_session_change_sync(db, counted_before, session)
         db.commit()
         db.refresh(session)
         
-        # 更新玩家统计
-        GameRecordService.update_player_stats(db, user_id, session.game_type)
-        
         return session
     
     @staticmethod
@@ -87,58 +91,10 @@ class GameRecordService:
     
     @staticmethod
     def update_player_stats(db: Session, user_id: int, game_type: str):
-        """更新玩家统计信息"""
+        """从游戏记录重建玩家统计信息（日常统计由每局结束时的增量更新维护）"""
         try:
-            # 查询游戏统计信息
-            stats = db.query(
-                func.count(GameSession.id).label('total_games'),
-                func.sum(GameSession.score).label('total_score'),
-                func.avg(GameSession.score).label('average_score'),
-                func.max(GameSession.score).label('best_score'),
-                func.avg(GameSession.accuracy).label('average_accuracy'),
-                func.sum(GameSession.duration_seconds).label('total_play_time'),
-                func.max(GameSession.end_time).label('last_played')
-            ).filter(
-                GameSession.user_id == user_id,
-                GameSession.game_type == game_type,
-                GameSession.status == 'completed'
-            ).first()
-            
-            if not stats or not stats.total_games:
-                return
-            
-            # 查找或创建玩家统计记录
-            player_stats = db.query(PlayerStats).filter(
-                PlayerStats.user_id == user_id,
-                PlayerStats.game_type == game_type
-            ).first()
-            
-            if player_stats:
-                # 更新现有记录
-                player_stats.total_games = stats.total_games
-                player_stats.total_score = stats.total_score or 0
-                player_stats.average_score = float(stats.average_score or 0)
-                player_stats.best_score = stats.best_score or 0
-                player_stats.average_accuracy = float(stats.average_accuracy or 0)
-                player_stats.total_play_time_seconds = stats.total_play_time or 0
-                player_stats.last_played = stats.last_played
-            else:
-                # 创建新记录
-                player_stats = PlayerStats(
-                    user_id=user_id,
-                    game_type=game_type,
-                    total_games=stats.total_games,
-                    total_score=stats.total_score or 0,
-                    average_score=float(stats.average_score or 0),
-                    best_score=stats.best_score or 0,
-                    average_accuracy=float(stats.average_accuracy or 0),
-                    total_play_time_seconds=stats.total_play_time or 0,
-                    last_played=stats.last_played
-                )
-                db.add(player_stats)
-            
+            reconcile_player_stats_sync(db, user_id, game_type)
             db.commit()
-            
         except Exception as e:
             db.rollback()
             print(f"更新玩家统计失败: {str(e)}")
@@ -0,0 +1,119 @@
+"""成就观察者：一局结束后判定全房间玩家的成就并通知解锁
+
+各游戏只需继承 RoomAchievementObserver，设置游戏类型和成就目录中使用的条件类型。
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.services.achievement_catalog import CatalogEntry, achievement_catalog
+from app.services.achievement_engine import achievement_engine
+from app.services.achievement_summary import achievement_summaries
+
+# 观察者接口
+class AchievementObserver(ABC):
+    @abstractmethod
+    async def on_game_finished(self, game_data: Dict[str, Any]):
+        """当游戏结束时调用"""
+        pass
+    
+    @abstractmethod
+    async def on_room_finished(self, players: List[Dict[str, Any]]):
+        """当房间内一局游戏结束时调用，players 为每个玩家的 game_data"""
+        pass
+    
+    @abstractmethod
+    async def on_achievements_unlocked(self, achievements: List[CatalogEntry], user_id: str):
+        """当玩家解锁成就时调用（一局结束后每个玩家调用一次）"""
+        pass
+
+# 房间级成就观察者的通用实现
+class RoomAchievementObserver(AchievementObserver):
+    GAME_TYPE: str = ""
+    # 成就目录中该游戏使用的条件类型，由子类设置
+    GAME_COUNT_CONDITION: str = ""
+    WIN_COUNT_CONDITION: str = ""
+    SCORE_CONDITION: str = ""
+
+    def __init__(self, game_instance):
+        self.game_instance = game_instance
+    
+    async def on_game_finished(self, game_data: Dict[str, Any]):
+        """处理单个玩家的游戏结束事件，检查并更新成就"""
+        await self.on_room_finished([game_data])
+    
+    async def on_room_finished(self, players: List[Dict[str, Any]]):
+        """处理房间游戏结束事件，在一个事务中判定所有玩家的成就"""
+        try:
+            # 在开启事务前刷新成就目录，避免事务中途再占用一个连接
+            await achievement_catalog.ensure_fresh()
+            async with AsyncSessionLocal() as db:
+                unlocked = await self.evaluate_room(db, players)
+                await db.commit()
+        except Exception as e:
+            print(f"❌ 检查成就时出错: {str(e)}")
+            return
+        
+        # 提交成功后再通知成就解锁
+        await self.notify_unlocked(unlocked)
+    
+    async def evaluate_room(self, db: AsyncSession, players: List[Dict[str, Any]]) -> Dict[str, List[CatalogEntry]]:
+        """判定一局所有玩家的成就，返回 玩家ID -> 新解锁的成就（调用方负责提交）
+        
+        查询次数与玩家数无关：一次胜利次数统计 + 一次进度查询 + 一次批量upsert
+        """
+        players = [p for p in players if p.get('user_id')]
+        if not players:
+            return {}
+        
+        # 胜利相关成就只在获胜时检查
+        winners = [p['user_id'] for p in players if p.get('is_winner', False)]
+        win_counts = await self._count_wins(db, winners) if winners else {}
+        
+        # 本局结束后各玩家各条件类型的最新进度
+        progress_by_user = {}
+        for p in players:
+            progress = {
+                self.GAME_COUNT_CONDITION: p.get('total_games', 0),
+                self.SCORE_CONDITION: p.get('score', 0)
+            }
+            if p.get('is_winner', False):
+                progress[self.WIN_COUNT_CONDITION] = win_counts.get(int(p['user_id']), 0)
+            progress_by_user[p['user_id']] = progress
+        
+        return await achievement_engine.evaluate(db, self.GAME_TYPE, progress_by_user)
+    
+    async def _count_wins(self, db: AsyncSession, user_ids: List[str]) -> Dict[int, int]:
+        """查询玩家获胜次数（胜利定义为score > 0）"""
+        from app.models.game_record import GameSession
+        rows = (await db.execute(
+            select(GameSession.user_id, func.count(GameSession.id)).where(
+                GameSession.user_id.in_({int(user_id) for user_id in user_ids}),
+                GameSession.game_type == self.GAME_TYPE,
+                GameSession.status == "completed",
+                GameSession.score > 0  # 添加胜利条件筛选
+            ).group_by(GameSession.user_id)
+        )).all()
+        return {user_id: count for user_id, count in rows}
+    
+    async def notify_unlocked(self, unlocked: Dict[str, List[CatalogEntry]]):
+        for user_id, achievements in unlocked.items():
+            if achievements:
+                # 成就摘要已变化
+                achievement_summaries.invalidate(user_id)
+                await self.on_achievements_unlocked(achievements, user_id)
+    
+    async def on_achievements_unlocked(self, achievements: List[CatalogEntry], user_id: str):
+        """通知玩家成就解锁，同一局解锁的多个成就合并为一条消息"""
+        print(f"🎉 用户 {user_id} 解锁了成就: {', '.join(a.name for a in achievements)}")
+        
+        # 通过游戏实例向玩家发送成就解锁通知
+        if self.game_instance:
+            notices = [a.to_notice() for a in achievements]
+            # 玩家ID即账号ID的字符串形式（握手时校验）
+            await self.game_instance.broadcast_to_player(str(user_id), {
+                "type": "achievement_unlocked",
+                "achievement": notices[0],  # 兼容只读取单个成就的客户端
+                "achievements": notices
+            })
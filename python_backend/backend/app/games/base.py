@@ -3,7 +3,8 @@ from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional, Set
 from fastapi import WebSocket
 from app.models.player import Player
-import json
+from app.utils.fanout import fanout
+from app.utils.encoding import encode_message
 
 class BaseGame(ABC):
     """游戏基类，定义通用接口"""
@@ -11,7 +12,10 @@ class BaseGame(ABC):
         self.room_id = room_id
         self.players: Dict[str, Player] = {}  # 玩家字典
         self.connections: Dict[WebSocket, str] = {}  # 连接->玩家ID映射
+        self.player_sockets: Dict[str, Set[WebSocket]] = {}  # 玩家ID->连接集合（支持同一玩家多个标签页）
+        self.role_players: Dict[str, Set[str]] = {}  # 角色->玩家ID集合
         self.disconnected_players: Set[str] = set()  # 已断开连接的玩家ID
+        self.player_accounts: Dict[str, int] = {}  # 玩家ID->验证过的账号ID（断开后保留，用于记录游戏结果）
         self.mode: str = "none"  # 游戏模式
         self.config: Dict[str, Any] = {
             "max_players": 2,
@@ -35,26 +39,59 @@ class BaseGame(ABC):
         pass
 
     async def broadcast(self, data: Dict[str, Any], exclude: WebSocket = None) -> None:
-        """广播消息给所有连接"""
-        data_str = json.dumps(data)
+        """广播消息给所有连接（只序列化一次，并发发送给所有连接）"""
+        data_str = encode_message(data)
         # 使用字典键的副本进行遍历，避免并发修改问题
-        disconnected_websockets = []
-        for websocket in list(self.connections.keys()):
-            if websocket != exclude:
-                try:
-                    await websocket.send_text(data_str)
-                except (RuntimeError, Exception) as e:
-                    # 记录断开连接的websocket，稍后清理
-                    disconnected_websockets.append(websocket)
-                    print(f"广播消息失败: {e}")
-        
-        # 清理断开连接的websocket
-        for websocket in disconnected_websockets:
-            if websocket in self.connections:
-                player_id = self.connections[websocket]
-                del self.connections[websocket]
+        targets = [websocket for websocket in list(self.connections.keys()) if websocket != exclude]
+        stats = await fanout.send_all(targets, data_str, data.get("type"))
+        self._prune_connections(stats["dropped"])
+
+    def _prune_connections(self, websockets: List[WebSocket]) -> None:
+        """清理发送失败的websocket"""
+        for websocket in websockets:
+            player_id = self._unindex_connection(websocket)
+            if player_id is not None:
                 print(f"清理断开连接的WebSocket: 玩家 {player_id}")
 
+    def role_of(self, player_id: str) -> Optional[str]:
+        """玩家所属角色，用于按角色广播（子类可重写）"""
+        return None
+
+    def _index_connection(self, websocket: WebSocket, player_id: str) -> None:
+        """登记连接，同步维护 玩家->连接 和 角色->玩家 索引"""
+        self.connections[websocket] = player_id
+        self.player_sockets.setdefault(player_id, set()).add(websocket)
+        role = self.role_of(player_id)
+        if role:
+            self.role_players.setdefault(role, set()).add(player_id)
+
+    def _unindex_connection(self, websocket: WebSocket) -> Optional[str]:
+        """移除连接并更新索引，返回该连接对应的玩家ID"""
+        player_id = self.connections.pop(websocket, None)
+        if player_id is None:
+            return None
+        sockets = self.player_sockets.get(player_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                # 玩家的最后一个连接已断开
+                del self.player_sockets[player_id]
+                role = self.role_of(player_id)
+                if role and role in self.role_players:
+                    self.role_players[role].discard(player_id)
+        return player_id
+
+    def account_of(self, player_id: str) -> Optional[int]:
+        """玩家的账号ID，游客（未登录）返回None"""
+        player = self.players.get(player_id)
+        if player is not None and player.user_id is not None:
+            return player.user_id
+        return self.player_accounts.get(player_id)
+
+    def sockets_of(self, player_id: str) -> Set[WebSocket]:
+        """获取玩家的所有连接"""
+        return self.player_sockets.get(player_id, set())
+
     async def broadcast_state(self, extraMessage: Dict[str, Any] = None) -> None:
         """广播当前游戏状态"""
         state = {
@@ -72,15 +109,19 @@ class BaseGame(ABC):
     async def connect(self, websocket: WebSocket, player: Player) -> None:
         """玩家连接"""
         is_reconnect = player.id in self.disconnected_players
+        # 同一玩家在其他标签页已经连接，按重连处理（同步状态而不是重新加入）
+        is_extra_tab = player.id in self.player_sockets
         
         self.players[player.id] = player
-        self.connections[websocket] = player.id
+        self._index_connection(websocket, player.id)
+        if player.user_id is not None:
+            self.player_accounts[player.id] = player.user_id
         
         # 如果是重连，从断开连接集合中移除
         if is_reconnect:
             self.disconnected_players.remove(player.id)
         
-        if is_reconnect:
+        if is_reconnect or is_extra_tab:
             # 如果是重连，调用重连同步方法
             if hasattr(self, 'on_player_reconnect'):
                 await self.on_player_reconnect(player.id)
@@ -93,8 +134,10 @@ class BaseGame(ABC):
 
     async def disconnect(self, websocket: WebSocket) -> None:
         """玩家断开连接"""
-        player_id = self.connections.pop(websocket, None)
-        if player_id and player_id in self.players:
+        player_id = self._unindex_connection(websocket)
+        fanout.release(websocket)
+        # 玩家还有其他标签页在线时不视为离开
+        if player_id and player_id in self.players and player_id not in self.player_sockets:
             player = self.players.pop(player_id)
             # 添加到断开连接集合，用于重连检测
             self.disconnected_players.add(player_id)
@@ -117,11 +160,12 @@ class BaseGame(ABC):
         }
 
     async def broadcast_to_player(self, player_id: str, data: Dict[str, Any]) -> None:
-        """只向指定玩家广播消息"""
-        for websocket, pid in self.connections.items():
-            if pid == player_id:
-                await websocket.send_text(json.dumps(data))
-                break
+        """只向指定玩家广播消息（发送到该玩家的所有连接）"""
+        sockets = self.player_sockets.get(player_id)
+        if not sockets:
+            return
+        stats = await fanout.send_all(list(sockets), encode_message(data), data.get("type"))
+        self._prune_connections(stats["dropped"])
                 
     async def start_game(self) -> None:
         """开始游戏（默认实现，可在子类中重写）"""
@@ -9,11 +9,14 @@ from app.models.player import Player  # 使用绝对导入
 import random
 import httpx
 from datetime import datetime
-from app.database import get_db
+from app.services.game_result_pipeline import GameResult, game_results
+from app.services.player_stats import StatsKey, stats_key
 from app.models.user import User
-from .observers import SPHGameObserver
+from .observers import MBGameObserver
 
 class o3MBGame(RoundBaseGame):
+    game_type = "memorial_banquet"  # 游戏记录和统计中的游戏类型
+
     def __init__(self, room_id: str):
         super().__init__(room_id)
         self.scores: Dict[str, int] = {}  # playerId -> score
@@ -27,7 +30,7 @@ class o3MBGame(RoundBaseGame):
         self.cards: Dict[str, Dict] = {}  # cardId -> {number, imgUrl}
         
         # 初始化成就观察者
-        self.achievement_observer = SPHGameObserver(self)
+        self.achievement_observer = MBGameObserver(self)
         
         self.game_rules = {
             "allowSimultaneousActions": True,
@@ -45,7 +48,6 @@ class o3MBGame(RoundBaseGame):
         self.global_flipping_cards: Dict[str, List[str]] = {}  # playerId -> [cardIds]
         self.flip_start_times: Dict[str, float] = {}  # cardId -> start time
         self.current_flip_cards: List[str] = []  # 当前玩家翻开的卡牌列表
-        self.start_time = None  # 游戏开始时间
         self.preview_duration = 10  # 预览时长30秒
         self.pending_upgrade = None  # 待升级的卡牌对
 
@@ -65,6 +67,11 @@ class o3MBGame(RoundBaseGame):
             print("view_final_state处理观看终局页面请求")
             await self.send_final_state(player_id)
             return
+        
+        # 客户端版本落后，请求完整快照
+        if event.get("type") == "request_snapshot":
+            await self.send_state_snapshot(player_id)
+            return
             
         action = event.get("action")
         print(f"🎯 处理动作: {action}")
@@ -82,8 +89,9 @@ class o3MBGame(RoundBaseGame):
             })
 
     async def start_game(self, mode="single", total_rounds=1):
-        await super().start_game(mode, total_rounds)
+        # 先生成卡牌，保证开局的完整快照中就是本局的卡牌
         self.cards = self._init_cards()
+        await super().start_game(mode, total_rounds)
 
         # 不需要重新初始化 player_order，因为 super().start_game 已经初始化了
         # self.player_order = self._init_player_order()
@@ -105,13 +113,8 @@ class o3MBGame(RoundBaseGame):
         
         self.pending_upgrade = None
 
+        # 卡牌信息包含在游戏状态中，之后只同步变化的卡牌
         await self.broadcast_game_state()
-        
-        # 发送卡牌信息
-        await self.broadcast({
-            "type": "cards_sync",
-            "cards": self.cards
-        })
 
     def _init_cards(self):
         import random
@@ -348,7 +351,7 @@ class o3MBGame(RoundBaseGame):
         # 异步执行清理任务
         asyncio.create_task(cleanup_flip_state())
 
-    async def broadcast_game_state(self):
+    def build_game_state(self):
         game_info = {}
         for pid in self.player_order:
             game_info[pid] = {
@@ -364,15 +367,15 @@ class o3MBGame(RoundBaseGame):
             elapsed = 0
             is_preview = False
         
-        await self.broadcast({
-            "type": "game_state",
+        return {
             "state": self.state,
             "current_player": self.current_player,
             "round": self.round,
             "gameInfo": game_info,
+            "cards": self.cards,
             "isPreview": is_preview,
             "previewRemaining": max(0, self.preview_duration - elapsed)
-        })
+        }
 
     def is_game_finished(self) -> bool:
         # 累计错误次数到达17次或一位玩家的积分为0分则结束
@@ -404,12 +407,7 @@ class o3MBGame(RoundBaseGame):
                 "errorCounts": self.error_counts
             })
             
-            # 广播最新的卡牌数据
-            await self.broadcast({
-                "type": "cards_sync",
-                "cards": self.cards
-            })
-            
+            # 最新的卡牌数据随游戏状态补丁一起同步
             await self.broadcast_game_state()
             # 记录游戏结果
             await self.record_game_results(winner)
@@ -433,7 +431,8 @@ class o3MBGame(RoundBaseGame):
             print(f"玩家错误次数: {self.error_counts}")
             print(f"获胜者: {winner}")
             
-            # 为每个玩家记录游戏结果
+            # 为每个玩家构建游戏结果
+            results = []
             for player_id in self.player_order:
                 player_score = self.scores.get(player_id, 0)
                 player_error_count = self.error_counts.get(player_id, 0)
@@ -446,243 +445,34 @@ class o3MBGame(RoundBaseGame):
                 
                 print(f"🔄 处理玩家 {player_id} 的游戏记录: 得分 {player_score}, 错误次数 {player_error_count}, 准确率 {player_accuracy:.2f}%, 是否获胜 {is_winner}")
                 
-                # 直接与数据库交互记录游戏结果
-                session_id = await self.create_game_record_direct(player_id, player_score, player_accuracy, player_error_count, is_winner)
+                # 只记录握手时验证过身份的玩家，游客不写入数据库
+                user_id = self.account_of(player_id)
+                if user_id is None:
+                    print(f"⏭️ 玩家 {player_id} 未登录，跳过游戏记录")
+                    continue
                 
-                if session_id:
-                    print(f"✅ 玩家 {player_id} 的游戏记录创建成功，会话ID: {session_id}")
-                else:
-                    print(f"❌ 玩家 {player_id} 的游戏记录创建失败")
+                results.append(self._build_result(
+                    user_id, player_score, player_accuracy,
+                    rounds_played=player_error_count, rounds_total=17, is_winner=is_winner
+                ))
             
-            print(f"🎯 游戏结果记录完成，房间ID: {self.room_id}")
+            # 交给写后管道批量写入数据库，不等待写入完成
+            game_results.submit(results, self._on_results_persisted)
+            print(f"🎯 游戏结果已提交，房间ID: {self.room_id}")
             
         except Exception as e:
             print(f"❌ 记录游戏结果失败: {str(e)}")
             import traceback
             print(traceback.format_exc())
 
-    async def create_game_record_direct(self, player_id: str, score: int, accuracy: float, error_count: int, is_winner: bool):
-        """直接与数据库交互创建游戏记录，避免HTTP请求和认证问题"""
-        print(f"开始创建游戏记录: 玩家 {player_id}, 得分 {score}, 准确率 {accuracy:.2f}%")
-        session_id = None
-        try:
-            # if not player_id:
-            #     print(f"错误: 未获取玩家 {player_id} 的用户ID")
-            #     return None
-            
-            
-            # 直接使用数据库会话创建游戏记录
-            from app.database import get_db
-            from app.models.game_record import GameSession
-            
-            # 确保start_time不为None
-            if self.start_time is None:
-                print("警告: start_time未初始化，使用当前时间")
-                game_duration = 0
-                start_time = datetime.utcnow()
-            else:
-                game_duration = int((datetime.utcnow() - self.start_time).total_seconds())
-                start_time = self.start_time
-            
-            # 为MySQL DECIMAL类型做特殊处理
-            accuracy_decimal = round(accuracy, 2)
-            print(f"准备数据: user_id={player_id}, game_type=memorial_banquet, score={score}, accuracy={accuracy_decimal}, duration={game_duration}")
-            
-            # 在异步环境中使用数据库会话
-            db = None
-            try:
-                # 获取数据库会话
-                db = next(get_db())
-                print("数据库会话获取成功")
-                
-                # 创建游戏会话记录
-                game_session = GameSession(
-                    user_id=player_id,
-                    game_type="memorial_banquet",
-                    room_id=self.room_id,
-                    start_time=start_time,
-                    end_time=datetime.utcnow(),
-                    duration_seconds=game_duration,
-                    score=score,
-                    accuracy=accuracy_decimal,
-                    rounds_played=error_count,
-                    rounds_total=17,
-                    status="completed"
-                )
-                
-                print(f"准备添加游戏会话记录: {game_session.to_dict()}")
-                db.add(game_session)
-                
-                # 尝试提交事务
-                print("尝试提交数据库事务...")
-                db.commit()
-                print("数据库事务提交成功")
-                
-                # 刷新获取ID
-                db.refresh(game_session)
-                session_id = game_session.id
-                print(f"✓ 游戏记录直接创建成功: 玩家 {player_id}, 用户ID {player_id}, 得分 {score}, 会话ID: {session_id}")
-                
-                # 更新玩家统计信息
-                total_games = await self.update_player_stats_direct(player_id, "memorial_banquet", score, accuracy_decimal, game_duration)
-                
-                # 通知观察者游戏结束
-                game_data = {
-                    'user_id': player_id,
-                    'is_winner': is_winner,
-                    'total_games': total_games
-                }
-                await self.achievement_observer.on_game_finished(game_data)
-                
-            except Exception as db_error:
-                if db:
-                    print(f"❌ 数据库操作失败，执行回滚: {str(db_error)}")
-                    db.rollback()
-                else:
-                    print(f"❌ 数据库会话获取失败: {str(db_error)}")
-                # 尝试获取更多错误详情
-                import traceback
-                error_trace = traceback.format_exc()
-                print(f"错误详情: {error_trace}")
-                # 检查是否是精度类型错误
-                if "DECIMAL" in str(db_error) or "decimal" in str(db_error):
-                    print("⚠️ 可能是DECIMAL类型转换错误，请检查精度值")
-            finally:
-                if db:
-                    print("关闭数据库会话")
-                    db.close()
-                
-            return session_id  # 返回创建的会话ID
-                
-        except Exception as e:
-            print(f"❌ 创建游戏记录失败(外层异常): {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return None
-    
-    async def update_player_stats_direct(self, user_id: int, game_type: str, score: int, accuracy: float, duration: int):
-        """更新玩家统计信息并返回总游戏数"""
-        print(f"开始更新玩家统计: 用户ID {user_id}, 游戏类型 {game_type}, 最新得分 {score}, 最新准确率 {accuracy:.2f}%")
-        total_games = 0
-        try:
-            from app.database import get_db
-            from app.models.game_record import PlayerStats, GameSession
-            from sqlalchemy import func
-            
-            # 为MySQL DECIMAL类型做特殊处理
-            accuracy_decimal = round(accuracy, 2)
-            print(f"处理后的精度值: {accuracy_decimal}")
-            
-            # 在异步环境中使用数据库会话
-            db = None
-            try:
-                # 获取数据库会话
-                db = next(get_db())
-                print("统计更新: 数据库会话获取成功")
-                
-                total_games = db.query(func.count(GameSession.id)).filter(
-                    GameSession.user_id == user_id,
-                    GameSession.game_type == game_type
-                ).scalar() or 0
-                print(f"用户 {user_id} 的总游戏数: {total_games}")
-                
-                # 查询现有统计信息
-                print(f"尝试查找现有统计记录: 用户ID={user_id}, 游戏类型={game_type}")
-                existing_stats = db.query(PlayerStats).filter(
-                    PlayerStats.user_id == user_id,
-                    PlayerStats.game_type == game_type
-                ).first()
-                
-                if existing_stats:
-                    print(f"找到现有统计记录: {existing_stats.to_dict()}")
-                else:
-                    print("未找到现有统计记录，准备创建新记录")
-                
-                # 计算最新的统计数据
-                print("计算最新统计数据...")
-                stats_result = db.query(
-                    func.count(GameSession.id).label('total_games'),
-                    func.sum(GameSession.score).label('total_score'),
-                    func.avg(GameSession.score).label('average_score'),
-                    func.max(GameSession.score).label('best_score'),
-                    func.avg(GameSession.accuracy).label('average_accuracy'),
-                    func.sum(GameSession.duration_seconds).label('total_play_time'),
-                    func.max(GameSession.end_time).label('last_played')
-                ).filter(
-                    GameSession.user_id == user_id,
-                    GameSession.game_type == game_type
-                ).first()
-                
-                # 准备统计数据，确保所有值都有默认值
-                total_games = stats_result.total_games or 0
-                total_score = stats_result.total_score or 0
-                average_score = float(stats_result.average_score or 0)
-                average_score_rounded = round(average_score, 2)
-                best_score = stats_result.best_score or 0
-                average_accuracy = float(stats_result.average_accuracy or 0)
-                average_accuracy_rounded = round(average_accuracy, 2)
-                total_play_time = stats_result.total_play_time or 0
-                last_played = stats_result.last_played or datetime.utcnow()
-                
-                print(f"计算结果: 总游戏数={total_games}, 总得分={total_score}, 平均得分={average_score_rounded}, 最高得分={best_score}, 平均准确率={average_accuracy_rounded}%")
-                
-                if existing_stats:
-                    # 更新现有统计
-                    print("更新现有统计记录...")
-                    existing_stats.total_games = total_games
-                    existing_stats.total_score = total_score
-                    existing_stats.average_score = average_score_rounded  # 四舍五入到2位小数
-                    existing_stats.best_score = best_score
-                    existing_stats.average_accuracy = average_accuracy_rounded  # 四舍五入到2位小数
-                    existing_stats.total_play_time_seconds = total_play_time
-                    existing_stats.last_played = last_played
-                    existing_stats.updated_at = datetime.utcnow()
-                else:
-                    # 创建新的统计记录
-                    print("创建新的统计记录...")
-                    new_stats = PlayerStats(
-                        user_id=user_id,
-                        game_type=game_type,
-                        total_games=total_games,
-                        total_score=total_score,
-                        average_score=average_score_rounded,  # 四舍五入到2位小数
-                        best_score=best_score,
-                        average_accuracy=average_accuracy_rounded,  # 四舍五入到2位小数
-                        total_play_time_seconds=total_play_time,
-                        last_played=last_played,
-                        updated_at=datetime.utcnow()
-                    )
-                    print(f"新统计记录数据: {new_stats.to_dict()}")
-                    db.add(new_stats)
-                
-                print("尝试提交统计更新事务...")
-                db.commit()
-                print(f"✅ 玩家统计信息更新成功: 用户ID {user_id}, 游戏类型 {game_type}")
-                
-            except Exception as db_error:
-                if db:
-                    print(f"❌ 更新玩家统计失败，执行回滚: {str(db_error)}")
-                    db.rollback()
-                else:
-                    print(f"❌ 统计更新: 数据库会话获取失败: {str(db_error)}")
-                # 尝试获取更多错误详情
-                import traceback
-                error_trace = traceback.format_exc()
-                print(f"统计更新错误详情: {error_trace}")
-                # 检查是否是精度类型错误
-                if "DECIMAL" in str(db_error) or "decimal" in str(db_error):
-                    print("⚠️ 统计更新: 可能是DECIMAL类型转换错误，请检查精度值")
-            finally:
-                if db:
-                    print("统计更新: 关闭数据库会话")
-                    db.close()
-                
-        except Exception as e:
-            print(f"❌ 更新玩家统计失败(外层异常): {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-        return total_games
-
+    async def _on_results_persisted(self, results: List[GameResult], total_games: Dict[StatsKey, int]):
+        """游戏记录和玩家统计提交后，判定全房间玩家的成就"""
+        await self.achievement_observer.on_room_finished([{
+            'user_id': result.user_id,
+            'is_winner': result.is_winner,
+            'total_games': total_games.get(stats_key(result), 0),
+            'score': result.score
+        } for result in results])
 
     async def send_final_state(self, player_id: str):
         """发送终局状态数据给指定玩家"""
@@ -755,14 +545,8 @@ class o3MBGame(RoundBaseGame):
 
     async def on_player_reconnect(self, player_id: str):
         """处理玩家重连，发送完整状态同步"""
-        # 发送完整的游戏状态
-        await self.broadcast_game_state()
-        
-        # 发送当前所有卡牌状态
-        await self.broadcast_to_player(player_id, {
-            "type": "cards_sync",
-            "cards": self.cards
-        })
+        # 发送完整的游戏状态快照（包含所有卡牌）
+        await self.send_state_snapshot(player_id)
         
         # 发送卡牌瞬态翻转状态
         flip_status = await self.get_card_flip_status()
@@ -1,8 +1,9 @@
-import json
 import time
 from typing import Dict, Any, List
 from fastapi import WebSocket
 from .base import BaseGame
+from app.utils.fanout import fanout
+from app.utils.encoding import encode_message
 from app.models.player import Player
 
 class QuizGame(BaseGame):
@@ -17,9 +18,10 @@ class QuizGame(BaseGame):
         self.current_round: int = 1  # 当前轮次
         self.total_rounds: int = 1  # 总轮次
         self.reconnect_timeout: int = 5  # 重连超时时间（秒）
-        self.config: Dict[str, Any] = {
+        # 保留基类的 max_players/min_players，大厅列表和房间信息依赖这两项
+        self.config.update({
             "expose_answer": False  # 答案是否对其他答题者可见
-        }
+        })
 
     async def handle_event(self, websocket: WebSocket, event: Dict[str, Any], player_id: str) -> None:
         """处理答题游戏特有事件"""
@@ -67,7 +69,7 @@ class QuizGame(BaseGame):
             "clientRequestTime": event.get("clientRequestTime")  # 回传前端请求时的时间
         }
         # 3. 仅向发起同步的前端返回响应
-        await websocket.send_text(json.dumps(sync_response))
+        await fanout.send(websocket, encode_message(sync_response), "time_sync_response")
 
     async def update_rules(self, settings):
         # 暂时只处理模式变更
@@ -155,14 +157,16 @@ class QuizGame(BaseGame):
         if not self.config["expose_answer"]:
             player_msg["text"] = "[Hidden]"
 
-        # 发送消息
-        for conn, pid in self.connections.items():
-            if pid.startswith("questioner-"):
-                await conn.send_text(json.dumps(questioner_msg))
-            elif pid == player_id:
-                await conn.send_text(json.dumps(questioner_msg))
-            else:
-                await conn.send_text(json.dumps(player_msg))
+        # 提问者和答题者本人看到完整答案，其他答题者按 expose_answer 设置
+        privileged = self.role_players.get("questioner", set()) | {player_id}
+        privileged_targets = [conn for pid in privileged for conn in self.sockets_of(pid)]
+        other_targets = [conn for conn, pid in self.connections.items() if pid not in privileged]
+
+        # 两种消息各序列化一次，按接收者复用
+        stats = await fanout.send_all(privileged_targets, encode_message(questioner_msg), "answer")
+        self._prune_connections(stats["dropped"])
+        stats = await fanout.send_all(other_targets, encode_message(player_msg), "answer")
+        self._prune_connections(stats["dropped"])
 
     async def _handle_judgement(self, event: Dict[str, Any]) -> None:
         judgement_results = event.get("results", {})
@@ -210,12 +214,12 @@ class QuizGame(BaseGame):
                 "timestamp": p.timestamp  # 毫秒级时间戳
             }
             for p in self.players.values()
-            if not p.id.startswith("questioner-")
+            if self.role_of(p.id) != "questioner"
         ]
-        await websocket.send_text(json.dumps({
+        await fanout.send(websocket, encode_message({
             "type": "latest_answers",
             "latest_answers": latest_answers
-        }))
+        }), "latest_answers")
 
     # 新增：处理重连超时时间变更
     async def _handle_timeout_change(self, event: Dict[str, Any]) -> None:
@@ -273,7 +277,7 @@ class QuizGame(BaseGame):
                     "lives": p.content["survival"]["lives"]
                 }
                 for p in self.players.values()
-                if not p.id.startswith("questioner-")  # 排除提问者
+                if self.role_of(p.id) != "questioner"  # 排除提问者
             ]
         })
 
@@ -284,22 +288,25 @@ class QuizGame(BaseGame):
             "players": [self._format_player(p) for p in self.players.values()]
         })
 
-    async def broadcast(self, data: Dict[str, Any], exclude: WebSocket = None) -> None:
-        """广播消息给所有连接"""
-        data_str = json.dumps(data)
-        for websocket in self.connections:
-            if websocket != exclude:
-                await websocket.send_text(data_str)
-
     async def broadcast_to_roles(self, data: Dict[str, Any], roles: List[str] = ["questioner", "player"]) -> None:
         """向指定角色广播消息（提问者/答题者）"""
-        data_str = json.dumps(data)
-        for conn, pid in self.connections.items():
-            if (
-                ("questioner" in roles and pid.startswith("questioner-")) or
-                ("player" in roles and pid.startswith("user-"))
-            ):
-                await conn.send_text(data_str)
+        data_str = encode_message(data)
+        targets = [
+            conn
+            for role in roles
+            for pid in self.role_players.get(role, ())
+            for conn in self.sockets_of(pid)
+        ]
+        stats = await fanout.send_all(targets, data_str, data.get("type"))
+        self._prune_connections(stats["dropped"])
+
+    def role_of(self, player_id: str):
+        """根据玩家ID前缀判断角色，只在建立连接时计算一次"""
+        if player_id.startswith("questioner-"):
+            return "questioner"
+        if player_id.startswith("user-"):
+            return "player"
+        return None
 
     def _format_player(self, player: Player) -> Dict[str, Any]:
         """格式化玩家信息"""
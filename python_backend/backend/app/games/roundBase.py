@@ -1,12 +1,17 @@
 import json
 import time
-from typing import Dict, Any, List, override
+from datetime import datetime
+from typing import Dict, Any, List, Optional, override
 from fastapi import WebSocket
 from .base import BaseGame
+from .state_sync import StateSync
 from app.models.player import Player
+from app.services.game_result_pipeline import GameResult
 
 class RoundBaseGame(BaseGame):
     """通用回合制游戏基类，包含回合状态机和轮次管理"""
+    game_type: str = ""  # 游戏记录和统计中的游戏类型，由子类设置
+
     def __init__(self, room_id: str):
         super().__init__(room_id)
         self.state = "init"  # 游戏状态: init/player_turn/checking_end/finished
@@ -15,6 +20,8 @@ class RoundBaseGame(BaseGame):
         self.total_rounds = 1
         self.mode = "single"  # 或 "double"
         self.player_order: List[str] = []
+        self.state_sync = StateSync()  # game_state 版本化差量同步
+        self.start_time: Optional[datetime] = None  # 本局开始时间
 
     async def start_game(self, mode="single", total_rounds=1):
         self.state = "player_turn"
@@ -23,6 +30,8 @@ class RoundBaseGame(BaseGame):
         self.round = 1
         self.player_order = self._init_player_order()
         self.current_player = self.player_order[0]
+        # 新一局从完整快照开始同步
+        self.state_sync.reset()
         # 广播游戏状态
         await self.broadcast_game_state()
 
@@ -36,7 +45,9 @@ class RoundBaseGame(BaseGame):
 
     async def handle_event(self, websocket: WebSocket,event: Dict[str, Any], player_id: str) -> None:
         """处理游戏事件"""
-        if event.get('type') == "action":
+        if event.get('type') == "request_snapshot":
+            await self.send_state_snapshot(player_id)
+        elif event.get('type') == "action":
             action = event.get("action")
             await self.handle_player_action(player_id, action)
 
@@ -72,14 +83,49 @@ class RoundBaseGame(BaseGame):
         """判断游戏是否结束，子类可重写"""
         return False
 
-    async def broadcast_game_state(self):
-        await self.broadcast({
-            "type": "game_state",
+    def build_game_state(self) -> Dict[str, Any]:
+        """构造同步给客户端的游戏状态（不含type和version），子类可重写"""
+        return {
             "state": self.state,
             "current_player": self.current_player,
             "round": self.round,
             "total_rounds": self.total_rounds
-        })
+        }
+
+    async def broadcast_game_state(self):
+        """广播游戏状态：首次发送完整快照，之后只发送变化的字段"""
+        message = self.state_sync.update(self.build_game_state())
+        if message:
+            await self.broadcast(message)
+
+    async def send_state_snapshot(self, player_id: str):
+        """向指定玩家发送当前版本的完整快照（重连或客户端版本落后时）"""
+        # 先把尚未广播的变化同步给其他玩家，保证所有人的版本一致
+        await self.broadcast_game_state()
+        snapshot = self.state_sync.full_message()
+        if snapshot:
+            await self.broadcast_to_player(player_id, snapshot)
+
+    def _build_result(self, user_id: int, score: int, accuracy: float, **extra) -> GameResult:
+        """构建单个玩家的游戏结果，游戏类型取自 game_type"""
+        end_time = datetime.utcnow()
+        # 确保start_time不为None
+        if self.start_time is None:
+            print("警告: start_time未初始化，使用当前时间")
+            start_time = end_time
+        else:
+            start_time = self.start_time
+        return GameResult(
+            user_id=user_id,
+            game_type=self.game_type,
+            room_id=self.room_id,
+            start_time=start_time,
+            end_time=end_time,
+            duration_seconds=int((end_time - start_time).total_seconds()),
+            score=score,
+            accuracy=accuracy,
+            **extra
+        )
 
     @override
     async def update_rules(self, rules: Dict[str, Any]) -> None:
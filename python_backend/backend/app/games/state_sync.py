@@ -0,0 +1,105 @@
+"""版本化的游戏状态差量同步
+
+每次广播只发送与上一版本相比变化的字段（JSON Merge Patch, RFC 7386 语义）：
+- 字典逐层比较，只保留变化的键
+- 被删除的键在补丁中为 None
+- 其他类型（列表、数值、字符串）整体替换
+
+合并补丁中 None 表示删除，无法表达"值变为 None"，这种变化改为发送完整快照。
+客户端版本号与补丁的 base_version 不一致（丢包、重连）时，
+发送 {"type": "request_snapshot"} 请求完整快照。
+"""
+from typing import Any, Dict, Optional
+
+
+def _clone(value: Any) -> Any:
+    """复制JSON结构，避免保存的快照被游戏逻辑原地修改"""
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+def merge_diff(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """计算从 old 到 new 的合并补丁
+
+    有字段新增为 None 或变为 None 时补丁无法表达，返回 None
+    """
+    patch: Dict[str, Any] = {}
+    for key, value in new.items():
+        if value is None and (key not in old or old[key] is not None):
+            return None
+        if key not in old:
+            patch[key] = _clone(value)
+            continue
+        old_value = old[key]
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            sub_patch = merge_diff(old_value, value)
+            if sub_patch is None:
+                return None
+            if sub_patch:
+                patch[key] = sub_patch
+        elif old_value != value:
+            patch[key] = _clone(value)
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    return patch
+
+
+def apply_patch(target: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """把合并补丁应用到 target 上（返回新对象，供测试和服务端校验使用）"""
+    result = dict(target)
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        elif isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = apply_patch(result[key], value)
+        else:
+            result[key] = _clone(value)
+    return result
+
+
+class StateSync:
+    """维护最近一次广播的状态快照和单调递增的版本号"""
+    def __init__(self):
+        self.version = 0
+        self.snapshot: Optional[Dict[str, Any]] = None
+
+    def reset(self) -> None:
+        """新一局开始时调用，下一次广播发送完整快照"""
+        self.snapshot = None
+
+    def update(self, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """记录新状态并返回需要广播的消息，状态无变化时返回 None"""
+        if self.snapshot is None:
+            self.version += 1
+            self.snapshot = _clone(state)
+            return self.full_message()
+
+        patch = merge_diff(self.snapshot, state)
+        if patch is None:
+            # 补丁无法表达的变化，发送完整快照
+            self.version += 1
+            self.snapshot = _clone(state)
+            return self.full_message()
+        if not patch:
+            return None
+        self.version += 1
+        self.snapshot = _clone(state)
+        return {
+            "type": "game_state_patch",
+            "version": self.version,
+            "base_version": self.version - 1,
+            "patch": patch
+        }
+
+    def full_message(self) -> Optional[Dict[str, Any]]:
+        """当前版本的完整快照消息，用于首次同步、重连和客户端请求"""
+        if self.snapshot is None:
+            return None
+        message = {"type": "game_state"}
+        message.update(self.snapshot)
+        message["version"] = self.version
+        return message
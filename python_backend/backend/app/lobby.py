@@ -0,0 +1,66 @@
+"""大厅推送
+
+浏览大厅的客户端连接 /ws/lobby/{game_type}，连接时收到一次完整快照，
+之后只接收房间注册表发出的增量事件：
+- room_created  {"type": "room_created", "room": 条目}
+- room_updated  {"type": "room_updated", "room": 条目}
+- room_destroyed {"type": "room_destroyed", "room_id": 房间ID}
+每条事件只序列化一次，放入各订阅连接的出站队列。
+增量事件不能丢弃或合并，订阅连接的出站队列满时直接断开，客户端重连后重新获取快照。
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from .room_registry import RoomRegistry
+from .utils.encoding import encode_message
+from .utils.fanout import fanout
+
+
+class LobbyHub:
+    """按游戏类型管理大厅订阅连接"""
+    def __init__(self, registry: RoomRegistry):
+        self.registry = registry
+        self.subscribers: Dict[str, Set[WebSocket]] = {}  # game_type -> 订阅连接
+        registry.add_listener(self._on_room_event)
+
+    def subscribe(self, websocket: WebSocket, game_type: str) -> None:
+        """订阅大厅并发送快照
+
+        快照入队和加入订阅集合之间没有 await，不会漏掉或重复事件
+        """
+        fanout.attach(websocket, policy="disconnect")
+        snapshot = {
+            "type": "lobby_snapshot",
+            "game_type": game_type,
+            "rooms": self.registry.entries(game_type)
+        }
+        fanout.enqueue_all([websocket], encode_message(snapshot), "lobby_snapshot")
+        self.subscribers.setdefault(game_type, set()).add(websocket)
+
+    async def unsubscribe(self, websocket: WebSocket, game_type: str) -> None:
+        subscribers = self.subscribers.get(game_type)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del self.subscribers[game_type]
+        await fanout.detach(websocket)
+
+    def subscriber_count(self, game_type: Optional[str] = None) -> int:
+        if game_type is not None:
+            return len(self.subscribers.get(game_type, ()))
+        return sum(len(s) for s in self.subscribers.values())
+
+    def _on_room_event(self, event: str, game_type: str, room_id: str, entry: Optional[Dict[str, Any]], remote: bool = False) -> None:
+        subscribers = self.subscribers.get(game_type)
+        if not subscribers:
+            return
+        if event == "destroyed":
+            message = {"type": "room_destroyed", "room_id": room_id}
+        else:
+            message = {"type": f"room_{event}", "room": entry}
+        dropped = fanout.enqueue_all(list(subscribers), encode_message(message), message["type"])
+        for websocket in dropped:
+            # 出站队列已关闭，接收循环会随后调用 unsubscribe
+            subscribers.discard(websocket)
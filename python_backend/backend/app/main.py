@@ -1,16 +1,33 @@
+from contextlib import asynccontextmanager
+from .readiness import readiness  # 最先导入，记录冷启动起点
 from fastapi import FastAPI
-from .routes import router as websocket_router  # 使用相对导入
+from fastapi.responses import JSONResponse
+from .routes import router as websocket_router, start_cluster, stop_cluster  # 使用相对导入
 from .auth_routes import router as auth_router  # 新增认证路由
 from .game_record_routes import router as game_record_router  # 新增游戏记录路由
 from .achievement_routes import router as achievement_router  # 新增成就路由
 from fastapi.middleware.cors import CORSMiddleware
-from .database import create_tables  # 新增数据库初始化
+from .services.game_result_pipeline import game_results
+from .utils.password_pool import password_pool
+from .database import pool_metrics
+from .utils.process_metrics import process_snapshot
 import os
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 集群模式下启动/停止集群节点（单进程模式不做任何事）
+    await start_cluster()
+    # 游戏结果写后管道，关闭时写入（或暂存）剩余结果
+    game_results.start()
+    # 数据库连通检查、建表和成就目录加载在后台进行，不阻塞启动
+    readiness.start()
+    yield
+    await readiness.stop()
+    await game_results.stop()
+    password_pool.shutdown()
+    await stop_cluster()
 
-# 初始化数据库表
-create_tables()
+app = FastAPI(lifespan=lifespan)
 
 # 从环境变量读取允许的源，支持多个域名用逗号分隔
 allowed_origins_env = os.getenv('ALLOWED_ORIGINS', '').strip()
@@ -36,6 +53,27 @@ app.include_router(auth_router)
 app.include_router(game_record_router)
 app.include_router(achievement_router)
 
+# 存活检查
+@app.get("/api/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+# 就绪检查：数据库、表结构和成就目录都准备好之前返回503
+@app.get("/api/health/ready")
+async def health_ready():
+    report = readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+# 数据库连接池指标：取连接耗时、等待/超时次数、溢出连接使用情况
+@app.get("/api/metrics/db-pool")
+async def db_pool_metrics():
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+# 进程CPU时间和内存占用，负载测试（loadtest）按前后采样计算CPU使用率
+@app.get("/api/metrics/process")
+async def process_metrics():
+    return process_snapshot()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
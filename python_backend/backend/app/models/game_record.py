@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, DECIMAL, Boolean, ForeignKey, Text, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, DECIMAL, Boolean, ForeignKey, Text, BigInteger, Index
 from datetime import datetime
 from . import Base
 
@@ -18,8 +18,21 @@ class GameSession(Base):
     rounds_played = Column(Integer, default=0)  # 完成的回合数
     rounds_total = Column(Integer, default=0)  # 总回合数
     status = Column(String(20), default="completed")  # 游戏状态
+    result_id = Column(String(32), nullable=True)  # 写后管道生成的结果ID，重放暂存文件时去重（V008）
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # 热点查询的复合索引（见 migrations/V007，执行计划检查见 migrations/check_query_plans.py）
+    __table_args__ = (
+        # 按玩家+游戏类型计数、胜利次数（status、score>0）统计，索引覆盖查询
+        Index("ix_game_sessions_user_type_status_score", "user_id", "game_type", "status", "score"),
+        # 玩家游戏记录列表：按游戏类型筛选并按开始时间倒序分页
+        Index("ix_game_sessions_user_type_start", "user_id", "game_type", "start_time"),
+        # 玩家游戏记录列表：不筛选游戏类型
+        Index("ix_game_sessions_user_start", "user_id", "start_time"),
+        # 写后管道的结果ID（V008），暂存文件重放时跳过已写入的结果
+        Index("ux_game_sessions_result_id", "result_id", unique=True),
+    )
+
     def to_dict(self):
         """转换为字典格式，确保时间戳包含UTC时区标识"""
         return {
@@ -79,6 +92,7 @@ class PlayerStats(Base):
     average_score = Column(DECIMAL(10, 2), default=0.00)  # 平均得分
     best_score = Column(Integer, default=0)  # 最高得分
     average_accuracy = Column(DECIMAL(5, 2), default=0.00)  # 平均准确率
+    total_accuracy = Column(DECIMAL(14, 2), default=0.00)  # 准确率累计，用于增量计算平均准确率
     total_play_time_seconds = Column(BigInteger, default=0)  # 总游戏时长(秒)
     last_played = Column(DateTime, nullable=True)  # 最后游戏时间
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
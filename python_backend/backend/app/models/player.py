@@ -1,9 +1,13 @@
+from typing import Optional
+
+
 class Player:
     """玩家模型"""
-    def __init__(self, id: str, name: str, avatar: str):
+    def __init__(self, id: str, name: str, avatar: str, user_id: Optional[int] = None):
         self.id = id
         self.name = name
         self.avatar = avatar
+        self.user_id = user_id  # WebSocket握手时验证过的账号ID，游客为None
         self.submitted_answer: str = ""
         self.timestamp: str = ""
         # 初始化游戏数据
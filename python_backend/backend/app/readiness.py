@@ -0,0 +1,131 @@
+"""启动预热与就绪状态
+
+导入模块和 lifespan 启动都不访问数据库，worker 立即开始接受 WebSocket 连接。
+数据库连通检查、建表（SCHEMA_BOOTSTRAP=on 时）和成就目录加载放在后台任务中，
+失败后每隔 WARMUP_RETRY_SECONDS 秒重试。
+
+- /api/health/live：进程存活即返回 200
+- /api/health/ready：后台预热全部完成前返回 503，供负载均衡/编排系统判断是否接入流量
+
+冷启动耗时（模块导入到第一个 WebSocket 被接受）记录在就绪报告中，
+超过 COLD_START_TARGET_MS 时打印告警。
+"""
+import time
+
+# 本模块由 main.py 最先导入，以此作为冷启动的起点（在导入其他模块之前记录）
+PROCESS_STARTED = time.perf_counter()
+
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from . import database
+from .services.achievement_catalog import achievement_catalog
+
+# 启动时是否用 create_all 建表（生产环境使用 migrations/ 管理表结构时可关闭）
+SCHEMA_BOOTSTRAP = os.getenv('SCHEMA_BOOTSTRAP', 'on').lower() == 'on'
+# 预热失败后的重试间隔（秒）和单次数据库连接的超时（秒）
+WARMUP_RETRY_SECONDS = float(os.getenv('WARMUP_RETRY_SECONDS', '5'))
+DB_CONNECT_TIMEOUT = float(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+# 冷启动目标（毫秒）
+COLD_START_TARGET_MS = float(os.getenv('COLD_START_TARGET_MS', '1500'))
+
+
+def _elapsed_ms() -> float:
+    return round((time.perf_counter() - PROCESS_STARTED) * 1000, 1)
+
+
+class Readiness:
+    """后台预热任务和就绪状态"""
+    def __init__(self, schema_bootstrap: bool = SCHEMA_BOOTSTRAP, retry_seconds: float = WARMUP_RETRY_SECONDS):
+        self.schema_bootstrap = schema_bootstrap
+        self.retry_seconds = retry_seconds
+        self.checks: Dict[str, bool] = {
+            "database": False,
+            "schema": not schema_bootstrap,
+            "achievement_catalog": False
+        }
+        self.errors: Dict[str, str] = {}
+        self.accepting_ms: Optional[float] = None  # lifespan 启动完成，开始接受连接
+        self.first_websocket_ms: Optional[float] = None
+        self.ready_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return all(self.checks.values())
+
+    def start(self) -> None:
+        """开始接受连接，并在后台预热"""
+        self.accepting_ms = _elapsed_ms()
+        print(f"🚀 启动完成，开始接受连接: {self.accepting_ms}ms")
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.warm_up())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def mark_websocket_accepted(self) -> None:
+        """记录冷启动后第一个被接受的 WebSocket"""
+        if self.first_websocket_ms is not None:
+            return
+        self.first_websocket_ms = _elapsed_ms()
+        if self.first_websocket_ms > COLD_START_TARGET_MS:
+            print(f"⚠️ 冷启动到第一个WebSocket耗时 {self.first_websocket_ms}ms，超过目标 {COLD_START_TARGET_MS}ms")
+        else:
+            print(f"✅ 冷启动到第一个WebSocket耗时 {self.first_websocket_ms}ms")
+
+    async def warm_up(self) -> None:
+        """依次完成各项检查，失败的检查在重试间隔后重新执行"""
+        while True:
+            await self._check("database", self._ping)
+            if self.checks["database"]:
+                await self._check("schema", database.create_tables_async)
+                await self._check("achievement_catalog", achievement_catalog.load)
+            if self.ready:
+                self.ready_ms = _elapsed_ms()
+                print(f"✅ 服务就绪: {self.ready_ms}ms")
+                return
+            await asyncio.sleep(self.retry_seconds)
+
+    async def _check(self, name: str, func) -> None:
+        if self.checks[name]:
+            return
+        try:
+            await func()
+            self.checks[name] = True
+            self.errors.pop(name, None)
+        except Exception as e:
+            self.errors[name] = repr(e)
+            print(f"⚠️ 启动检查 {name} 失败，{self.retry_seconds}秒后重试: {e!r}")
+
+    async def _ping(self) -> None:
+        async def ping():
+            async with database.async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        await asyncio.wait_for(ping(), DB_CONNECT_TIMEOUT)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "checks": dict(self.checks),
+            "errors": dict(self.errors),
+            "cold_start": {
+                "accepting_ms": self.accepting_ms,
+                "first_websocket_ms": self.first_websocket_ms,
+                "ready_ms": self.ready_ms,
+                "target_ms": COLD_START_TARGET_MS
+            }
+        }
+
+
+# 全局就绪状态
+readiness = Readiness()
@@ -0,0 +1,248 @@
+"""房间注册表
+
+集中管理所有房间，维护以下索引：
+- 全局 room_id 索引：按ID查找房间不需要遍历所有游戏类型
+- 按游戏类型、按状态的有序索引：支持游标分页
+- 大厅条目缓存：房间变化时增量更新，获取房间列表只需 O(分页大小)
+
+集群模式下，其他worker拥有的房间只有大厅条目（remote），没有Room对象。
+"""
+from __future__ import annotations
+from bisect import bisect_right
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .rooms import Room
+
+# 房间列表默认/最大分页大小
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class _OrderedIndex:
+    """按加入顺序排列的房间ID索引
+
+    删除只留下墓碑，墓碑过多时再整体压缩，保证分页时跳过的墓碑数量有上限。
+    """
+    def __init__(self):
+        self.seqs: List[int] = []  # 递增的序号列表（含墓碑）
+        self.seq_to_id: Dict[int, str] = {}
+        self.id_to_seq: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.id_to_seq)
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self.id_to_seq
+
+    def add(self, room_id: str, seq: int) -> None:
+        self.seqs.append(seq)
+        self.seq_to_id[seq] = room_id
+        self.id_to_seq[room_id] = seq
+
+    def discard(self, room_id: str) -> None:
+        seq = self.id_to_seq.pop(room_id, None)
+        if seq is None:
+            return
+        del self.seq_to_id[seq]
+        if len(self.seqs) > 2 * len(self.seq_to_id) + 32:
+            self.seqs = [s for s in self.seqs if s in self.seq_to_id]
+
+    def page(self, cursor: Optional[int], limit: int) -> Tuple[List[str], Optional[int]]:
+        """返回游标之后的最多 limit 个房间ID，以及下一页游标（没有下一页时为None）"""
+        start = bisect_right(self.seqs, cursor) if cursor is not None else 0
+        room_ids: List[str] = []
+        last_seq: Optional[int] = None
+        i = start
+        while i < len(self.seqs) and len(room_ids) < limit:
+            seq = self.seqs[i]
+            room_id = self.seq_to_id.get(seq)
+            if room_id is not None:
+                room_ids.append(room_id)
+                last_seq = seq
+            i += 1
+        # 检查后面是否还有未删除的房间
+        while i < len(self.seqs) and self.seqs[i] not in self.seq_to_id:
+            i += 1
+        return room_ids, (last_seq if i < len(self.seqs) else None)
+
+
+class RoomRegistry:
+    """房间注册表，替代原来的 {game_type: {room_id: Room}} 嵌套字典"""
+    def __init__(self):
+        self._rooms: Dict[str, Room] = {}  # room_id -> Room（全局索引）
+        self._by_type: Dict[str, _OrderedIndex] = {}  # game_type -> 有序索引
+        self._by_status: Dict[Tuple[str, str], _OrderedIndex] = {}  # (game_type, status) -> 有序索引
+        self._entries: Dict[str, Dict[str, Any]] = {}  # room_id -> 大厅条目缓存
+        self._remote: Dict[str, str] = {}  # room_id -> game_type（集群中其他worker拥有的房间）
+        self._seq = count(1)
+        self._listeners: List[Callable[..., Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._rooms) + len(self._remote)
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self._rooms or room_id in self._remote
+
+    def __iter__(self) -> Iterator[Room]:
+        return iter(list(self._rooms.values()))
+
+    def get(self, room_id: str, game_type: Optional[str] = None) -> Optional[Room]:
+        """按ID查找本worker的房间，指定游戏类型时类型不匹配视为不存在"""
+        room = self._rooms.get(room_id)
+        if room is None or (game_type is not None and room.gameType != game_type):
+            return None
+        return room
+
+    def add(self, room: Room) -> Room:
+        """注册房间，并在房间状态变化时自动更新索引和缓存"""
+        if room.room_id in self:
+            raise ValueError(f"房间 {room.room_id} 已存在")
+        self._rooms[room.room_id] = room
+        entry = self.format_entry(room)
+        self._insert_entry(room.gameType, room.room_id, entry)
+        room.on_change(self.refresh)
+        self._emit("created", room.gameType, room.room_id, entry)
+        return room
+
+    def remove(self, room: Room) -> bool:
+        """注销房间，房间已被替换或不存在时返回False"""
+        if self._rooms.get(room.room_id) is not room:
+            return False
+        del self._rooms[room.room_id]
+        self._delete_entry(room.gameType, room.room_id)
+        self._emit("destroyed", room.gameType, room.room_id, None)
+        return True
+
+    def refresh(self, room: Room) -> None:
+        """房间状态变化时重新生成大厅条目，只有条目真正变化时才通知监听者"""
+        if self._rooms.get(room.room_id) is not room:
+            return
+        entry = self.format_entry(room)
+        if self._update_entry(room.gameType, room.room_id, entry):
+            self._emit("updated", room.gameType, room.room_id, entry)
+
+    def is_remote(self, room_id: str) -> bool:
+        """房间是否由集群中的其他worker拥有"""
+        return room_id in self._remote
+
+    def game_type_of(self, room_id: str) -> Optional[str]:
+        room = self._rooms.get(room_id)
+        if room is not None:
+            return room.gameType
+        return self._remote.get(room_id)
+
+    def apply_remote(self, event: str, game_type: str, room_id: str, entry: Optional[Dict[str, Any]]) -> None:
+        """应用其他worker发来的房间事件，只维护大厅条目"""
+        if room_id in self._rooms:
+            return
+        if event == "destroyed":
+            if self._remote.pop(room_id, None) is not None:
+                self._delete_entry(game_type, room_id)
+                self._emit("destroyed", game_type, room_id, None, remote=True)
+        elif room_id not in self._remote:
+            self._remote[room_id] = game_type
+            self._insert_entry(game_type, room_id, entry)
+            self._emit("created", game_type, room_id, entry, remote=True)
+        elif self._update_entry(game_type, room_id, entry):
+            self._emit("updated", game_type, room_id, entry, remote=True)
+
+    def drop_remote(self, predicate: Callable[[str], bool]) -> None:
+        """移除满足条件的远程房间（例如某个worker下线）"""
+        for room_id, game_type in list(self._remote.items()):
+            if predicate(room_id):
+                self.apply_remote("destroyed", game_type, room_id, None)
+
+    def list_rooms(
+        self,
+        game_type: str,
+        status: Optional[str] = None,
+        cursor: Optional[int] = None,
+        limit: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """分页获取大厅房间列表，返回 (房间条目列表, 下一页游标)"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if status is None:
+            index = self._by_type.get(game_type)
+        else:
+            index = self._by_status.get((game_type, status))
+        if index is None:
+            return [], None
+        room_ids, next_cursor = index.page(cursor, limit)
+        return [self._entries[room_id] for room_id in room_ids], next_cursor
+
+    def entries(self, game_type: str) -> List[Dict[str, Any]]:
+        """某游戏类型下全部房间的大厅条目（按创建顺序）"""
+        index = self._by_type.get(game_type)
+        if index is None:
+            return []
+        return [self._entries[room_id] for room_id in index.id_to_seq]
+
+    def count(self, game_type: str, status: Optional[str] = None) -> int:
+        """某游戏类型（以及状态）下的房间数量"""
+        if status is None:
+            index = self._by_type.get(game_type)
+        else:
+            index = self._by_status.get((game_type, status))
+        return len(index) if index else 0
+
+    def entry(self, room_id: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的大厅条目"""
+        return self._entries.get(room_id)
+
+    def add_listener(self, listener: Callable[..., Any]) -> None:
+        """注册房间变化监听者
+
+        参数为 (事件类型, 游戏类型, 房间ID, 大厅条目, remote)，remote 表示事件来自其他worker
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @staticmethod
+    def format_entry(room: Room) -> Dict[str, Any]:
+        """生成大厅列表中的房间条目"""
+        return {
+            "id": room.room_id,
+            "owner": room.owner["name"] if room.owner else "",
+            "players": [
+                {"id": p.id, "name": p.name, "avatar": p.avatar}
+                for p in room.game.players.values()
+            ],
+            "maxPlayers": room.game.config["max_players"],
+            "status": room.status,
+            "name": room.name
+        }
+
+    def _status_index(self, game_type: str, status: str) -> _OrderedIndex:
+        return self._by_status.setdefault((game_type, status), _OrderedIndex())
+
+    def _insert_entry(self, game_type: str, room_id: str, entry: Dict[str, Any]) -> None:
+        seq = next(self._seq)
+        self._by_type.setdefault(game_type, _OrderedIndex()).add(room_id, seq)
+        self._status_index(game_type, entry["status"]).add(room_id, seq)
+        self._entries[room_id] = entry
+
+    def _update_entry(self, game_type: str, room_id: str, entry: Dict[str, Any]) -> bool:
+        old = self._entries.get(room_id)
+        if old is None or entry == old:
+            return False
+        if entry["status"] != old["status"]:
+            self._status_index(game_type, old["status"]).discard(room_id)
+            self._status_index(game_type, entry["status"]).add(room_id, next(self._seq))
+        self._entries[room_id] = entry
+        return True
+
+    def _delete_entry(self, game_type: str, room_id: str) -> None:
+        self._by_type[game_type].discard(room_id)
+        entry = self._entries.pop(room_id)
+        self._status_index(game_type, entry["status"]).discard(room_id)
+
+    def _emit(self, event: str, game_type: str, room_id: str, entry: Optional[Dict[str, Any]], remote: bool = False) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(event, game_type, room_id, entry, remote)
+            except Exception as e:
+                print(f"房间变化监听者出错: {e}")
@@ -3,6 +3,8 @@ from typing import Dict, List, Optional, Callable, Any
 from fastapi import WebSocket
 from .games.base import BaseGame
 from .models.player import Player
+from .utils.fanout import fanout
+from .utils.encoding import encode_message
 
 class Room:
     def __init__(self, room_id: str, game: BaseGame, owner_info: Optional[Dict[str, Any]] = None, name: str = "",gameType:str = ""):
@@ -22,11 +24,15 @@ class Room:
         self.connections: Dict[WebSocket, str] = {}  # 连接 -> 玩家ID
         
         self._on_empty_callback: Optional[Callable[[Room], Any]] = None
+        self._on_change_callbacks: List[Callable[[Room], Any]] = []
         
         # 设置游戏对房间的引用
         self.game.set_room_reference(self)
 
     async def connect(self, websocket: WebSocket, player: Player):
+        # 为连接创建出站队列，之后的发送都不会阻塞游戏逻辑
+        fanout.attach(websocket)
+        
         # 存储连接和玩家信息
         self.connections[websocket] = player.id
         self.players[player.id] = player
@@ -99,7 +105,7 @@ class Room:
                 result = await self.update_settings(player_id, message["settings"])
                 # 确保返回的消息包含type字段
                 result["type"] = "settings_updated"
-                await websocket.send_json(result)
+                await fanout.send(websocket, encode_message(result), "settings_updated")
 
     def can_start_game(self) -> bool:
         """检查是否可以开始游戏：满足最小玩家数且所有非房主玩家都已准备"""
@@ -133,9 +139,17 @@ class Room:
         if not player_id:
             return
             
+        # 该玩家在其他标签页仍有连接时，只移除当前连接
+        has_other_tabs = len(self.game.sockets_of(player_id)) > 1
+        
         # 移除连接和玩家
         if websocket in self.connections:
             del self.connections[websocket]
+        await fanout.detach(websocket)
+        if has_other_tabs:
+            await self.game.disconnect(websocket)
+            await self.broadcast_state()
+            return
         if player_id in self.players:
             del self.players[player_id]
         if player_id in self.ready_players:
@@ -161,12 +175,16 @@ class Room:
         
         # 处理房间为空的情况
         if len(self.players) == 0 and self._on_empty_callback:
+            self._notify_change()
             await self._on_empty_callback(self)
         else:
             await self.broadcast_state()
 
     async def broadcast_state(self, extra_message: Dict = None):
         """广播当前房间和游戏状态给所有连接的玩家"""
+        # 房间的人数、状态等发生变化时都会走到这里，同步更新大厅索引
+        self._notify_change()
+        
         # 构建房间状态信息
         room_state = {
             "type": "room_state",
@@ -188,18 +206,11 @@ class Room:
             "difficulty": self.game.config.get("difficulty", "normal")
         }
         
-        # 使用字典键的副本进行遍历，避免并发修改问题
-        disconnected_websockets = []
-        for websocket in list(self.connections.keys()):
-            try:
-                await websocket.send_json(room_state)
-            except (RuntimeError, Exception) as e:
-                # 记录断开连接的websocket，稍后清理
-                disconnected_websockets.append(websocket)
-                print(f"发送房间状态失败: {e}")
+        # 序列化一次，并发发送给所有连接
+        stats = await fanout.send_all(list(self.connections.keys()), encode_message(room_state), "room_state")
         
         # 清理断开连接的websocket
-        for websocket in disconnected_websockets:
+        for websocket in stats["dropped"]:
             if websocket in self.connections:
                 player_id = self.connections[websocket]
                 del self.connections[websocket]
@@ -210,6 +221,15 @@ class Room:
         self._on_empty_callback = callback
         return self
 
+    def on_change(self, callback):
+        """注册房间信息变化时的回调（用于更新房间注册表）"""
+        self._on_change_callbacks.append(callback)
+        return self
+
+    def _notify_change(self):
+        for callback in self._on_change_callbacks:
+            callback(self)
+
     def can_modify_settings(self, player_id: str) -> bool:
         """检查玩家是否有权限修改设置（仅限房主）"""
         return self.owner and self.owner["id"] == player_id
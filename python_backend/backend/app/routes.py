@@ -1,14 +1,24 @@
 import json
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request
 import time
 from .games.factory import GameFactory
 from .rooms import Room
+from .room_registry import RoomRegistry, DEFAULT_PAGE_SIZE
+from .lobby import LobbyHub
+from .cluster import create_cluster_node
 from .models.player import Player
+from .auth import WebSocketAuthError, authenticate_websocket
+from .readiness import readiness
 import secrets
 import string
 
 router = APIRouter()
-rooms: dict[str, dict[str, Room]] = {}  # {game_type: {room_id: Room}}
+
+# WebSocket认证失败时的关闭码（4000-4999 为应用自定义）
+WS_CLOSE_UNAUTHORIZED = 4401
+rooms = RoomRegistry()  # 房间注册表（全局ID索引 + 按类型/状态的分页索引）
+lobby = LobbyHub(rooms)  # 大厅推送
 
 # 房间销毁回调（带延迟重连支持）
 async def create_room_destroy_callback(game_type: str):
@@ -20,48 +30,120 @@ async def create_room_destroy_callback(game_type: str):
         
         # 再次检查房间是否仍然为空
         if len(room.players) == 0:
-            if game_type in rooms and room.room_id in rooms[game_type]:
-                del rooms[game_type][room.room_id]
+            if rooms.remove(room):
+                if cluster is not None:
+                    await cluster.release(room.room_id)
                 print(f"房间 {room.room_id} 已被自动销毁（无人，等待重连超时）")
     return destroy
 
+async def get_or_create_room(room_id: str, game_type: str) -> Room:
+    """获取本worker上的房间，不存在则创建"""
+    room = rooms.get(room_id, game_type)
+    if room is None:
+        game = GameFactory.create_game(game_type, room_id)
+        room = Room(room_id, game,gameType=game_type)
+        # 注册销毁房间的回调函数
+        destroy_cb = await create_room_destroy_callback(game_type)
+        room.on_empty(destroy_cb)
+        rooms.add(room)
+    return room
+
+# 集群模式（CLUSTER_MODE=on）下的节点，单进程模式为None
+cluster = create_cluster_node(rooms, get_or_create_room)
+
+async def start_cluster():
+    if cluster is not None:
+        await cluster.start()
+
+async def stop_cluster():
+    if cluster is not None:
+        await cluster.stop()
+
 # 时间同步
 @router.get("/api/server-time")
 async def get_server_time():
     return {"server_time": time.time()}
 
+# 大厅订阅（必须在 /ws/{room_id}/{game_type} 之前注册）
+@router.websocket("/ws/lobby/{game_type}")
+async def lobby_websocket(websocket: WebSocket, game_type: str):
+    await websocket.accept()
+    lobby.subscribe(websocket, game_type)
+    try:
+        # 大厅连接不需要客户端消息，只用于检测断开
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"大厅WebSocket错误: {e}")
+    finally:
+        await lobby.unsubscribe(websocket, game_type)
+
+# 玩家ID就是账号ID的游戏；答题游戏的玩家ID由前端按角色生成（user-… / questioner-…），只附加账号ID
+ACCOUNT_KEYED_GAMES = ("o2SPH", "o3MB")
+
+async def reject(websocket: WebSocket, message: str):
+    """通知客户端认证失败并关闭连接"""
+    await websocket.send_text(json.dumps({"type": "error", "message": message}))
+    await websocket.close(code=WS_CLOSE_UNAUTHORIZED)
+
 @router.websocket("/ws/{room_id}/{game_type}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str, game_type: str):
     await websocket.accept()
+    readiness.mark_websocket_accepted()
     room = None
     player = None
     
     try:
+        # 握手时验证一次身份，之后的消息不再验证
+        try:
+            user = await authenticate_websocket(websocket)
+        except WebSocketAuthError as e:
+            print(f"🔐 WebSocket认证失败: {e}")
+            await reject(websocket, "认证失败，请重新登录")
+            return
+        
         # 接收玩家信息
         data = await websocket.receive_text()
         player_info = json.loads(data)
+        player_id = str(player_info["id"])
+        if user is not None and game_type in ACCOUNT_KEYED_GAMES and player_id != str(user.id):
+            print(f"🔐 玩家ID {player_id} 与登录用户 {user.id} 不一致")
+            await reject(websocket, "玩家身份与登录用户不一致")
+            return
+        if user is None and player_id.isdigit():
+            # 纯数字ID属于注册用户，游客不能使用
+            print(f"🔐 未登录的连接使用了用户ID {player_id}")
+            await reject(websocket, "请先登录")
+            return
+        player_info["user_id"] = user.id if user is not None else None
         player = Player(
             id=player_info["id"],
             name=player_info["name"],
-            avatar=player_info.get("avatar", "")
+            avatar=player_info.get("avatar", ""),
+            user_id=player_info["user_id"]
         )
         print(f"玩家 {player.name} 连接到房间 {room_id}，游戏类型 {game_type}")
         
         # 初始化房间和游戏
-        if game_type not in rooms:
-            rooms[game_type] = {}
-        if room_id not in rooms[game_type]:
-            game = GameFactory.create_game(game_type, room_id)
-            room = Room(room_id, game,gameType=game_type)
-            # 注册销毁房间的回调函数
-            destroy_cb = await create_room_destroy_callback(game_type)
-            room.on_empty(destroy_cb)
-            rooms[game_type][room_id] = room
-        else:
-            room = rooms[game_type][room_id]
+        room = rooms.get(room_id, game_type)
+        if room is None:
+            if rooms.game_type_of(room_id) not in (None, game_type):
+                # 房间ID全局唯一，不能被其他游戏类型复用
+                await websocket.send_text(json.dumps({"type": "error", "message": "房间ID已被其他游戏使用"}))
+                await websocket.close()
+                return
+            if cluster is not None:
+                # 集群模式：房间由其他worker负责时，把连接转发过去
+                owner = await cluster.claim(room_id)
+                if owner != cluster.worker_id:
+                    print(f"房间 {room_id} 由 worker {owner} 负责，转发连接")
+                    await cluster.forward(websocket, room_id, game_type, player_info, owner)
+                    return
+            room = await get_or_create_room(room_id, game_type)
             
         await room.connect(websocket, player)
-        print(rooms)
         print(f"当前房间状态: {room.status}, 玩家数: {len(room.players)}")
         
         # 事件循环
@@ -97,21 +179,14 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, game_type: str)
                 print(f"断开连接时出错: {disconnect_error}")
 
 @router.get("/api/room-list/{game_type}")
-async def get_rooms(game_type: str):
-    print(f"获取房间列表: {game_type}")
-    print(rooms)
-    game_rooms = rooms.get(game_type, {})
-    result = []
-    for room_id, room in game_rooms.items():
-        result.append({
-            "id": room_id,
-            "owner": room.owner["name"] if room.owner else "",
-            "players": list(room.game.players.values()),
-            "maxPlayers": room.game.config["max_players"],
-            "status": room.status,
-            "name": room.name
-        })
-    return {"rooms": result}
+async def get_rooms(game_type: str, cursor: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE, status: Optional[str] = None):
+    """分页获取房间列表，next_cursor 为空表示没有下一页（前端大厅通过 /lobby 订阅获取完整列表）"""
+    result, next_cursor = rooms.list_rooms(game_type, status=status, cursor=cursor, limit=limit)
+    return {
+        "rooms": result,
+        "next_cursor": next_cursor,
+        "total": rooms.count(game_type, status)
+    }
 
 def generate_short_id(length=8):
     chars = string.ascii_letters + string.digits
@@ -121,14 +196,13 @@ def generate_short_id(length=8):
 async def get_new_room_id_short(game_type: str):
     while True:
         room_id = generate_short_id()
-        if room_id not in rooms.get(game_type, {}):
+        if room_id not in rooms:
             return {"room_id": room_id}
 
 @router.get("/api/room-exists/{game_type}/{room_id}")
 async def check_room_exists(game_type: str, room_id: str):
     """检查房间是否存在"""
-    game_rooms = rooms.get(game_type, {})
-    exists = room_id in game_rooms
+    exists = rooms.game_type_of(room_id) == game_type
     return {"exists": exists}
 
 @router.get("/api/room-info/{room_id}")
@@ -136,23 +210,36 @@ async def get_room_info(room_id: str):
     """获取房间基本信息（用于预加载）"""
     print(f"🔍 请求房间信息: {room_id}")
     
-    # 在所有游戏类型中查找房间
-    for game_type, game_rooms in rooms.items():
-        if room_id in game_rooms:
-            room = game_rooms[room_id]
-            print(f"✅ 找到房间: {room_id}，游戏类型: {game_type}")
-            
-            # 返回房间基本信息（不包含敏感信息）
-            return {
-                "room_id": room_id,
-                "game_type": game_type,
-                "owner": room.owner["name"] if room.owner else "未知",
-                "player_count": len(room.players),
-                "max_players": room.game.config["max_players"],
-                "status": room.status,
-                "name": room.name,
-                "exists": True
-            }
+    # 通过全局索引查找房间
+    room = rooms.get(room_id)
+    if room is not None:
+        print(f"✅ 找到房间: {room_id}，游戏类型: {room.gameType}")
+        
+        # 返回房间基本信息（不包含敏感信息）
+        return {
+            "room_id": room_id,
+            "game_type": room.gameType,
+            "owner": room.owner["name"] if room.owner else "未知",
+            "player_count": len(room.players),
+            "max_players": room.game.config["max_players"],
+            "status": room.status,
+            "name": room.name,
+            "exists": True
+        }
+    
+    # 集群模式下由其他worker负责的房间，使用同步过来的大厅条目
+    entry = rooms.entry(room_id)
+    if entry is not None:
+        return {
+            "room_id": room_id,
+            "game_type": rooms.game_type_of(room_id),
+            "owner": entry["owner"] or "未知",
+            "player_count": len(entry["players"]),
+            "max_players": entry["maxPlayers"],
+            "status": entry["status"],
+            "name": entry["name"],
+            "exists": True
+        }
     
     print(f"❌ 房间不存在: {room_id}")
     return {
@@ -0,0 +1,145 @@
+"""进程内成就目录缓存
+
+成就定义很少变化，启动时一次性加载到内存，按 (game_type, condition_type) 建立索引，
+每个索引下的成就按 target_value 升序排列，判断解锁时不再查询 achievements 表。
+game_type 为 NULL 的成就适用于所有游戏，会合并进每个游戏类型的索引。
+
+刷新方式：
+- TTL：距离上次加载超过 ACHIEVEMENT_CATALOG_TTL 秒后，下一次使用时重新加载
+- 版本号：修改成就定义后调用 invalidate()，版本号加一，下一次使用时重新加载
+"""
+import asyncio
+import os
+import time
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models.achievement import Achievement
+
+CATALOG_TTL = float(os.getenv('ACHIEVEMENT_CATALOG_TTL', '300'))
+
+CatalogKey = Tuple[Optional[str], str]  # (game_type, condition_type)
+
+
+class CatalogEntry:
+    """成就定义的只读副本，脱离数据库会话使用"""
+    __slots__ = ("id", "name", "description", "achievement_type", "condition_type",
+                 "target_value", "game_type", "icon", "created_at")
+
+    def __init__(self, achievement: Achievement):
+        self.id = achievement.id
+        self.name = achievement.name
+        self.description = achievement.description
+        self.achievement_type = achievement.achievement_type
+        self.condition_type = achievement.condition_type
+        self.target_value = achievement.target_value or 0
+        self.game_type = achievement.game_type
+        self.icon = achievement.icon
+        self.created_at = achievement.created_at
+
+    def to_notice(self) -> Dict[str, Any]:
+        """成就解锁通知中的成就数据"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "icon": self.icon
+        }
+
+
+class AchievementCatalog:
+    """成就目录"""
+    def __init__(self, session_factory=AsyncSessionLocal, ttl: float = CATALOG_TTL):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.version = 0  # 成就定义的版本号，invalidate() 时加一
+        self._loaded_version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._by_id: Dict[int, CatalogEntry] = {}
+        self._index: Dict[CatalogKey, List[CatalogEntry]] = {}
+        self._targets: Dict[CatalogKey, List[int]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_version is not None
+
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_version != self.version
+            or time.monotonic() - self._loaded_at >= self.ttl
+        )
+
+    def invalidate(self) -> None:
+        """成就定义已修改，下次使用时重新加载"""
+        self.version += 1
+
+    async def load(self) -> None:
+        """从数据库加载全部成就定义（一次查询）"""
+        version = self.version
+        async with self.session_factory() as db:
+            achievements = (await db.execute(select(Achievement))).scalars().all()
+        self._build([CatalogEntry(a) for a in achievements])
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+        print(f"📚 成就目录已加载: {len(self._by_id)} 个成就, 版本 {version}")
+
+    async def ensure_fresh(self) -> None:
+        """目录过期时重新加载，并发调用只加载一次"""
+        if not self.is_stale():
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.is_stale():
+                await self.load()
+
+    def _build(self, entries: List[CatalogEntry]) -> None:
+        by_key: Dict[CatalogKey, List[CatalogEntry]] = {}
+        for entry in entries:
+            by_key.setdefault((entry.game_type, entry.condition_type), []).append(entry)
+        # 适用于所有游戏的成就合并进每个游戏类型
+        game_types = {game_type for game_type, _ in by_key if game_type is not None}
+        for (game_type, condition_type), items in list(by_key.items()):
+            if game_type is None:
+                for other in game_types:
+                    by_key.setdefault((other, condition_type), []).extend(items)
+        index = {key: sorted(items, key=lambda e: (e.target_value, e.id)) for key, items in by_key.items()}
+        self._index = index
+        self._targets = {key: [e.target_value for e in items] for key, items in index.items()}
+        self._by_id = {entry.id: entry for entry in entries}
+
+    def get(self, achievement_id: int) -> Optional[CatalogEntry]:
+        return self._by_id.get(achievement_id)
+
+    def entries(self, game_type: Optional[str], condition_type: str) -> List[CatalogEntry]:
+        """某游戏某条件类型的成就，按目标值升序"""
+        return self._index.get((game_type, condition_type)) or self._index.get((None, condition_type), [])
+
+    def reached(self, game_type: Optional[str], condition_type: str, value: int) -> List[CatalogEntry]:
+        """进度值 value 已达到的全部成就（target_value <= value）"""
+        key = (game_type, condition_type)
+        if key not in self._index:
+            key = (None, condition_type)
+        targets = self._targets.get(key)
+        if not targets:
+            return []
+        return self._index[key][:bisect_right(targets, value)]
+
+    def achievements(self, game_type: Optional[str] = None, achievement_type: Optional[str] = None) -> List[CatalogEntry]:
+        """全部成就定义（按ID排序），可按游戏类型、成就类型精确筛选"""
+        return [
+            entry for _, entry in sorted(self._by_id.items())
+            if (game_type is None or entry.game_type == game_type)
+            and (achievement_type is None or entry.achievement_type == achievement_type)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+# 全局成就目录
+achievement_catalog = AchievementCatalog()
@@ -0,0 +1,157 @@
+"""基于集合的成就判定引擎
+
+输入一批玩家各条件类型的最新进度值（条件类型见 utils/achievement_utils.py），
+一次查询取出这些玩家相关的全部 user_achievements 行，在内存中计算进度变化和新跨过的阈值，
+再用一条批量 upsert 写回。数据库往返次数与玩家数、阈值数无关。
+
+进度值：
+- 分数、准确率类条件（MAX_PROGRESS_CONDITIONS）取历史最大值
+- 其他条件（总局数、胜利次数、连胜、游戏时长等）直接使用传入的最新值
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.user_achievement import UserAchievement
+from app.services import upsert
+from app.services.achievement_catalog import AchievementCatalog, achievement_catalog
+
+MAX_PROGRESS_CONDITIONS = {"score_threshold", "score_reach", "accuracy_reach"}
+
+Progress = Dict[str, int]  # condition_type -> 进度值
+ProgressKey = Tuple[int, int]  # (user_id, achievement_id)
+
+
+def plan_updates(
+    user_id: int,
+    definitions: Dict[str, List[Any]],
+    progress: Progress,
+    existing: Dict[ProgressKey, Any],
+    now: Optional[datetime] = None
+) -> Tuple[List[Dict[str, Any]], List[Any]]:
+    """计算一个玩家需要写入的进度行和新解锁的成就
+
+    definitions 为 condition_type -> 成就定义列表（Achievement 或 CatalogEntry），
+    existing 为已有的 user_achievements 行。返回 (upsert 行, 新解锁的成就定义)
+    """
+    now = now or datetime.utcnow()
+    rows, unlocked = [], []
+    for condition_type, value in progress.items():
+        for definition in definitions.get(condition_type, ()):
+            row = existing.get((user_id, definition.id))
+            current = value
+            if row is not None and condition_type in MAX_PROGRESS_CONDITIONS:
+                current = max(value, row.current_progress or 0)
+            reached = current >= definition.target_value
+            was_unlocked = row is not None and bool(row.is_unlocked)
+            if row is not None and row.current_progress == current and (was_unlocked or not reached):
+                continue
+            rows.append({
+                "user_id": user_id,
+                "achievement_id": definition.id,
+                "current_progress": current,
+                "is_unlocked": was_unlocked or reached,
+                "unlocked_at": row.unlocked_at if was_unlocked else (now if reached else None),
+                "created_at": now,
+                "updated_at": now
+            })
+            if reached and not was_unlocked:
+                unlocked.append(definition)
+    return rows, unlocked
+
+
+def max_progress_ids(definitions: Dict[str, List[Any]]) -> List[int]:
+    """取历史最大值的成就ID（MAX_PROGRESS_CONDITIONS）"""
+    return [d.id for ct, items in definitions.items() if ct in MAX_PROGRESS_CONDITIONS for d in items]
+
+
+def build_progress_upsert(dialect_name: str, rows: List[Dict[str, Any]], max_ids: Iterable[int] = ()):
+    """批量写入成就进度
+
+    并发判定时不会撤销已解锁状态，也不会覆盖最早的解锁时间；
+    max_ids 中的成就在数据库中取较大的进度，不会被并发写入的较小值覆盖
+    """
+    stmt = upsert.insert_for(dialect_name)(UserAchievement).values(rows)
+    new = upsert.new_values(dialect_name, stmt)
+    t = UserAchievement.__table__.c
+    progress = new.current_progress
+    max_ids = list(max_ids)
+    if max_ids:
+        progress = case(
+            (t.achievement_id.in_(max_ids),
+             upsert.greatest(dialect_name, func.coalesce(t.current_progress, 0), new.current_progress)),
+            else_=new.current_progress
+        )
+    assignments = [
+        ("unlocked_at", func.coalesce(t.unlocked_at, new.unlocked_at)),
+        ("is_unlocked", t.is_unlocked | new.is_unlocked),
+        ("current_progress", progress),
+        ("updated_at", new.updated_at),
+    ]
+    return upsert.on_conflict_update(dialect_name, stmt, ["user_id", "achievement_id"], assignments)
+
+
+def _existing_query(user_ids: Iterable[int], achievement_ids: Iterable[int]):
+    return select(UserAchievement).where(
+        UserAchievement.user_id.in_(set(user_ids)),
+        UserAchievement.achievement_id.in_(set(achievement_ids))
+    )
+
+
+class AchievementEngine:
+    """成就判定引擎，成就定义来自进程内成就目录"""
+    def __init__(self, catalog: AchievementCatalog = achievement_catalog):
+        self.catalog = catalog
+
+    def definitions(self, game_type: Optional[str], condition_types: Iterable[str]) -> Dict[str, List[Any]]:
+        return {ct: self.catalog.entries(game_type, ct) for ct in condition_types}
+
+    async def evaluate(self, db: AsyncSession, game_type: Optional[str], progress_by_user: Dict[Any, Progress]) -> Dict[Any, List[Any]]:
+        """判定一批玩家的成就，返回 玩家ID -> 新解锁的成就（CatalogEntry）
+
+        最多一次查询 + 一次 upsert，调用方负责提交事务
+        """
+        await self.catalog.ensure_fresh()
+        condition_types = {ct for progress in progress_by_user.values() for ct in progress}
+        definitions = self.definitions(game_type, condition_types)
+        achievement_ids = {d.id for items in definitions.values() for d in items}
+        if not achievement_ids:
+            return {user_id: [] for user_id in progress_by_user}
+
+        # 游戏内玩家ID是字符串，数据库中是整数
+        db_ids = {user_id: int(user_id) for user_id in progress_by_user}
+        rows = (await db.execute(_existing_query(db_ids.values(), achievement_ids))).scalars().all()
+        existing = {(r.user_id, r.achievement_id): r for r in rows}
+
+        updates, result = [], {}
+        now = datetime.utcnow()
+        for user_id, progress in progress_by_user.items():
+            user_rows, unlocked = plan_updates(db_ids[user_id], definitions, progress, existing, now)
+            updates.extend(user_rows)
+            result[user_id] = unlocked
+        if updates:
+            await db.execute(build_progress_upsert(upsert.dialect_name(db), updates, max_progress_ids(definitions)))
+        return result
+
+
+def evaluate_sync(db: Session, user_id: int, progress: Progress, definitions: Dict[str, List[Any]]) -> List[Any]:
+    """同步会话版本（供 AchievementService 使用），成就定义由调用方传入，调用方负责提交"""
+    achievement_ids = {d.id for items in definitions.values() for d in items}
+    if not achievement_ids:
+        return []
+    rows = db.execute(_existing_query([user_id], achievement_ids)).scalars().all()
+    existing = {(r.user_id, r.achievement_id): r for r in rows}
+    updates, unlocked = plan_updates(user_id, definitions, progress, existing)
+    if updates:
+        db.execute(build_progress_upsert(upsert.dialect_name(db), updates, max_progress_ids(definitions)))
+        # 让会话中已加载的进度行读到新值
+        for row in rows:
+            db.expire(row)
+    return unlocked
+
+
+# 全局成就判定引擎
+achievement_engine = AchievementEngine()
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from ..models import Achievement, UserAchievement
-from datetime import datetime
+from .achievement_engine import evaluate_sync
+from .achievement_summary import achievement_summaries
 
 class AchievementService:
     """成就服务类，处理成就相关的业务逻辑"""
@@ -53,37 +54,11 @@ class AchievementService:
             (Achievement.game_type == game_type) | (Achievement.game_type.is_(None))
         ).all()
         
-        newly_unlocked = []
-        
-        for achievement in achievements:
-            # 获取或创建用户成就记录
-            user_achievement = db.query(UserAchievement).filter(
-                UserAchievement.user_id == user_id,
-                UserAchievement.achievement_id == achievement.id
-            ).first()
-            
-            if not user_achievement:
-                # 创建新的用户成就记录
-                user_achievement = UserAchievement(
-                    user_id=user_id,
-                    achievement_id=achievement.id,
-                    current_progress=progress_value,
-                    is_unlocked=progress_value >= achievement.target_value,
-                    unlocked_at=datetime.utcnow() if progress_value >= achievement.target_value else None
-                )
-                db.add(user_achievement)
-            else:
-                # 更新现有记录
-                was_unlocked = user_achievement.is_unlocked
-                user_achievement.current_progress = progress_value
-                
-                # 检查是否解锁新成就
-                if not was_unlocked and progress_value >= achievement.target_value:
-                    user_achievement.is_unlocked = True
-                    user_achievement.unlocked_at = datetime.utcnow()
-                    newly_unlocked.append(achievement)
-        
-        return newly_unlocked
+        # 一次查询已有进度，一条批量upsert写回
+        unlocked = evaluate_sync(db, user_id, {condition_type: progress_value}, {condition_type: achievements})
+        if unlocked:
+            achievement_summaries.invalidate(user_id)
+        return unlocked
     
     @staticmethod
     def get_user_achievement_stats(db: Session, user_id: int):
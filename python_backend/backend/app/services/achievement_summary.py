@@ -0,0 +1,105 @@
+"""用户成就摘要缓存
+
+个人主页每次打开都会请求 /achievements/summary。每个用户已解锁的成就
+（按解锁时间倒序）在进程内缓存一份，成就总数来自成就目录，
+重复请求不再查询数据库。
+
+- 玩家解锁成就后（游戏观察者、AchievementService）立即使该用户的摘要失效
+- 条目有 TTL（ACHIEVEMENT_SUMMARY_TTL 秒），其他 worker 上发生的解锁最多延迟一个 TTL 可见
+- ETag 由用户ID、最后解锁时间、已解锁数和成就目录版本组成，客户端带 If-None-Match 时可返回 304
+"""
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user_achievement import UserAchievement
+from app.services.achievement_catalog import AchievementCatalog
+from app.utils.lru_cache import LRUCache
+
+SUMMARY_TTL = float(os.getenv('ACHIEVEMENT_SUMMARY_TTL', '60'))
+SUMMARY_CACHE_SIZE = int(os.getenv('ACHIEVEMENT_SUMMARY_CACHE_SIZE', '10000'))
+
+
+def unlocked_query(user_id: int):
+    """用户已解锁的成就进度，按解锁时间倒序"""
+    return select(UserAchievement).where(
+        and_(
+            UserAchievement.user_id == user_id,
+            UserAchievement.is_unlocked == True
+        )
+    ).order_by(UserAchievement.unlocked_at.desc())
+
+
+class UnlockedRecord:
+    """已解锁成就进度的只读副本"""
+    __slots__ = ("achievement_id", "current_progress", "is_unlocked", "unlocked_at")
+
+    def __init__(self, user_achievement: UserAchievement):
+        self.achievement_id = user_achievement.achievement_id
+        self.current_progress = user_achievement.current_progress
+        self.is_unlocked = user_achievement.is_unlocked
+        self.unlocked_at = user_achievement.unlocked_at
+
+
+class AchievementSummary:
+    """一个用户的成就摘要"""
+    __slots__ = ("user_id", "unlocked")
+
+    def __init__(self, user_id: int, unlocked: List[UnlockedRecord]):
+        self.user_id = user_id
+        self.unlocked = unlocked  # 按解锁时间倒序
+
+    @property
+    def last_unlocked_at(self) -> Optional[datetime]:
+        return self.unlocked[0].unlocked_at if self.unlocked else None
+
+    def etag(self, catalog: AchievementCatalog) -> str:
+        last = self.last_unlocked_at
+        last_ms = int(last.timestamp() * 1000) if last else 0
+        return f'W/"{self.user_id}-{last_ms}-{len(self.unlocked)}-{catalog.version}-{len(catalog)}"'
+
+
+class AchievementSummaryCache:
+    """按用户缓存成就摘要"""
+    def __init__(self, maxsize: int = SUMMARY_CACHE_SIZE, ttl: float = SUMMARY_TTL):
+        self._cache = LRUCache(maxsize, ttl)
+
+    async def get(self, db: AsyncSession, user_id: int) -> AchievementSummary:
+        """返回用户的成就摘要，未缓存时查询一次数据库"""
+        summary = self._cache.get(user_id)
+        if summary is None:
+            rows = (await db.execute(unlocked_query(user_id))).scalars().all()
+            summary = AchievementSummary(user_id, [UnlockedRecord(r) for r in rows])
+            self._cache.set(user_id, summary)
+        return summary
+
+    def invalidate(self, user_id) -> None:
+        """用户解锁了新成就"""
+        self._cache.pop(int(user_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    @property
+    def stats(self):
+        return self._cache.stats
+
+
+def _opaque_tag(tag: str) -> str:
+    return tag.strip().removeprefix("W/")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 请求头是否命中（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+
+# 全局用户成就摘要缓存
+achievement_summaries = AchievementSummaryCache()
@@ -0,0 +1,327 @@
+"""游戏结果写后（write-behind）管道
+
+游戏结束时把各玩家的结果交给管道后立即返回，后台任务按刷新间隔把积压的结果
+合并成一条多行 INSERT 写入 game_sessions，并在同一个事务中累加 player_stats，
+两张表要么都写入、要么都不变（包括重放暂存文件时）。提交成功后再调用提交方注册的回调
+（检查成就、通知玩家等），回调收到本次结果和各玩家的总游戏数。
+
+数据库不可用时，本批结果追加写入本地 JSONL 暂存文件，下次刷新时先重放暂存文件；
+进程重启后也会在第一次刷新时重放上次遗留的暂存结果（此时已没有回调可调用）。
+每条结果带有 result_id，写入时跳过数据库中已存在的结果，提交后、删除暂存文件前崩溃也不会重复写入；
+无法解析的行（例如崩溃时写了一半）移到 .bad 文件，不阻塞其余结果的重放。
+"""
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+from app.database import AsyncSessionLocal
+from app.models.game_record import GameSession
+from app.services.player_stats import StatsKey, apply_game_results, load_total_games, stats_key
+
+# 刷新间隔（秒）和单条 INSERT 的最大行数
+FLUSH_INTERVAL = float(os.getenv('GAME_RESULT_FLUSH_INTERVAL', '0.5'))
+MAX_BATCH_SIZE = int(os.getenv('GAME_RESULT_MAX_BATCH', '500'))
+SPOOL_PATH = os.getenv('GAME_RESULT_SPOOL', 'game_results.spool.jsonl')
+
+# 回调参数：本次提交的结果、(user_id, game_type) -> 写入后的总游戏数
+ResultCallback = Callable[[List["GameResult"], Dict[StatsKey, int]], Awaitable[None]]
+
+_DATETIME_FIELDS = ("start_time", "end_time")
+
+
+class GameResult:
+    """单个玩家的一局游戏结果"""
+    def __init__(
+        self,
+        user_id: int,
+        game_type: str,
+        room_id: Optional[str],
+        start_time: datetime,
+        end_time: datetime,
+        duration_seconds: int,
+        score: int,
+        accuracy: float,
+        rounds_played: int = 0,
+        rounds_total: int = 0,
+        is_winner: bool = False,
+        status: str = "completed",
+        result_id: Optional[str] = None
+    ):
+        self.user_id = user_id
+        self.game_type = game_type
+        self.room_id = room_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.duration_seconds = duration_seconds
+        self.score = score
+        self.accuracy = round(accuracy, 2)  # DECIMAL(5,2)
+        self.rounds_played = rounds_played
+        self.rounds_total = rounds_total
+        self.is_winner = is_winner
+        self.status = status
+        self.result_id = result_id or uuid.uuid4().hex  # 重放暂存文件时用于去重
+
+    def to_row(self) -> Dict[str, Any]:
+        """game_sessions 表的一行"""
+        return {
+            "user_id": self.user_id,
+            "game_type": self.game_type,
+            "room_id": self.room_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_seconds": self.duration_seconds,
+            "score": self.score,
+            "accuracy": self.accuracy,
+            "rounds_played": self.rounds_played,
+            "rounds_total": self.rounds_total,
+            "status": self.status,
+            "result_id": self.result_id,
+            "created_at": self.end_time
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(self.__dict__)
+        for field in _DATETIME_FIELDS:
+            data[field] = data[field].isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GameResult":
+        data = dict(data)
+        for field in _DATETIME_FIELDS:
+            data[field] = datetime.fromisoformat(data[field])
+        return cls(**data)
+
+
+def _append_lines(path: str, lines: List[str]) -> None:
+    """追加写入并 fsync，保证进程崩溃后已暂存的结果不丢失"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class GameResultPipeline:
+    """游戏结果写后队列"""
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        spool_path: str = SPOOL_PATH
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.spool_path = spool_path
+        self._pending: List[Tuple[List[GameResult], Optional[ResultCallback]]] = []
+        self._pending_count = 0
+        self._spooled_callbacks: List[Tuple[List[GameResult], ResultCallback]] = []  # 已暂存、等待重放后回调
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {"submitted": 0, "written": 0, "batches": 0, "spooled": 0, "failed_flushes": 0, "bad_lines": 0}
+
+    def submit(self, results: List[GameResult], on_persisted: Optional[ResultCallback] = None) -> None:
+        """提交一局游戏的结果，不等待数据库写入
+
+        on_persisted 在这些结果和统计提交到数据库后调用（同一次提交的结果一起传入）
+        """
+        if not results:
+            return
+        self._pending.append((results, on_persisted))
+        self._pending_count += len(results)
+        self.stats["submitted"] += len(results)
+        self._ensure_worker()
+        if self._pending_count >= self.max_batch_size:
+            self._wakeup.set()
+
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    def start(self) -> None:
+        self._ensure_worker()
+
+    async def stop(self) -> None:
+        """停止后台任务并写入剩余结果（写入失败时进入暂存文件）
+
+        不直接取消后台任务，避免正在写入的一批结果丢失
+        """
+        self._stopping = True
+        try:
+            if self._task is not None:
+                self._wakeup.set()
+                await self._task
+                self._task = None
+            await self.flush()
+        finally:
+            self._stopping = False
+
+    def _ensure_worker(self) -> None:
+        if self._stopping:
+            return
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()  # 事件绑定在当前事件循环上
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ 游戏结果刷新失败: {e!r}")
+
+    async def flush(self) -> int:
+        """立即写入暂存文件和队列中的结果，返回本次写入数据库的行数"""
+        async with self._lock:
+            written = 0
+            if self._has_spool():
+                replayed = await self._replay_spool()
+                if replayed is None:
+                    # 数据库仍不可用，新结果直接追加到暂存文件，保持写入顺序
+                    await self._spool_pending()
+                    return 0
+                written += replayed
+
+            while self._pending:
+                submissions = self._take_batch()
+                results = [r for batch, _ in submissions for r in batch]
+                try:
+                    count, total_games = await self._write(results)
+                except Exception as e:
+                    print(f"⚠️ 游戏结果写入数据库失败，写入暂存文件: {e!r}")
+                    self.stats["failed_flushes"] += 1
+                    await self._spool(submissions)
+                    await self._spool_pending()
+                    return written
+                written += count
+                await self._run_callbacks(submissions, total_games)
+            return written
+
+    def _take_batch(self) -> List[Tuple[List[GameResult], Optional[ResultCallback]]]:
+        """按提交取出不超过 max_batch_size 行的一批（单次提交不拆分）"""
+        taken, count = [], 0
+        while self._pending:
+            size = len(self._pending[0][0])
+            if taken and count + size > self.max_batch_size:
+                break
+            taken.append(self._pending.pop(0))
+            count += size
+        self._pending_count -= count
+        return taken
+
+    async def _write(self, results: List[GameResult]) -> Tuple[int, Dict[StatsKey, int]]:
+        """在一个事务中写入数据库中还不存在的结果并累加玩家统计
+
+        返回实际写入的行数和本批所有玩家（包括跳过的结果）的总游戏数
+        """
+        written, inserted = 0, []
+        async with self.session_factory() as db:
+            for start in range(0, len(results), self.max_batch_size):
+                batch = results[start:start + self.max_batch_size]
+                existing = set((await db.execute(
+                    select(GameSession.result_id).where(GameSession.result_id.in_([r.result_id for r in batch]))
+                )).scalars())
+                new_results = [r for r in batch if r.result_id not in existing]
+                if existing:
+                    print(f"⏭️ 跳过 {len(existing)} 条已写入的游戏结果")
+                if not new_results:
+                    continue
+                await db.execute(insert(GameSession).values([r.to_row() for r in new_results]))
+                self.stats["batches"] += 1
+                written += len(new_results)
+                inserted.extend(new_results)
+            # 已写入的结果在当时的事务中已经累加过统计，这里只累加新写入的
+            total_games = await apply_game_results(db, inserted)
+            # 跳过的结果（重放时已写入）也需要总游戏数，回调据此判定成就
+            skipped_keys = {stats_key(r) for r in results} - total_games.keys()
+            total_games.update(await load_total_games(db, skipped_keys))
+            await db.commit()
+        self.stats["written"] += written
+        return written, total_games
+
+    async def _run_callbacks(self, submissions, total_games: Dict[StatsKey, int]) -> None:
+        for results, callback in submissions:
+            if callback is None:
+                continue
+            try:
+                await callback(results, total_games)
+            except Exception as e:
+                print(f"❌ 游戏结果回调执行失败: {e!r}")
+
+    # ---- 本地暂存 ----
+    # 文件读写和 fsync 在线程中执行，数据库变慢、需要暂存时不阻塞事件循环
+
+    def _has_spool(self) -> bool:
+        return os.path.exists(self.spool_path) and os.path.getsize(self.spool_path) > 0
+
+    async def _spool(self, submissions) -> None:
+        lines = [
+            json.dumps(result.to_dict(), ensure_ascii=False) + "\n"
+            for results, _ in submissions for result in results
+        ]
+        await asyncio.to_thread(_append_lines, self.spool_path, lines)
+        for results, callback in submissions:
+            self.stats["spooled"] += len(results)
+            if callback is not None:
+                self._spooled_callbacks.append((results, callback))
+
+    async def _spool_pending(self) -> None:
+        if self._pending:
+            submissions, self._pending, self._pending_count = self._pending, [], 0
+            await self._spool(submissions)
+
+    def _read_spool(self) -> Tuple[List[GameResult], int]:
+        """读取暂存文件，无法解析的行移到 .bad 文件（在线程中执行），返回 (结果, 无法解析的行数)"""
+        results, good_lines, bad_lines = [], [], []
+        with open(self.spool_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    results.append(GameResult.from_dict(json.loads(line)))
+                    good_lines.append(line if line.endswith("\n") else line + "\n")
+                except (ValueError, TypeError, KeyError) as e:
+                    print(f"⚠️ 游戏结果暂存文件中有无法解析的行，移到 {self.spool_path}.bad: {e!r}")
+                    bad_lines.append(line if line.endswith("\n") else line + "\n")
+        if bad_lines:
+            _append_lines(self.spool_path + ".bad", bad_lines)
+            # 只保留可以解析的行，重放失败时下次不会重复移动
+            tmp_path = self.spool_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(good_lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.spool_path)
+        return results, len(bad_lines)
+
+    async def _replay_spool(self) -> Optional[int]:
+        """把暂存文件写回数据库，成功返回写入的行数，数据库仍不可用时返回None"""
+        results, bad_lines = await asyncio.to_thread(self._read_spool)
+        self.stats["bad_lines"] += bad_lines
+        try:
+            written, total_games = await self._write(results)
+        except Exception as e:
+            print(f"⚠️ 重放游戏结果暂存文件失败: {e!r}")
+            self.stats["failed_flushes"] += 1
+            return None
+        await asyncio.to_thread(os.remove, self.spool_path)
+        print(f"✅ 已从暂存文件重放 {written} 条游戏结果")
+        callbacks, self._spooled_callbacks = self._spooled_callbacks, []
+        await self._run_callbacks(callbacks, total_games)
+        return written
+
+
+# 全局游戏结果管道
+game_results = GameResultPipeline()
@@ -0,0 +1,246 @@
+"""玩家统计增量维护
+
+每局结束只把这局的得分、准确率、时长累加到 player_stats 上（一次原子 upsert），
+不再扫描用户全部的 game_sessions 历史：
+- 平均得分 = total_score / total_games
+- 平均准确率 = total_accuracy / total_games
+
+需要修正统计时（数据修复、历史数据迁移后），用 reconcile_player_stats 从
+game_sessions 批量重建：python -m app.services.player_stats [--game-type TYPE] [--user-id ID]
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.game_record import GameSession, PlayerStats
+from app.services import upsert
+
+# 重建统计时每条 upsert 的最大行数
+RECONCILE_BATCH_SIZE = 1000
+
+StatsKey = Tuple[int, str]  # (user_id, game_type)
+
+
+def stats_key(session) -> StatsKey:
+    """统计行的主键（游戏内玩家ID是字符串，统计表中是整数）"""
+    return int(session.user_id), session.game_type
+
+
+def session_delta(session) -> Dict[str, Any]:
+    """一局游戏对统计的增量（session 为 GameSession 或 GameResult）"""
+    return {
+        "user_id": int(session.user_id),
+        "game_type": session.game_type,
+        "total_games": 1,
+        "total_score": session.score or 0,
+        "best_score": session.score or 0,
+        "total_accuracy": float(session.accuracy or 0),
+        "total_play_time_seconds": session.duration_seconds or 0,
+        "last_played": session.end_time
+    }
+
+
+def completed_snapshot(session) -> Optional[Dict[str, Any]]:
+    """会话当前计入统计的部分，未完成的会话返回None"""
+    if session.status != "completed":
+        return None
+    return session_delta(session)
+
+
+def change_delta(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """同一会话修改前后两个快照之间的统计增量
+
+    最高分只会被新值抬高，不会因为改低分数而回退（需要时运行重建）
+    """
+    if before is None:
+        return after
+    if after is None:
+        after = dict(before, total_games=0, total_score=0, best_score=0, total_accuracy=0.0,
+                     total_play_time_seconds=0, last_played=None)
+    delta = dict(after)
+    for field in ("total_games", "total_score", "total_accuracy", "total_play_time_seconds"):
+        delta[field] -= before[field]
+    return delta
+
+
+def merge_deltas(sessions: Iterable[Any]) -> List[Dict[str, Any]]:
+    """把同一批中同一玩家同一游戏的多局合并成一个增量"""
+    merged: Dict[StatsKey, Dict[str, Any]] = {}
+    for session in sessions:
+        delta = session_delta(session)
+        key = (delta["user_id"], delta["game_type"])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = delta
+            continue
+        current["total_games"] += 1
+        current["total_score"] += delta["total_score"]
+        current["best_score"] = max(current["best_score"], delta["best_score"])
+        current["total_accuracy"] += delta["total_accuracy"]
+        current["total_play_time_seconds"] += delta["total_play_time_seconds"]
+        if delta["last_played"] and (current["last_played"] is None or delta["last_played"] > current["last_played"]):
+            current["last_played"] = delta["last_played"]
+    return list(merged.values())
+
+
+def _with_averages(delta: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(delta)
+    games = max(row["total_games"], 1)
+    row["average_score"] = round(row["total_score"] / games, 2)
+    row["average_accuracy"] = round(row["total_accuracy"] / games, 2)
+    row["updated_at"] = datetime.utcnow()
+    return row
+
+
+def build_increment(dialect_name: str, deltas: List[Dict[str, Any]]):
+    """构建累加统计的 upsert 语句
+
+    MySQL 的 ON DUPLICATE KEY UPDATE 按顺序赋值，后面的表达式会读到前面已更新的列，
+    所以平均值必须排在累计值之前；SQLite/PostgreSQL 中表达式读到的总是旧值，顺序无影响。
+    """
+    stmt = upsert.insert_for(dialect_name)(PlayerStats).values([_with_averages(d) for d in deltas])
+    new = upsert.new_values(dialect_name, stmt)
+    t = PlayerStats.__table__.c
+    games = t.total_games + new.total_games
+    divisor = func.nullif(games, 0)
+    assignments = [
+        ("average_score", func.coalesce((t.total_score + new.total_score) * literal(1.0) / divisor, 0)),
+        ("average_accuracy", func.coalesce((t.total_accuracy + new.total_accuracy) / divisor, 0)),
+        ("best_score", upsert.greatest(dialect_name, t.best_score, new.best_score)),
+        ("last_played", upsert.greatest(dialect_name, func.coalesce(t.last_played, new.last_played), func.coalesce(new.last_played, t.last_played))),
+        ("total_score", t.total_score + new.total_score),
+        ("total_accuracy", t.total_accuracy + new.total_accuracy),
+        ("total_play_time_seconds", t.total_play_time_seconds + new.total_play_time_seconds),
+        ("total_games", games),
+        ("updated_at", new.updated_at),
+    ]
+    return upsert.on_conflict_update(dialect_name, stmt, ["user_id", "game_type"], assignments)
+
+
+def build_replace(dialect_name: str, rows: List[Dict[str, Any]]):
+    """构建用重建结果覆盖统计的 upsert 语句"""
+    stmt = upsert.insert_for(dialect_name)(PlayerStats).values([_with_averages(r) for r in rows])
+    new = upsert.new_values(dialect_name, stmt)
+    columns = ["total_games", "total_score", "average_score", "best_score", "total_accuracy",
+               "average_accuracy", "total_play_time_seconds", "last_played", "updated_at"]
+    return upsert.on_conflict_update(dialect_name, stmt, ["user_id", "game_type"], [(name, getattr(new, name)) for name in columns])
+
+
+async def apply_game_results(db: AsyncSession, sessions: Iterable[Any]) -> Dict[StatsKey, int]:
+    """把一批已完成的游戏累加到统计中，返回每个 (user_id, game_type) 的总游戏数
+
+    调用方负责提交事务
+    """
+    deltas = merge_deltas(sessions)
+    if not deltas:
+        return {}
+    await db.execute(build_increment(upsert.dialect_name(db), deltas))
+    return await load_total_games(db, [(d["user_id"], d["game_type"]) for d in deltas])
+
+
+async def load_total_games(db: AsyncSession, keys: Iterable[StatsKey]) -> Dict[StatsKey, int]:
+    """查询每个 (user_id, game_type) 当前的总游戏数，没有统计行的键不在结果中"""
+    keys = list(keys)
+    if not keys:
+        return {}
+    user_ids = {user_id for user_id, _ in keys}
+    game_types = {game_type for _, game_type in keys}
+    rows = (await db.execute(
+        select(PlayerStats.user_id, PlayerStats.game_type, PlayerStats.total_games).where(
+            PlayerStats.user_id.in_(user_ids),
+            PlayerStats.game_type.in_(game_types)
+        )
+    )).all()
+    wanted = set(keys)
+    return {(r.user_id, r.game_type): r.total_games for r in rows if (r.user_id, r.game_type) in wanted}
+
+
+async def apply_session_change(db: AsyncSession, before: Optional[Dict[str, Any]], session) -> None:
+    """会话被修改后按前后快照的差值更新统计，before 为修改前的 completed_snapshot
+
+    调用方负责提交事务
+    """
+    delta = change_delta(before, completed_snapshot(session))
+    if delta is not None:
+        await db.execute(build_increment(upsert.dialect_name(db), [delta]))
+
+
+def apply_session_change_sync(db: Session, before: Optional[Dict[str, Any]], session) -> None:
+    """同步会话版本的 apply_session_change（供 GameRecordService 使用），调用方负责提交"""
+    delta = change_delta(before, completed_snapshot(session))
+    if delta is not None:
+        db.execute(build_increment(upsert.dialect_name(db), [delta]))
+
+
+def _aggregate_query(user_id: Optional[int] = None, game_type: Optional[str] = None):
+    query = select(
+        GameSession.user_id,
+        GameSession.game_type,
+        func.count(GameSession.id).label("total_games"),
+        func.coalesce(func.sum(GameSession.score), 0).label("total_score"),
+        func.coalesce(func.max(GameSession.score), 0).label("best_score"),
+        func.coalesce(func.sum(GameSession.accuracy), 0).label("total_accuracy"),
+        func.coalesce(func.sum(GameSession.duration_seconds), 0).label("total_play_time_seconds"),
+        func.max(GameSession.end_time).label("last_played")
+    ).where(GameSession.status == "completed")
+    if user_id is not None:
+        query = query.where(GameSession.user_id == user_id)
+    if game_type is not None:
+        query = query.where(GameSession.game_type == game_type)
+    return query.group_by(GameSession.user_id, GameSession.game_type)
+
+
+async def reconcile_player_stats(
+    db: AsyncSession,
+    user_id: Optional[int] = None,
+    game_type: Optional[str] = None,
+    batch_size: int = RECONCILE_BATCH_SIZE
+) -> int:
+    """从 game_sessions 批量重建统计（一次分组聚合 + 分批 upsert），返回重建的行数
+
+    调用方负责提交事务
+    """
+    # 每个 (user_id, game_type) 一行，结果集大小与玩家数相关，与历史局数无关
+    rows = [dict(row) for row in (await db.execute(_aggregate_query(user_id, game_type))).mappings()]
+    for statement in _replace_batches(upsert.dialect_name(db), rows, batch_size):
+        await db.execute(statement)
+    return len(rows)
+
+
+def _replace_batches(dialect_name: str, rows: List[Dict[str, Any]], batch_size: int):
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        for row in batch:
+            row["total_accuracy"] = float(row["total_accuracy"])
+        yield build_replace(dialect_name, batch)
+
+
+def reconcile_player_stats_sync(db: Session, user_id: Optional[int] = None, game_type: Optional[str] = None) -> int:
+    """同步会话版本的 reconcile_player_stats，调用方负责提交"""
+    rows = [dict(row) for row in db.execute(_aggregate_query(user_id, game_type)).mappings()]
+    for statement in _replace_batches(upsert.dialect_name(db), rows, RECONCILE_BATCH_SIZE):
+        db.execute(statement)
+    return len(rows)
+
+
+async def _main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    from app.database import AsyncSessionLocal
+
+    parser = argparse.ArgumentParser(description="从 game_sessions 重建 player_stats")
+    parser.add_argument("--game-type", default=None)
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    async with AsyncSessionLocal() as db:
+        count = await reconcile_player_stats(db, args.user_id, args.game_type)
+        await db.commit()
+    print(f"✅ 已重建 {count} 条玩家统计")
+
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(_main())
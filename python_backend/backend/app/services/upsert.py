@@ -0,0 +1,45 @@
+"""按数据库方言构建 upsert 语句的辅助函数
+
+MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE，SQLite/PostgreSQL 使用 INSERT ... ON CONFLICT DO UPDATE
+"""
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+
+def dialect_name(db) -> str:
+    """同步或异步会话所连接数据库的方言名"""
+    return db.get_bind().dialect.name
+
+
+def insert_for(name: str):
+    if name == "mysql":
+        return mysql_insert
+    if name == "postgresql":
+        return postgresql_insert
+    if name == "sqlite":
+        return sqlite_insert
+    raise NotImplementedError(f"不支持的数据库方言: {name}")
+
+
+def new_values(name: str, stmt):
+    """冲突时引用待插入值的对象（MySQL 为 inserted，其他为 excluded）"""
+    return stmt.inserted if name == "mysql" else stmt.excluded
+
+
+def on_conflict_update(name: str, stmt, index_elements, assignments):
+    """附加冲突更新子句
+
+    assignments 为 (列名, 表达式) 的有序列表；MySQL 按顺序赋值，后面的表达式会读到前面已更新的列
+    """
+    if name == "mysql":
+        return stmt.on_duplicate_key_update(list(assignments))
+    return stmt.on_conflict_do_update(index_elements=list(index_elements), set_=dict(assignments))
+
+
+def greatest(name: str, a, b):
+    # SQLite 中两个参数的 max() 是标量函数
+    if name == "sqlite":
+        return func.max(a, b)
+    return func.greatest(a, b)
@@ -0,0 +1,5 @@
+import os
+
+# 测试统一使用 SQLite 内存库，不依赖 MySQL；必须在导入 app.database 之前设置
+os.environ["DATABASE_PROFILE"] = "sqlite"
+os.environ["SQLITE_PATH"] = ":memory:"
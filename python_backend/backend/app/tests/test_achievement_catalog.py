@@ -0,0 +1,80 @@
+import unittest
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import Achievement, Base
+from app.services.achievement_catalog import AchievementCatalog
+
+
+def make_achievement(name: str, condition_type: str, target: int, game_type=None) -> Achievement:
+    return Achievement(name=name, description=name, achievement_type="game_count",
+                       condition_type=condition_type, target_value=target, game_type=game_type)
+
+
+class TestAchievementCatalog(unittest.IsolatedAsyncioTestCase):
+    """成就目录缓存测试类"""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        async with self.sessions() as db:
+            db.add_all([
+                make_achievement("SPH_游戏达人", "total_games", 10, "same_pattern_hunt"),
+                make_achievement("SPH_游戏新手", "total_games", 1, "same_pattern_hunt"),
+                make_achievement("SPH_游戏爱好者", "total_games", 5, "same_pattern_hunt"),
+                make_achievement("MB_游戏新手", "game_complete", 1, "memorial_banquet"),
+                make_achievement("老玩家", "total_games", 3),
+            ])
+            await db.commit()
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+        self.catalog = AchievementCatalog(self.sessions, ttl=300)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def test_reached_sorted_by_target(self):
+        """测试按目标值排序并返回已达到的成就，适用于所有游戏的成就合并进各游戏"""
+        await self.catalog.load()
+        self.assertEqual(len(self.catalog), 5)
+        names = [e.name for e in self.catalog.entries("same_pattern_hunt", "total_games")]
+        self.assertEqual(names, ["SPH_游戏新手", "老玩家", "SPH_游戏爱好者", "SPH_游戏达人"])
+        self.assertEqual([e.name for e in self.catalog.reached("same_pattern_hunt", "total_games", 4)], ["SPH_游戏新手", "老玩家"])
+        self.assertEqual(self.catalog.reached("same_pattern_hunt", "total_games", 0), [])
+        self.assertEqual(self.catalog.reached("memorial_banquet", "game_complete", 1)[0].name, "MB_游戏新手")
+        # 没有专属成就的游戏类型使用通用成就
+        self.assertEqual([e.name for e in self.catalog.reached("other_game", "total_games", 3)], ["老玩家"])
+
+    async def test_no_queries_while_fresh(self):
+        """测试目录未过期时判断解锁不查询数据库"""
+        await self.catalog.ensure_fresh()
+        loads = len(self.statements)
+        self.assertEqual(loads, 1)
+        for value in range(20):
+            await self.catalog.ensure_fresh()
+            self.catalog.reached("same_pattern_hunt", "total_games", value)
+        self.assertEqual(len(self.statements), loads)
+
+    async def test_invalidate_and_ttl_reload(self):
+        """测试版本号变化或TTL到期后重新加载"""
+        await self.catalog.ensure_fresh()
+        async with self.sessions() as db:
+            db.add(make_achievement("SPH_游戏大师", "total_games", 20, "same_pattern_hunt"))
+            await db.commit()
+
+        await self.catalog.ensure_fresh()
+        self.assertEqual(len(self.catalog), 5)
+        self.catalog.invalidate()
+        await self.catalog.ensure_fresh()
+        self.assertEqual(len(self.catalog), 6)
+
+        self.catalog.ttl = 0
+        self.assertTrue(self.catalog.is_stale())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Achievement, Base, UserAchievement
+from app.services.achievement_catalog import AchievementCatalog
+from app.services.achievement_engine import AchievementEngine, build_progress_upsert
+from app.services.achievement_service import AchievementService
+
+GAME_TYPE = "memorial_banquet"
+
+
+def catalog_rows():
+    rows = []
+    for condition_type, targets in (("game_complete", (1, 5, 10)), ("game_win", (1, 3)), ("score_reach", (10, 20))):
+        for target in targets:
+            rows.append(Achievement(name=f"{condition_type}_{target}", description="", achievement_type="game_count",
+                                    condition_type=condition_type, target_value=target, game_type=GAME_TYPE))
+    return rows
+
+
+class TestAchievementEngine(unittest.IsolatedAsyncioTestCase):
+    """成就判定引擎测试类"""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        async with self.sessions() as db:
+            db.add_all(catalog_rows())
+            await db.commit()
+        catalog = AchievementCatalog(self.sessions)
+        await catalog.load()
+        self.achievements = AchievementEngine(catalog)
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement.split()[0].upper()))
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def evaluate(self, progress_by_user):
+        async with self.sessions() as db:
+            unlocked = await self.achievements.evaluate(db, GAME_TYPE, progress_by_user)
+            await db.commit()
+        return {user_id: [a.name for a in items] for user_id, items in unlocked.items()}
+
+    async def progress(self, user_id: int):
+        async with self.sessions() as db:
+            rows = (await db.execute(select(UserAchievement).where(UserAchievement.user_id == user_id))).scalars().all()
+            return {r.achievement_id: (r.current_progress, r.is_unlocked) for r in rows}
+
+    async def test_single_query_and_upsert(self):
+        """测试所有条件类型一次查询、一次批量写入"""
+        unlocked = await self.evaluate({"1": {"game_complete": 5, "game_win": 1, "score_reach": 12}})
+        self.assertEqual(unlocked, {"1": ["game_complete_1", "game_complete_5", "game_win_1", "score_reach_10"]})
+        self.assertEqual(self.statements.count("SELECT"), 1)
+        self.assertEqual(self.statements.count("INSERT"), 1)
+        # 未达到的阈值也记录进度
+        progress = await self.progress(1)
+        self.assertEqual(len(progress), 7)
+        self.assertEqual(sorted(progress.values()).count((5, False)), 1)
+
+    async def test_only_new_thresholds_unlocked(self):
+        """测试已解锁的成就不会重复解锁，进度不变时不写入"""
+        await self.evaluate({"1": {"game_complete": 1}})
+        self.statements.clear()
+        self.assertEqual(await self.evaluate({"1": {"game_complete": 1}}), {"1": []})
+        self.assertNotIn("INSERT", self.statements)
+
+        self.assertEqual(await self.evaluate({"1": {"game_complete": 6}}), {"1": ["game_complete_5"]})
+
+    async def test_max_progress_conditions(self):
+        """测试分数类条件保留历史最高进度"""
+        await self.evaluate({"1": {"score_reach": 15}})
+        self.assertEqual(await self.evaluate({"1": {"score_reach": 3}}), {"1": []})
+        progress = await self.progress(1)
+        self.assertIn((15, False), progress.values())
+        self.assertIn((15, True), progress.values())
+
+    async def test_concurrent_max_progress_not_lowered(self):
+        """测试并发判定时分数类进度不会被较小的值覆盖，其他条件直接写入新值"""
+        await self.evaluate({"1": {"score_reach": 15, "game_complete": 3}})
+        ids = {entry.name: entry.id for entry in self.achievements.catalog.entries(GAME_TYPE, "score_reach")}
+        ids.update({entry.name: entry.id for entry in self.achievements.catalog.entries(GAME_TYPE, "game_complete")})
+        # 另一个判定在写入前读到的是旧状态，计划写入较小的值
+        rows = [{"user_id": 1, "achievement_id": ids[name], "current_progress": value, "is_unlocked": False}
+                for name, value in (("score_reach_20", 4), ("game_complete_5", 4))]
+        async with self.sessions() as db:
+            await db.execute(build_progress_upsert("sqlite", rows, [ids["score_reach_20"], ids["score_reach_10"]]))
+            await db.commit()
+        progress = await self.progress(1)
+        self.assertEqual(progress[ids["score_reach_20"]], (15, False))
+        self.assertEqual(progress[ids["game_complete_5"]], (4, False))
+
+    async def test_many_users(self):
+        """测试多个玩家一起判定仍然只有一次查询和一次写入"""
+        await self.evaluate({"1": {"game_complete": 1}})
+        self.statements.clear()
+        unlocked = await self.evaluate({str(uid): {"game_complete": 1, "game_win": 3} for uid in range(1, 6)})
+        self.assertEqual(unlocked["1"], ["game_win_1", "game_win_3"])
+        self.assertEqual(unlocked["5"], ["game_complete_1", "game_win_1", "game_win_3"])
+        self.assertEqual(self.statements.count("SELECT"), 1)
+        self.assertEqual(self.statements.count("INSERT"), 1)
+
+
+class TestAchievementServiceSync(unittest.TestCase):
+    """AchievementService 同步接口测试类（SQLite）"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.achievement = Achievement(name="测试成就", description="", achievement_type="basic",
+                                       condition_type="total_games", target_value=5)
+        self.db.add(self.achievement)
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_check_and_update_achievement(self):
+        """测试进度未达到时记录进度，达到时解锁"""
+        self.assertEqual(AchievementService.check_and_update_achievement(self.db, 1, "total_games", 3), [])
+        row = self.db.get(UserAchievement, (1, self.achievement.id))
+        self.assertEqual((row.current_progress, row.is_unlocked), (3, False))
+
+        unlocked = AchievementService.check_and_update_achievement(self.db, 1, "total_games", 5, "same_pattern_hunt")
+        self.assertEqual([a.name for a in unlocked], ["测试成就"])
+        self.db.refresh(row)
+        self.assertTrue(row.is_unlocked)
+        self.assertIsNotNone(row.unlocked_at)
+
+
+if __name__ == '__main__':
+    unittest.main()
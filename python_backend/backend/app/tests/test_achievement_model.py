@@ -1,17 +1,24 @@
 import unittest
-from ..database import SessionLocal, create_tables
-from ..models import Achievement, UserAchievement, User
-from ..services.achievement_service import AchievementService
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import use_sqlite_pragmas
+from app.models import Achievement, Base, UserAchievement, User
+from app.services.achievement_service import AchievementService
 
 class TestAchievementModel(unittest.TestCase):
     """成就模型测试类"""
     
     def setUp(self):
         """每个测试前的设置"""
-        # 创建数据库表
-        create_tables()
+        # 使用SQLite内存库（与 DATABASE_PROFILE=sqlite 相同的连接参数），不依赖MySQL
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        use_sqlite_pragmas(self.engine)
+        Base.metadata.create_all(self.engine)
         # 创建数据库会话
-        self.db = SessionLocal()
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)()
         
         # 创建测试用户
         self.test_user = User(
@@ -45,6 +52,7 @@ class TestAchievementModel(unittest.TestCase):
         self.db.query(User).delete()
         self.db.commit()
         self.db.close()
+        self.engine.dispose()
     
     def test_get_all_achievements(self):
         """测试获取所有成就"""
@@ -0,0 +1,127 @@
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+from app.achievement_routes import router
+from app.auth import get_current_user
+from app.database import AsyncSessionLocal, get_async_db
+from app.models import Achievement, Base, UserAchievement
+from app.services.achievement_catalog import achievement_catalog
+from app.services.achievement_summary import achievement_summaries
+
+USER = SimpleNamespace(id=1)
+
+
+class TestAchievementRoutes(unittest.IsolatedAsyncioTestCase):
+    """成就接口测试类（查询次数、摘要缓存和条件请求）"""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        AsyncSessionLocal.configure(bind=self.engine)
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[get_current_user] = lambda: USER
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        AsyncSessionLocal.configure(bind=database.async_engine)
+        achievement_catalog.invalidate()
+        achievement_summaries.clear()
+        await self.engine.dispose()
+
+    async def seed(self, count: int):
+        """创建 count 个成就，用户解锁其中一半，另有一个成就有进度未解锁"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(UserAchievement))
+            await db.execute(delete(Achievement))
+            now = datetime.utcnow()
+            for i in range(1, count + 1):
+                game_type = "same_pattern_hunt" if i % 2 else "memorial_banquet"
+                db.add(Achievement(id=i, name=f"成就{i}", description="", achievement_type="game_count",
+                                   condition_type="total_games", target_value=10, game_type=game_type))
+            for i in range(1, count // 2 + 1):
+                db.add(UserAchievement(user_id=USER.id, achievement_id=i, current_progress=10, is_unlocked=True,
+                                       unlocked_at=now - timedelta(minutes=i)))
+            db.add(UserAchievement(user_id=USER.id, achievement_id=count, current_progress=4, is_unlocked=False))
+            await db.commit()
+        achievement_catalog.invalidate()
+        achievement_summaries.clear()
+        await achievement_catalog.ensure_fresh()
+
+    async def request(self, path: str, **kwargs):
+        """发起请求，返回 (执行的SQL语句数, 响应)"""
+        self.statements.clear()
+        response = await self.client.get(path, **kwargs)
+        return len(self.statements), response
+
+    async def test_statement_count_independent_of_catalog_size(self):
+        """测试各接口的SQL语句数与成就数量无关"""
+        paths = ["/achievements/summary", "/achievements/unlocked", "/achievements/all", "/achievements/1"]
+        counts = {}
+        for size in (4, 40):
+            await self.seed(size)
+            counts[size] = [(await self.request(path))[0] for path in paths]
+        self.assertEqual(counts[4], counts[40])
+        self.assertEqual(counts[40], [1, 1, 1, 1])
+
+    async def test_responses(self):
+        """测试接口返回的成就与进度"""
+        await self.seed(10)
+        _, response = await self.request("/achievements/summary")
+        summary = response.json()
+        self.assertEqual((summary["total_achievements"], summary["unlocked_achievements"]), (10, 5))
+        self.assertEqual([r["achievement"]["id"] for r in summary["recent_unlocked"]], [1, 2, 3, 4, 5])
+
+        _, response = await self.request("/achievements/unlocked", params={"game_type": "memorial_banquet"})
+        self.assertEqual([r["achievement"]["id"] for r in response.json()], [2, 4])
+
+        _, response = await self.request("/achievements/all", params={"game_type": "memorial_banquet"})
+        items = response.json()
+        self.assertEqual([r["achievement"]["id"] for r in items], [2, 4, 10, 6, 8])
+        self.assertEqual(items[2]["current_progress"], 4)
+        self.assertFalse(items[3]["is_unlocked"])
+
+        _, response = await self.request("/achievements/7")
+        self.assertEqual((response.json()["achievement"]["name"], response.json()["current_progress"]), ("成就7", 0))
+
+    async def test_summary_cache_and_etag(self):
+        """测试重复请求摘要不查询数据库，带 If-None-Match 时返回304，解锁后失效"""
+        await self.seed(10)
+        count, response = await self.request("/achievements/summary")
+        self.assertEqual(count, 1)
+        etag = response.headers["ETag"]
+
+        count, response = await self.request("/achievements/summary")
+        self.assertEqual((count, response.status_code), (0, 200))
+
+        count, response = await self.request("/achievements/summary", headers={"If-None-Match": etag})
+        self.assertEqual((count, response.status_code), (0, 304))
+        self.assertEqual(response.headers["ETag"], etag)
+
+        # 解锁新成就后摘要失效，ETag 变化
+        async with AsyncSessionLocal() as db:
+            db.add(UserAchievement(user_id=USER.id, achievement_id=9, current_progress=10, is_unlocked=True,
+                                   unlocked_at=datetime.utcnow()))
+            await db.commit()
+        achievement_summaries.invalidate("1")
+        count, response = await self.request("/achievements/summary", headers={"If-None-Match": etag})
+        self.assertEqual((count, response.status_code), (1, 200))
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json()["recent_unlocked"][0]["achievement"]["id"], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import unittest
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+from app.database import AsyncSessionLocal
+from app.games.o2_SamePatternHunt.game import o2SPHGame
+from app.models import Achievement, Base, GameSession, PlayerStats, UserAchievement
+from app.models.player import Player
+from app.services.achievement_catalog import achievement_catalog
+from app.services.game_result_pipeline import game_results
+
+
+class FakeWebSocket:
+    """记录收到的消息的模拟WebSocket"""
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+
+class TestAsyncPersistence(unittest.IsolatedAsyncioTestCase):
+    """游戏结果异步持久化测试类（使用 aiosqlite 内存数据库）"""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        AsyncSessionLocal.configure(bind=self.engine)
+        async with AsyncSessionLocal() as db:
+            db.add_all([
+                Achievement(name="SPH_游戏新手", description="完成1局", achievement_type="game_count",
+                            condition_type="total_games", target_value=1, game_type="same_pattern_hunt"),
+                Achievement(name="SPH_初次胜利", description="获得1次胜利", achievement_type="victory",
+                            condition_type="win_count", target_value=1, game_type="same_pattern_hunt"),
+            ])
+            await db.commit()
+        achievement_catalog.invalidate()
+
+    async def asyncTearDown(self):
+        await game_results.stop()
+        AsyncSessionLocal.configure(bind=database.async_engine)
+        await self.engine.dispose()
+
+    async def test_record_game_results(self):
+        """测试游戏结束后写入游戏记录、统计信息并解锁成就"""
+        game = o2SPHGame("room-1")
+        ws = FakeWebSocket()
+        for pid in ("1", "2"):
+            game.players[pid] = Player(pid, f"玩家{pid}", "", user_id=int(pid))
+        game._index_connection(ws, "1")
+        await game.start_game(mode="multi")
+        game.scores = {"1": 5, "2": 0}
+
+        await game.record_game_results()
+        # 结果交给写后管道，提交后立即返回
+        self.assertEqual(game_results.pending_count(), 2)
+        await game_results.flush()
+
+        async with AsyncSessionLocal() as db:
+            sessions = (await db.execute(select(GameSession).order_by(GameSession.user_id))).scalars().all()
+            self.assertEqual([(s.user_id, s.score) for s in sessions], [(1, 5), (2, 0)])
+            stats = await db.get(PlayerStats, (1, "same_pattern_hunt"))
+            self.assertEqual(stats.total_games, 1)
+            self.assertEqual(stats.best_score, 5)
+            unlocked = (await db.execute(select(UserAchievement).where(UserAchievement.user_id == 1))).scalars().all()
+            self.assertTrue(unlocked)
+
+        # 同一局解锁的成就合并为一条消息
+        notices = [m for m in ws.messages if m["type"] == "achievement_unlocked"]
+        self.assertEqual(len(notices), 1)
+        self.assertEqual(sorted(a["name"] for a in notices[0]["achievements"]), ["SPH_初次胜利", "SPH_游戏新手"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from fastapi import HTTPException, Response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import auth, database
+from app.auth import create_access_token, get_current_user
+from app.auth_routes import UserUpdate, logout, update_user_profile
+from app.database import AsyncSessionLocal
+from app.models import Base
+from app.models.user import User
+
+
+class TestAuthCache(unittest.IsolatedAsyncioTestCase):
+    """认证缓存测试类"""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        AsyncSessionLocal.configure(bind=self.engine)
+        async with AsyncSessionLocal() as db:
+            db.add(User(username="alice", email="alice@example.com", hashed_password="x", avatar="a.png"))
+            await db.commit()
+        auth._token_cache.clear()
+        auth._user_cache.clear()
+        self.token = create_access_token({"sub": "alice"})
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+    async def asyncTearDown(self):
+        AsyncSessionLocal.configure(bind=database.async_engine)
+        auth._token_cache.clear()
+        auth._user_cache.clear()
+        await self.engine.dispose()
+
+    async def current_user(self, token=None):
+        async with AsyncSessionLocal() as db:
+            return await get_current_user(cookie_token=token or self.token, db=db)
+
+    async def test_cached_user_skips_database(self):
+        """测试第二次认证不查询数据库"""
+        user = await self.current_user()
+        self.assertEqual((user.username, len(self.statements)), ("alice", 1))
+        user = await self.current_user()
+        self.assertEqual((user.username, len(self.statements)), ("alice", 1))
+
+    async def test_invalid_token(self):
+        """测试无效令牌返回401且不会被缓存"""
+        with self.assertRaises(HTTPException) as ctx:
+            await self.current_user("not-a-token")
+        self.assertEqual(ctx.exception.status_code, 401)
+        self.assertEqual(len(auth._token_cache), 0)
+
+    async def test_profile_update_invalidates(self):
+        """测试修改资料后重新读取用户"""
+        user = await self.current_user()
+        await update_user_profile(UserUpdate(avatar="b.png"), current_user=user)
+        self.assertEqual((await self.current_user()).avatar, "b.png")
+
+    async def test_logout_invalidates(self):
+        """测试登出清除令牌和用户缓存"""
+        await self.current_user()
+        await logout(Response(), cookie_token=self.token)
+        self.assertNotIn(self.token, auth._token_cache)
+        self.assertNotIn("alice", auth._user_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
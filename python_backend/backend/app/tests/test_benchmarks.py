@@ -0,0 +1,48 @@
+import os
+import unittest
+
+from benchmarks.cases import MB_DIFFICULTIES, PLAYER_COUNTS, all_cases
+from benchmarks.harness import compare, load_baseline, run_all
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baseline.json")
+
+
+def report_of(**relative):
+    return {"results": {name: {"relative": value} for name, value in relative.items()}}
+
+
+class TestCompare(unittest.TestCase):
+    """基线比较测试类"""
+
+    def test_statuses(self):
+        """测试超过容差判为回归或提升，容差内持平，新增和缺失的用例单独标记"""
+        baseline = report_of(a=1.0, b=1.0, c=1.0, gone=1.0)
+        current = report_of(a=1.2, b=1.3, c=0.7, added=1.0)
+        rows = {row["name"]: row["status"] for row in compare(current, baseline, tolerance=0.25)}
+        self.assertEqual(rows, {"a": "ok", "b": "regression", "c": "improved", "added": "new", "gone": "missing"})
+
+
+class TestBenchmarkCases(unittest.IsolatedAsyncioTestCase):
+    """基准用例冒烟测试"""
+
+    async def test_cases_run(self):
+        """测试每类用例都能运行，并把消息送达所有玩家"""
+        cases = [case for case in all_cases() if "players=4]" in case.name]
+        report = await run_all(cases, rounds=1, max_time=0)
+        self.assertEqual(set(report["results"]), {case.name for case in cases})
+        for name, result in report["results"].items():
+            self.assertGreater(result["relative"], 0, name)
+            self.assertGreater(result["messages"], 0, name)
+        # 每次状态广播都发给全部4名玩家
+        self.assertEqual(report["results"]["room.broadcast_state[players=4]"]["messages"], 4)
+        self.assertEqual(report["results"]["o3MB.broadcast_game_state[extreme,players=4]"]["messages"], 4)
+
+    def test_baseline_covers_all_cases(self):
+        """测试基线包含全部用例（新增用例后需要用 --save 更新基线）"""
+        names = [case.name for case in all_cases()]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(set(load_baseline(BASELINE)["results"]), set(names))
+        self.assertTrue(any(f"players={max(PLAYER_COUNTS)}]" in name for name in names))
+        for difficulty in MB_DIFFICULTIES:
+            self.assertTrue(any(f"[{difficulty}," in name for name in names))
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from fastapi import WebSocketDisconnect
+
+from app.cluster import ClusterNode, InProcessBus, InProcessHub, MemoryOwnershipTable, RedisBus, create_cluster_node
+from app.games.factory import GameFactory
+from app.room_registry import RoomRegistry
+from app.rooms import Room
+
+
+class FakeClient:
+    """模拟客户端WebSocket，receive_text 从队列读取，None 表示断开"""
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.messages = []
+
+    async def receive_text(self) -> str:
+        text = await self.incoming.get()
+        if text is None:
+            raise WebSocketDisconnect()
+        return text
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def wait_until(predicate, timeout: float = 2.0) -> bool:
+    """等待经总线转发的消息处理完成，负载较高时固定的等待时间可能不够"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+def make_worker(worker_id: str, hub: InProcessHub, ownership: MemoryOwnershipTable) -> ClusterNode:
+    registry = RoomRegistry()
+
+    async def provider(room_id: str, game_type: str) -> Room:
+        room = registry.get(room_id, game_type)
+        if room is None:
+            room = registry.add(Room(room_id, GameFactory.create_game(game_type, room_id), gameType=game_type))
+        return room
+
+    return ClusterNode(worker_id, InProcessBus(hub), ownership, registry, provider)
+
+
+class TestClusterForwarding(unittest.IsolatedAsyncioTestCase):
+    """集群转发测试类"""
+
+    async def asyncSetUp(self):
+        hub = InProcessHub()
+        ownership = MemoryOwnershipTable()
+        self.a = make_worker("worker-a", hub, ownership)
+        self.b = make_worker("worker-b", hub, ownership)
+        await self.a.start()
+        await self.b.start()
+
+    async def asyncTearDown(self):
+        await self.a.stop()
+        await self.b.stop()
+
+    async def test_forward_to_owner(self):
+        """测试连接到非房主worker时，消息经总线转发到房主worker的房间"""
+        self.assertEqual(await self.a.claim("r1"), "worker-a")
+        room = await self.a.room_provider("r1", "o2SPH")
+        self.assertEqual(await self.b.claim("r1"), "worker-a")
+
+        client = FakeClient()
+        task = asyncio.create_task(self.b.forward(client, "r1", "o2SPH", {"id": "p2", "name": "玩家2"}, "worker-a"))
+        self.assertTrue(await wait_until(lambda: client.messages and client.messages[-1]["type"] == "room_state"))
+        self.assertIn("p2", room.players)
+
+        # 房间列表同步到其他worker
+        self.assertTrue(await wait_until(lambda: (self.b.registry.entry("r1") or {}).get("players")))
+        self.assertTrue(self.b.registry.is_remote("r1"))
+        self.assertEqual(self.b.registry.entry("r1")["players"][0]["id"], "p2")
+
+        await client.incoming.put(json.dumps({"type": "toggle_ready"}))
+        self.assertTrue(await wait_until(lambda: client.messages[-1].get("players", {}).get("p2", {}).get("ready")))
+        self.assertIn("p2", room.ready_players)
+
+        await client.incoming.put(None)
+        with self.assertRaises(WebSocketDisconnect):
+            await task
+        self.assertTrue(await wait_until(lambda: "p2" not in room.players))
+
+    async def test_destroyed_room_leaves_remote_lobby(self):
+        """测试房主worker销毁房间后其他worker的大厅列表同步移除"""
+        room = await self.a.room_provider("r2", "o3MB")
+        self.assertTrue(await wait_until(lambda: self.b.registry.game_type_of("r2") == "o3MB"))
+        self.a.registry.remove(room)
+        self.assertTrue(await wait_until(lambda: "r2" not in self.b.registry))
+
+
+class FakePubSub:
+    """模拟 redis PubSub：第一个连接读取时断开，重新订阅后的连接按顺序返回消息"""
+    def __init__(self, redis):
+        self.redis = redis
+        self.channels = []
+
+    async def subscribe(self, *channels):
+        self.channels.extend(channels)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        if self is self.redis.pubsubs[0]:
+            raise ConnectionError("connection reset")
+        if self.redis.messages:
+            return self.redis.messages.pop(0)
+        await asyncio.sleep(0.01)
+        return None
+
+    async def aclose(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.pubsubs = []
+        self.messages = []
+
+    def pubsub(self):
+        self.pubsubs.append(FakePubSub(self))
+        return self.pubsubs[-1]
+
+    async def aclose(self):
+        pass
+
+
+class TestRedisBusReconnect(unittest.IsolatedAsyncioTestCase):
+    """Redis总线断线重连测试类"""
+
+    async def test_resubscribe_after_error(self):
+        """测试读取出错后重新订阅，无法解码的消息被跳过，后续消息照常处理"""
+        fake = FakeRedis()
+        with mock.patch("app.cluster.bus.aioredis", mock.Mock(from_url=lambda url: fake)), \
+                mock.patch("app.cluster.bus.RESUBSCRIBE_DELAY", 0.01):
+            bus = RedisBus("redis://test")
+            received = []
+
+            async def handler(message):
+                received.append(message)
+
+            await bus.subscribe("cluster:lobby", handler)
+            fake.messages = [
+                {"channel": b"cluster:lobby", "data": "{not json"},
+                {"channel": b"cluster:lobby", "data": json.dumps({"op": "ping"})},
+            ]
+            self.assertTrue(await wait_until(lambda: received))
+            await bus.close()
+        self.assertEqual(received, [{"op": "ping"}])
+        self.assertEqual(fake.pubsubs[-1].channels, ["cluster:lobby"])
+
+
+class TestCreateClusterNode(unittest.TestCase):
+    """集群节点配置测试类"""
+
+    def test_single_process_by_default(self):
+        """测试未开启集群模式时不创建节点"""
+        with mock.patch.dict("os.environ", {"CLUSTER_MODE": "off"}):
+            self.assertIsNone(create_cluster_node(RoomRegistry(), None))
+
+    def test_unknown_bus_rejected(self):
+        """测试不支持的总线类型直接报错，而不是退回 Redis"""
+        with mock.patch.dict("os.environ", {"CLUSTER_MODE": "on", "CLUSTER_BUS": "unix"}):
+            with self.assertRaises(ValueError):
+                create_cluster_node(RoomRegistry(), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
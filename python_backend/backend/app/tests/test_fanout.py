@@ -0,0 +1,129 @@
+import asyncio
+import json
+import time
+import unittest
+
+from app.utils.fanout import FanoutEngine
+from app.utils.outbound import ConnectionWriter
+from app.utils.encoding import encode_message
+
+
+class FakeWebSocket:
+    """模拟WebSocket，可设置发送延迟或发送失败"""
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed_code = None
+
+    async def close(self, code: int = 1000):
+        self.closed_code = code
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("connection closed")
+        self.sent.append(text)
+
+
+class TestFanoutEngine(unittest.IsolatedAsyncioTestCase):
+    """广播引擎测试类"""
+
+    async def test_sends_concurrently(self):
+        """测试广播耗时取决于最慢连接而不是耗时之和"""
+        engine = FanoutEngine(send_timeout=1.0)
+        sockets = [FakeWebSocket(delay=0.05) for _ in range(10)]
+        start = time.perf_counter()
+        stats = await engine.send_all(sockets, "hello")
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual(stats["sent"], 10)
+        self.assertTrue(all(ws.sent == ["hello"] for ws in sockets))
+
+    async def test_failed_socket_is_dropped(self):
+        """测试发送失败的连接放入dropped"""
+        engine = FanoutEngine(send_timeout=1.0)
+        good, bad = FakeWebSocket(), FakeWebSocket(fail=True)
+        stats = await engine.send_all([good, bad], "x")
+        self.assertEqual(stats["dropped"], [bad])
+        self.assertEqual(good.sent, ["x"])
+
+    async def test_slow_socket_is_closed(self):
+        """测试发送超时的连接被关闭，断开前的广播跳过它"""
+        engine = FanoutEngine(send_timeout=0.05)
+        good, slow = FakeWebSocket(), FakeWebSocket(delay=0.5)
+        stats = await engine.send_all([good, slow], "a")
+        self.assertEqual(stats["timed_out"], [slow])
+        self.assertTrue(engine.is_closing(slow))
+        await asyncio.sleep(0)
+        self.assertEqual(slow.closed_code, 1008)
+
+        stats = await engine.send_all([good, slow], "b")
+        self.assertEqual(stats["skipped"], 1)
+        self.assertEqual(good.sent, ["a", "b"])
+
+        engine.release(slow)
+        self.assertFalse(engine.is_closing(slow))
+
+    async def test_attached_socket_does_not_block(self):
+        """测试attach出站队列后广播只入队，不等待慢连接"""
+        engine = FanoutEngine(send_timeout=1.0)
+        slow = FakeWebSocket(delay=0.2)
+        engine.attach(slow)
+        start = time.perf_counter()
+        stats = await engine.send_all([slow], "q", "card_flipped")
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertEqual(stats["queued"], 1)
+        await asyncio.sleep(0.3)
+        self.assertEqual(slow.sent, ["q"])
+        await engine.detach(slow)
+
+
+class TestConnectionWriter(unittest.IsolatedAsyncioTestCase):
+    """出站队列策略测试类"""
+
+    async def test_coalesce_snapshots(self):
+        """测试coalesce策略只保留最新的快照消息"""
+        ws = FakeWebSocket()
+        writer = ConnectionWriter(ws, maxsize=10, policy="coalesce")
+        writer.put("s1", "game_state")
+        writer.put("flip", "card_flipped")
+        writer.put("s2", "game_state")
+        await asyncio.sleep(0.01)
+        self.assertEqual(ws.sent, ["flip", "s2"])
+        self.assertEqual(writer.dropped_messages, 1)
+        await writer.close()
+
+    async def test_drop_oldest(self):
+        """测试drop_oldest策略在队列满时丢弃最旧消息"""
+        ws = FakeWebSocket()
+        writer = ConnectionWriter(ws, maxsize=2, policy="drop_oldest")
+        for text in ("a", "b", "c"):
+            writer.put(text)
+        await asyncio.sleep(0.01)
+        self.assertEqual(ws.sent, ["b", "c"])
+        await writer.close()
+
+    async def test_disconnect_on_overflow(self):
+        """测试disconnect策略在队列满时关闭连接"""
+        ws = FakeWebSocket()
+        writer = ConnectionWriter(ws, maxsize=1, policy="disconnect")
+        self.assertTrue(writer.put("a"))
+        self.assertFalse(writer.put("b"))
+        await asyncio.sleep(0.01)
+        self.assertTrue(writer.closed)
+        self.assertEqual(ws.closed_code, 1008)
+
+
+class TestEncodeMessage(unittest.TestCase):
+    """出站消息编码测试类"""
+
+    def test_round_trip(self):
+        """测试编码结果与标准库json解析一致"""
+        data = {"type": "game_state", "gameInfo": {"p1": {"score": 3, "name": "玩家"}}, "ok": True, "x": None}
+        self.assertEqual(json.loads(encode_message(data)), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
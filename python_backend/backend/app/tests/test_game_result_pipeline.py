@@ -0,0 +1,192 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from unittest import mock
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import Base, GameSession, PlayerStats
+from app.services.game_result_pipeline import GameResult, GameResultPipeline
+
+
+def make_result(user_id: int, score: int = 1) -> GameResult:
+    now = datetime.utcnow()
+    return GameResult(user_id, "same_pattern_hunt", "room-1", now, now, 0, score, 50.0, is_winner=score > 0)
+
+
+class TestGameResultPipeline(unittest.IsolatedAsyncioTestCase):
+    """游戏结果写后管道测试类"""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.spool_path = os.path.join(self.tmpdir.name, "results.spool.jsonl")
+        self.pipeline = GameResultPipeline(self.sessions, flush_interval=60, max_batch_size=3, spool_path=self.spool_path)
+
+    async def asyncTearDown(self):
+        await self.pipeline.stop()
+        await self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    async def count_rows(self, model=GameSession) -> int:
+        async with self.sessions() as db:
+            return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+    async def test_submit_returns_before_write(self):
+        """测试提交不等待数据库写入"""
+        self.pipeline.submit([make_result(1), make_result(2)])
+        self.assertEqual(self.pipeline.pending_count(), 2)
+        self.assertEqual(await self.count_rows(), 0)
+
+        self.assertEqual(await self.pipeline.flush(), 2)
+        self.assertEqual(await self.count_rows(), 2)
+        self.assertEqual(self.pipeline.pending_count(), 0)
+
+    async def test_batches_and_callbacks(self):
+        """测试多局结果合并写入，且每次提交的回调收到自己的结果"""
+        received = []
+
+        async def on_persisted(results, total_games):
+            received.append([r.user_id for r in results])
+
+        self.pipeline.submit([make_result(1), make_result(2)], on_persisted)
+        self.pipeline.submit([make_result(3)], on_persisted)
+        self.pipeline.submit([make_result(4), make_result(5)], on_persisted)
+        await self.pipeline.flush()
+
+        # max_batch_size=3：前两局一批，第三局一批，单次提交不拆分
+        self.assertEqual(self.pipeline.stats["batches"], 2)
+        self.assertEqual(received, [[1, 2], [3], [4, 5]])
+        self.assertEqual(await self.count_rows(), 5)
+
+    async def test_spool_when_database_unavailable(self):
+        """测试数据库不可用时结果写入暂存文件，恢复后重放并执行回调"""
+        broken = create_async_engine(f"sqlite+aiosqlite:///{self.tmpdir.name}/missing/db.sqlite")
+        self.pipeline.session_factory = async_sessionmaker(bind=broken)
+        received = []
+
+        async def on_persisted(results, total_games):
+            received.append(len(results))
+
+        self.pipeline.submit([make_result(1), make_result(2)], on_persisted)
+        self.assertEqual(await self.pipeline.flush(), 0)
+        self.assertTrue(os.path.exists(self.spool_path))
+        self.assertEqual(self.pipeline.stats["spooled"], 2)
+
+        # 数据库仍不可用时新结果也追加到暂存文件
+        self.pipeline.submit([make_result(3)])
+        await self.pipeline.flush()
+        self.assertEqual(self.pipeline.stats["spooled"], 3)
+        self.assertEqual(received, [])
+        await broken.dispose()
+
+        self.pipeline.session_factory = self.sessions
+        self.assertEqual(await self.pipeline.flush(), 3)
+        self.assertFalse(os.path.exists(self.spool_path))
+        self.assertEqual(received, [2])
+        self.assertEqual(await self.count_rows(), 3)
+
+    async def test_stats_written_in_same_transaction(self):
+        """测试统计写入失败时游戏记录和统计都不变，恢复后两张表一起写入"""
+        received = []
+
+        async def on_persisted(results, total_games):
+            received.append(total_games)
+
+        self.pipeline.submit([make_result(1), make_result(2)], on_persisted)
+        with mock.patch("app.services.game_result_pipeline.apply_game_results", side_effect=RuntimeError("stats")):
+            self.assertEqual(await self.pipeline.flush(), 0)
+        self.assertEqual(await self.count_rows(GameSession), 0)
+        self.assertEqual(await self.count_rows(PlayerStats), 0)
+        self.assertTrue(os.path.exists(self.spool_path))
+        self.assertEqual(received, [])
+
+        # 重放暂存文件时同样在一个事务中写入两张表，并执行回调
+        self.assertEqual(await self.pipeline.flush(), 2)
+        self.assertEqual(await self.count_rows(GameSession), 2)
+        self.assertEqual(await self.count_rows(PlayerStats), 2)
+        self.assertEqual(received, [{(1, "same_pattern_hunt"): 1, (2, "same_pattern_hunt"): 1}])
+
+    def write_spool(self, results, *extra_lines):
+        with open(self.spool_path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+            for line in extra_lines:
+                f.write(line)
+
+    async def test_torn_spool_line_moved_to_bad_file(self):
+        """测试暂存文件中写了一半的行移到 .bad 文件，其余结果照常重放"""
+        self.write_spool([make_result(1), make_result(2)], '{"user_id": 3, "game_ty')
+
+        self.assertEqual(await self.pipeline.flush(), 2)
+        self.assertEqual(await self.count_rows(), 2)
+        self.assertFalse(os.path.exists(self.spool_path))
+        with open(self.spool_path + ".bad", encoding="utf-8") as f:
+            self.assertEqual(f.read(), '{"user_id": 3, "game_ty\n')
+        self.assertEqual(self.pipeline.stats["bad_lines"], 1)
+
+    async def test_replay_skips_committed_results(self):
+        """测试提交后、删除暂存文件前崩溃，重放时不会重复写入"""
+        first, second = make_result(1), make_result(2)
+        self.pipeline.submit([first])
+        await self.pipeline.flush()
+        # 模拟上次进程已提交 first 但没来得及删除暂存文件
+        self.write_spool([first, second])
+        received = []
+
+        async def on_persisted(results, total_games):
+            received.append(total_games)
+
+        self.pipeline._spooled_callbacks.append(([first, second], on_persisted))
+
+        self.assertEqual(await self.pipeline.flush(), 1)
+        self.assertEqual(await self.count_rows(), 2)
+        self.assertFalse(os.path.exists(self.spool_path))
+        # 跳过的结果也带有总游戏数，不会按0判定成就
+        self.assertEqual(received, [{(1, "same_pattern_hunt"): 1, (2, "same_pattern_hunt"): 1}])
+
+        # 旧版本写入的暂存记录没有 result_id，按新结果写入
+        legacy = make_result(3).to_dict()
+        del legacy["result_id"]
+        with open(self.spool_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(legacy) + "\n")
+        self.assertEqual(await self.pipeline.flush(), 1)
+        self.assertEqual(await self.count_rows(), 3)
+
+    async def test_spool_io_off_event_loop(self):
+        """测试暂存文件的写入和 fsync 不在事件循环线程中执行"""
+        broken = create_async_engine(f"sqlite+aiosqlite:///{self.tmpdir.name}/missing/db.sqlite")
+        self.pipeline.session_factory = async_sessionmaker(bind=broken)
+        threads = []
+        fsync = os.fsync
+
+        def record_fsync(fd):
+            threads.append(threading.current_thread())
+            fsync(fd)
+
+        self.pipeline.submit([make_result(1)])
+        with mock.patch("os.fsync", record_fsync):
+            await self.pipeline.flush()
+        await broken.dispose()
+        self.assertEqual(self.pipeline.stats["spooled"], 1)
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    async def test_stop_flushes_pending(self):
+        """测试停止时写入剩余结果"""
+        self.pipeline.start()
+        self.pipeline.submit([make_result(1)])
+        await self.pipeline.stop()
+        self.assertEqual(await self.count_rows(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from app.games.factory import GameFactory
+from app.main import app
+from loadtest.bots import BotSettings
+from loadtest.runner import LoadTest
+from loadtest.stats import percentile, summarize
+from loadtest.transport import ASGITransport
+
+create_game = GameFactory.create_game
+
+
+def create_game_without_preview(game_type, room_id):
+    """o3MB 开局有10秒预览，测试中去掉"""
+    game = create_game(game_type, room_id)
+    if game_type == "o3MB":
+        game.preview_duration = 0
+    return game
+
+
+class TestLoadStats(unittest.TestCase):
+    """负载测试指标计算测试类"""
+
+    def test_percentile_nearest_rank(self):
+        """测试最近秩法分位数"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7.0], 99), 7.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize(self):
+        """测试延迟汇总"""
+        summary = summarize([3.0, 1.0, 2.0])
+        self.assertEqual(summary, {"count": 3, "p50": 2.0, "p95": 3.0, "p99": 3.0, "max": 3.0})
+        self.assertEqual(summarize([])["count"], 0)
+
+
+class TestLoadTest(unittest.IsolatedAsyncioTestCase):
+    """进程内运行机器人负载测试"""
+
+    async def test_bots_play_all_game_types(self):
+        """测试三种游戏各开一个房间，机器人能完整进行一局"""
+        settings = BotSettings(think_ms=0, skill=0, quiz_rounds=2, request_timeout=10)
+        load_test = LoadTest(ASGITransport(app), rooms=1, players=2, games=1, duration=60,
+                             settings=settings, sample_interval=0.5, seed=1)
+        with mock.patch.object(GameFactory, "create_game", staticmethod(create_game_without_preview)), \
+                contextlib.redirect_stdout(io.StringIO()):
+            report = await load_test.run()
+
+        self.assertEqual(report["games_completed"], {"o2SPH": 1, "o3MB": 1, "quiz": 1})
+        self.assertEqual(report["errors"], {})
+        self.assertGreater(report["messages_received"], report["messages_sent"])
+        for event in ("join", "toggle_ready", "start_game", "flip", "flip_pair", "question", "answer", "judgement"):
+            self.assertIn(event, report["latency_ms_by_event"])
+        self.assertEqual(report["config"]["connections"], 6)
+        self.assertIsNotNone(report["server"])
+        self.assertGreaterEqual(report["server"]["samples"], 2)
+
+
+class TestProcessMetrics(unittest.TestCase):
+    """进程指标接口测试类"""
+
+    def test_process_metrics_endpoint(self):
+        """测试 /api/metrics/process 返回CPU时间和内存"""
+        client = TestClient(app)
+        data = client.get("/api/metrics/process").json()
+        for key in ("pid", "wall_time", "cpu_seconds", "rss_bytes", "threads"):
+            self.assertIn(key, data)
+        self.assertGreater(data["rss_bytes"], 0)
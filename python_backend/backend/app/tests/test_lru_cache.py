@@ -0,0 +1,49 @@
+import unittest
+
+from app.utils.lru_cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    """有界 LRU + TTL 缓存测试类"""
+
+    def test_evicts_least_recently_used(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # a 变为最近使用
+        cache.set("c", 3)
+        self.assertNotIn("b", cache)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    def test_ttl(self):
+        """测试条目过期后读取不到，单个条目可覆盖默认TTL"""
+        clock = FakeClock()
+        cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=20)
+        clock.now = 5
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_pop(self):
+        """测试删除条目"""
+        cache = LRUCache()
+        cache.set("a", 1)
+        self.assertEqual(cache.pop("a"), 1)
+        self.assertIsNone(cache.pop("a"))
+        self.assertNotIn("a", cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import unittest
+
+from app.auth import get_password_hash_async, verify_password_async
+from app.utils.password_pool import PasswordPool, PasswordPoolBusy
+
+
+class TestPasswordPool(unittest.IsolatedAsyncioTestCase):
+    """密码哈希线程池测试类"""
+
+    async def test_does_not_block_event_loop(self):
+        """测试哈希计算期间事件循环仍然及时响应"""
+        pool = PasswordPool(workers=2, max_pending=8)
+        lags = []
+
+        async def ticker():
+            for _ in range(20):
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - start - 0.01)
+
+        # time.sleep 与 bcrypt 一样在执行期间释放 GIL
+        await asyncio.gather(ticker(), *(pool.run(time.sleep, 0.1) for _ in range(4)))
+        pool.shutdown()
+        self.assertLess(max(lags), 0.05)
+
+    async def test_admission_control(self):
+        """测试任务数达到上限时拒绝新任务"""
+        pool = PasswordPool(workers=1, max_pending=2)
+        results = await asyncio.gather(*(pool.run(time.sleep, 0.05) for _ in range(3)), return_exceptions=True)
+        pool.shutdown()
+        self.assertEqual(sum(isinstance(r, PasswordPoolBusy) for r in results), 1)
+        self.assertEqual((pool.pending, pool.stats["rejected"]), (0, 1))
+
+    async def test_cancelled_job_still_counted(self):
+        """测试调用方取消后，线程中的计算结束前仍占用任务数"""
+        pool = PasswordPool(workers=1, max_pending=1)
+        task = asyncio.create_task(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(pool.pending, 1)
+        with self.assertRaises(PasswordPoolBusy):
+            await pool.run(time.sleep, 0)
+
+        await asyncio.sleep(0.3)
+        self.assertEqual(pool.pending, 0)
+        pool.shutdown()
+
+    async def test_failed_jobs_counted_separately(self):
+        """测试抛出异常的任务计入 failed"""
+        pool = PasswordPool(workers=1, max_pending=4)
+        await pool.run(time.sleep, 0)
+        with self.assertRaises(ValueError):
+            await pool.run(int, "x")
+        pool.shutdown()
+        self.assertEqual((pool.stats["completed"], pool.stats["failed"], pool.pending), (1, 1, 0))
+
+    async def test_hash_and_verify(self):
+        """测试在线程池中生成和验证密码哈希"""
+        hashed = await get_password_hash_async("secret")
+        self.assertTrue(await verify_password_async("secret", hashed))
+        self.assertFalse(await verify_password_async("wrong", hashed))
+
+
+if __name__ == '__main__':
+    unittest.main()
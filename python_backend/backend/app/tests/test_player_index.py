@@ -0,0 +1,58 @@
+import json
+import unittest
+
+from app.games.quiz_game import QuizGame
+from app.models.player import Player
+
+
+class FakeWebSocket:
+    """记录收到的消息的模拟WebSocket"""
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+
+class TestPlayerIndex(unittest.IsolatedAsyncioTestCase):
+    """玩家->连接反向索引测试类"""
+
+    async def asyncSetUp(self):
+        self.game = QuizGame("room-1")
+        self.sockets = {}
+        for pid in ("questioner-1", "user-1", "user-2"):
+            ws = FakeWebSocket()
+            self.sockets[pid] = ws
+            await self.game.connect(ws, Player(pid, pid, ""))
+
+    async def test_roles_indexed(self):
+        """测试连接时按ID前缀建立角色索引"""
+        self.assertEqual(self.game.role_players["questioner"], {"questioner-1"})
+        self.assertEqual(self.game.role_players["player"], {"user-1", "user-2"})
+
+    async def test_multiple_tabs(self):
+        """测试同一玩家多个标签页都能收到定向消息，最后一个断开才移除"""
+        second_tab = FakeWebSocket()
+        await self.game.connect(second_tab, Player("user-1", "user-1", ""))
+        await self.game.broadcast_to_player("user-1", {"type": "ping"})
+        self.assertEqual(self.sockets["user-1"].messages[-1], {"type": "ping"})
+        self.assertEqual(second_tab.messages[-1], {"type": "ping"})
+        self.assertNotIn({"type": "ping"}, self.sockets["user-2"].messages)
+
+        await self.game.disconnect(second_tab)
+        self.assertEqual(self.game.sockets_of("user-1"), {self.sockets["user-1"]})
+        self.assertIn("user-1", self.game.role_players["player"])
+
+        await self.game.disconnect(self.sockets["user-1"])
+        self.assertNotIn("user-1", self.game.player_sockets)
+        self.assertNotIn("user-1", self.game.role_players["player"])
+
+    async def test_broadcast_to_roles(self):
+        """测试按角色广播只发送给对应角色"""
+        await self.game.broadcast_to_roles({"type": "hint"}, ["questioner"])
+        self.assertEqual(self.sockets["questioner-1"].messages[-1], {"type": "hint"})
+        self.assertNotIn({"type": "hint"}, self.sockets["user-1"].messages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import Base, GameSession, PlayerStats
+from app.services.game_result_pipeline import GameResult
+from app.services.player_stats import (
+    apply_game_results, apply_session_change, completed_snapshot, reconcile_player_stats
+)
+
+START = datetime(2026, 1, 1)
+
+
+def make_result(user_id: str, score: int, accuracy: float, minutes: int, game_type: str = "same_pattern_hunt") -> GameResult:
+    end = START + timedelta(minutes=minutes)
+    return GameResult(user_id, game_type, "room-1", START, end, minutes * 60, score, accuracy)
+
+
+class TestPlayerStats(unittest.IsolatedAsyncioTestCase):
+    """玩家统计增量维护测试类"""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def record(self, results):
+        async with self.sessions() as db:
+            for r in results:
+                db.add(GameSession(**r.to_row()))
+            totals = await apply_game_results(db, results)
+            await db.commit()
+        return totals
+
+    async def get_stats(self, user_id: int = 1, game_type: str = "same_pattern_hunt") -> PlayerStats:
+        async with self.sessions() as db:
+            return await db.get(PlayerStats, (user_id, game_type))
+
+    async def test_incremental_aggregates(self):
+        """测试多次累加后的统计与全量聚合一致"""
+        totals = await self.record([make_result("1", 10, 50.0, 1)])
+        self.assertEqual(totals, {(1, "same_pattern_hunt"): 1})
+        # 同一批中同一玩家的多局合并为一次累加
+        totals = await self.record([make_result("1", 4, 100.0, 3), make_result("1", 7, 75.0, 2), make_result("2", 1, 10.0, 1)])
+        self.assertEqual(totals, {(1, "same_pattern_hunt"): 3, (2, "same_pattern_hunt"): 1})
+
+        stats = await self.get_stats()
+        self.assertEqual(stats.total_games, 3)
+        self.assertEqual(stats.total_score, 21)
+        self.assertEqual(stats.best_score, 10)
+        self.assertAlmostEqual(float(stats.average_score), 7.0)
+        self.assertAlmostEqual(float(stats.average_accuracy), 75.0)
+        self.assertEqual(stats.total_play_time_seconds, 360)
+        self.assertEqual(stats.last_played, START + timedelta(minutes=3))
+
+    async def test_session_change(self):
+        """测试修改会话时按前后差值更新统计"""
+        await self.record([make_result("1", 10, 50.0, 1)])
+        async with self.sessions() as db:
+            session = GameSession(user_id=1, game_type="same_pattern_hunt", start_time=START, status="in_progress")
+            db.add(session)
+            await db.flush()
+            # 未完成的会话不计入统计
+            before = completed_snapshot(session)
+            self.assertIsNone(before)
+            session.status = "completed"
+            session.score = 20
+            session.accuracy = 100
+            session.duration_seconds = 60
+            session.end_time = START + timedelta(minutes=5)
+            await apply_session_change(db, before, session)
+
+            # 已完成的会话再次修改只累加差值
+            before = completed_snapshot(session)
+            session.score = 30
+            await apply_session_change(db, before, session)
+            await db.commit()
+
+        stats = await self.get_stats()
+        self.assertEqual(stats.total_games, 2)
+        self.assertEqual(stats.total_score, 40)
+        self.assertEqual(stats.best_score, 30)
+        self.assertAlmostEqual(float(stats.average_accuracy), 75.0)
+
+    async def test_reconcile(self):
+        """测试从游戏记录批量重建统计"""
+        await self.record([make_result("1", 10, 50.0, 1), make_result("2", 3, 30.0, 1, "memorial_banquet")])
+        async with self.sessions() as db:
+            # 模拟统计出错：删除游戏记录后统计未同步
+            await db.execute(delete(GameSession).where(GameSession.user_id == 1))
+            db.add(GameSession(**make_result("1", 2, 20.0, 2).to_row()))
+            count = await reconcile_player_stats(db, batch_size=1)
+            await db.commit()
+        self.assertEqual(count, 2)
+
+        stats = await self.get_stats()
+        self.assertEqual((stats.total_games, stats.total_score, stats.best_score), (1, 2, 2))
+        self.assertAlmostEqual(float(stats.average_accuracy), 20.0)
+        other = await self.get_stats(2, "memorial_banquet")
+        self.assertEqual(other.total_score, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from app.utils.pool_metrics import PoolMetrics, instrumented_pool_class
+
+
+class TestPoolMetrics(unittest.TestCase):
+    """连接池指标测试类"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.metrics = PoolMetrics("test")
+        self.engine = create_engine(
+            f"sqlite:///{self.path}",
+            poolclass=instrumented_pool_class(QueuePool, self.metrics),
+            pool_size=1,
+            max_overflow=1,
+            pool_timeout=0.2
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_checkout_overflow_wait_and_timeout(self):
+        """测试取连接次数、溢出连接峰值、排队和超时"""
+        first = self.engine.connect()
+        second = self.engine.connect()  # 溢出连接
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+
+        # 归还连接后排队的请求可以取到连接
+        waiter = threading.Thread(target=lambda: self.engine.connect().close())
+        waiter.start()
+        time.sleep(0.1)
+        second.close()
+        waiter.join()
+        first.close()
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["checkouts"], 3)
+        self.assertEqual(snapshot["timeouts"], 1)
+        self.assertGreaterEqual(snapshot["waits"], 1)
+        self.assertEqual(snapshot["peak_overflow"], 1)
+        self.assertGreaterEqual(snapshot["checkout_ms"]["max"], 50)
+        self.assertEqual(sum(snapshot["checkout_ms"]["buckets"].values()), 3)
+        self.assertEqual(snapshot["pool"]["checked_out"], 0)
+
+    def test_survives_dispose(self):
+        """测试重建连接池后继续记录"""
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        self.engine.dispose()
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        self.assertEqual(self.metrics.checkouts, 2)
+        self.assertIs(self.metrics.pool, self.engine.pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
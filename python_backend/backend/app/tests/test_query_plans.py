@@ -0,0 +1,45 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from app.models import Base
+from app.models.game_record import GameSession
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "..", "migrations", "check_query_plans.py")
+spec = importlib.util.spec_from_file_location("check_query_plans", SCRIPT)
+check_query_plans = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(check_query_plans)
+
+
+class TestQueryPlans(unittest.TestCase):
+    """game_sessions热点查询执行计划检查测试类（SQLite小数据集）"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{self.tmpdir.name}/explain.db"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hot_queries_use_indexes(self):
+        """测试热点查询都命中索引"""
+        self.assertTrue(check_query_plans.check(self.url, 5000))
+
+    def test_missing_composite_indexes_fail(self):
+        """测试缺少复合索引时检查失败"""
+        engine = create_engine(self.url)
+        Base.metadata.create_all(engine, tables=[GameSession.__table__])
+        with engine.begin() as conn:
+            # 只保留单列索引
+            for index in GameSession.__table__.indexes:
+                if len(index.columns) > 1:
+                    conn.execute(text(f"DROP INDEX {index.name}"))
+        engine.dispose()
+        self.assertFalse(check_query_plans.check(self.url, 5000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import unittest
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+from app.database import AsyncSessionLocal
+from app.games.o2_SamePatternHunt.game import o2SPHGame
+from app.models import Achievement, Base
+from app.models.player import Player
+from app.services.achievement_catalog import achievement_catalog
+from app.services.game_result_pipeline import game_results
+
+
+class FakeWebSocket:
+    """记录收到的消息的模拟WebSocket"""
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+
+class TestRoomAchievements(unittest.IsolatedAsyncioTestCase):
+    """房间级成就判定测试类"""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        AsyncSessionLocal.configure(bind=self.engine)
+        async with AsyncSessionLocal() as db:
+            for condition_type, target in (("total_games", 1), ("total_games", 10), ("win_count", 1), ("score_threshold", 3)):
+                db.add(Achievement(name=f"{condition_type}_{target}", description="", achievement_type="game_count",
+                                   condition_type=condition_type, target_value=target, game_type="same_pattern_hunt"))
+            await db.commit()
+        achievement_catalog.invalidate()
+        await achievement_catalog.ensure_fresh()
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement.split()[0].upper()))
+
+    async def asyncTearDown(self):
+        await game_results.stop()
+        AsyncSessionLocal.configure(bind=database.async_engine)
+        await self.engine.dispose()
+
+    async def finish_room(self, room_id: str, player_ids):
+        """结束一局多人游戏，返回 (本局执行的语句, 玩家ID -> 收到的消息)"""
+        game = o2SPHGame(room_id)
+        sockets = {}
+        for pid in player_ids:
+            game.players[pid] = Player(pid, f"玩家{pid}", "", user_id=int(pid))
+            sockets[pid] = FakeWebSocket()
+            game._index_connection(sockets[pid], pid)
+        await game.start_game(mode="multi")
+        # 第一个玩家获胜，其余玩家 0 分
+        game.scores = {pid: (5 if i == 0 else 0) for i, pid in enumerate(player_ids)}
+        for ws in sockets.values():
+            ws.messages.clear()
+
+        self.statements.clear()
+        await game.record_game_results()
+        await game_results.flush()
+        return list(self.statements), {pid: ws.messages for pid, ws in sockets.items()}
+
+    async def test_statement_count_independent_of_room_size(self):
+        """测试一局结束后的数据库语句数与房间人数无关"""
+        small, _ = await self.finish_room("room-small", [str(i) for i in range(1, 3)])
+        large, _ = await self.finish_room("room-large", [str(i) for i in range(10, 18)])
+        self.assertEqual(small, large)
+        # 已写入结果查询 + 写入记录、统计upsert + 查询、胜利次数、成就进度查询 + upsert
+        self.assertEqual(large.count("INSERT"), 3)
+        self.assertEqual(large.count("SELECT"), 4)
+
+    async def test_one_message_per_player(self):
+        """测试每个解锁成就的玩家只收到一条合并后的通知"""
+        _, messages = await self.finish_room("room-1", ["1", "2", "3"])
+        notices = {pid: [m for m in items if m["type"] == "achievement_unlocked"] for pid, items in messages.items()}
+        self.assertEqual({pid: len(items) for pid, items in notices.items()}, {"1": 1, "2": 1, "3": 1})
+        winner = sorted(a["name"] for a in notices["1"][0]["achievements"])
+        self.assertEqual(winner, ["score_threshold_3", "total_games_1", "win_count_1"])
+        self.assertEqual([a["name"] for a in notices["2"][0]["achievements"]], ["total_games_1"])
+        # 兼容只读取单个成就的客户端
+        self.assertEqual(notices["2"][0]["achievement"]["name"], "total_games_1")
+
+
+if __name__ == '__main__':
+    unittest.main()
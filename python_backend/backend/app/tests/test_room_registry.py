@@ -0,0 +1,149 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from app.games.factory import GameFactory
+from app.lobby import LobbyHub
+from app.models.player import Player
+from app.room_registry import DEFAULT_PAGE_SIZE, RoomRegistry
+from app.rooms import Room
+from app.utils.fanout import fanout
+
+
+class FakeWebSocket:
+    """记录收到的消息的模拟WebSocket"""
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+def make_room(room_id: str, game_type: str = "o2SPH") -> Room:
+    return Room(room_id, GameFactory.create_game(game_type, room_id), gameType=game_type)
+
+
+class TestRoomRegistry(unittest.IsolatedAsyncioTestCase):
+    """房间注册表测试类"""
+
+    def test_lookup_by_id(self):
+        """测试全局ID索引和游戏类型过滤"""
+        rooms = RoomRegistry()
+        room = rooms.add(make_room("r1"))
+        self.assertIs(rooms.get("r1"), room)
+        self.assertIs(rooms.get("r1", "o2SPH"), room)
+        self.assertIsNone(rooms.get("r1", "o3MB"))
+        with self.assertRaises(ValueError):
+            rooms.add(make_room("r1", "o3MB"))
+
+    def test_quiz_room_entry(self):
+        """测试答题房间的大厅条目带有最大人数"""
+        rooms = RoomRegistry()
+        rooms.add(make_room("q1", "quiz"))
+        page, _ = rooms.list_rooms("quiz")
+        self.assertEqual(page[0]["maxPlayers"], 2)
+
+    def test_cursor_pagination(self):
+        """测试游标分页跳过已删除的房间"""
+        rooms = RoomRegistry()
+        created = [rooms.add(make_room(f"r{i}")) for i in range(10)]
+        rooms.remove(created[3])
+        rooms.remove(created[4])
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = rooms.list_rooms("o2SPH", cursor=cursor, limit=3)
+            seen.extend(entry["id"] for entry in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f"r{i}" for i in range(10) if i not in (3, 4)])
+        self.assertEqual(rooms.count("o2SPH"), 8)
+
+    def test_paged_by_default(self):
+        """测试未指定分页大小时按默认大小分页"""
+        rooms = RoomRegistry()
+        for i in range(DEFAULT_PAGE_SIZE + 10):
+            rooms.add(make_room(f"r{i}"))
+        page, cursor = rooms.list_rooms("o2SPH")
+        self.assertEqual(len(page), DEFAULT_PAGE_SIZE)
+        self.assertIsNotNone(cursor)
+
+        page, cursor = rooms.list_rooms("o2SPH", limit=5)
+        self.assertEqual(len(page), 5)
+        page, _ = rooms.list_rooms("o2SPH", cursor=cursor)
+        self.assertEqual(len(page), DEFAULT_PAGE_SIZE)
+        self.assertEqual(page[0]["id"], "r5")
+
+    async def test_entry_follows_room_changes(self):
+        """测试玩家加入和开始游戏后大厅条目及状态索引同步更新"""
+        rooms = RoomRegistry()
+        events = []
+        rooms.add_listener(lambda event, game_type, room_id, entry, remote: events.append(event))
+        room = rooms.add(make_room("r1"))
+
+        await room.connect(FakeWebSocket(), Player("p1", "玩家1", ""))
+        entry = rooms.entry("r1")
+        self.assertEqual(entry["owner"], "玩家1")
+        self.assertEqual([p["id"] for p in entry["players"]], ["p1"])
+
+        room.status = "playing"
+        await room.broadcast_state()
+        self.assertEqual(rooms.count("o2SPH", "waiting"), 0)
+        page, _ = rooms.list_rooms("o2SPH", status="playing")
+        self.assertEqual([e["id"] for e in page], ["r1"])
+
+        rooms.remove(room)
+        self.assertEqual(events, ["created", "updated", "updated", "destroyed"])
+        self.assertIsNone(rooms.get("r1"))
+
+
+class TestLobbyHub(unittest.IsolatedAsyncioTestCase):
+    """大厅推送测试类"""
+
+    async def test_snapshot_then_deltas(self):
+        """测试订阅后先收到快照，再按顺序收到房间增量事件"""
+        rooms = RoomRegistry()
+        hub = LobbyHub(rooms)
+        rooms.add(make_room("r0"))
+
+        browser = FakeWebSocket()
+        hub.subscribe(browser, "o2SPH")
+        room = rooms.add(make_room("r1"))
+        await room.connect(FakeWebSocket(), Player("p1", "玩家1", ""))
+        rooms.add(make_room("m1", "o3MB"))  # 其他游戏类型不推送
+        rooms.remove(room)
+        await asyncio.sleep(0.01)
+
+        types = [m["type"] for m in browser.messages]
+        self.assertEqual(types, ["lobby_snapshot", "room_created", "room_updated", "room_destroyed"])
+        self.assertEqual([r["id"] for r in browser.messages[0]["rooms"]], ["r0"])
+        self.assertEqual(browser.messages[2]["room"]["players"][0]["name"], "玩家1")
+        self.assertEqual(browser.messages[3]["room_id"], "r1")
+
+        await hub.unsubscribe(browser, "o2SPH")
+        self.assertEqual(hub.subscriber_count(), 0)
+
+    async def test_slow_subscriber_disconnected(self):
+        """测试订阅连接的出站队列满时断开连接，而不是丢弃增量事件"""
+        rooms = RoomRegistry()
+        hub = LobbyHub(rooms)
+        browser = FakeWebSocket()
+        with mock.patch.object(fanout, "queue_size", 2):
+            hub.subscribe(browser, "o2SPH")
+        # 写协程尚未运行，快照和前一个事件占满队列
+        rooms.add(make_room("r1"))
+        rooms.add(make_room("r2"))
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(browser.close_code, 1008)
+        self.assertEqual(hub.subscriber_count(), 0)
+        await hub.unsubscribe(browser, "o2SPH")
+
+
+if __name__ == '__main__':
+    unittest.main()
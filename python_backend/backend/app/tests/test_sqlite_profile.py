@@ -0,0 +1,127 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, func, select
+
+from app.database import is_memory_sqlite, pool_options, pool_metrics, sqlite_urls
+from app.models.achievement import Achievement
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCRIPT = os.path.join(BACKEND_DIR, "migrations", "run_migrations.py")
+spec = importlib.util.spec_from_file_location("run_migrations", SCRIPT)
+run_migrations = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(run_migrations)
+
+# 在子进程中以 DATABASE_PROFILE=sqlite 运行应用：迁移、注册登录、记录一局游戏、读取统计和成就
+PROFILE_SCRIPT = """
+import json, os, sys, time
+from datetime import datetime
+from fastapi.testclient import TestClient
+sys.path.insert(0, "migrations")
+from run_migrations import run_sqlite_migrations
+from app import database
+from app.main import app
+
+run_sqlite_migrations(database.engine)
+with TestClient(app) as client:
+    while client.get("/api/health/ready").status_code != 200:
+        time.sleep(0.05)
+    client.post("/auth/register", json={"username": "local_user", "email": "local@example.com", "password": "test123456"})
+    client.post("/auth/login", json={"username": "local_user", "password": "test123456"})
+    session = client.post("/game-records/sessions", json={"game_type": "same_pattern_hunt", "room_id": "r1"}).json()
+    client.put(f"/game-records/sessions/{session['id']}", json={"end_time": datetime.utcnow().isoformat(), "score": 18, "accuracy": 90.0})
+    stats = client.get("/game-records/stats").json()
+    achievements = client.get("/achievements/all").json()
+    with database.engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    print(json.dumps({"stats": stats, "achievements": len(achievements), "journal_mode": journal_mode,
+                      "async_url": database.ASYNC_DATABASE_URL}))
+"""
+
+
+class TestSqliteProfile(unittest.TestCase):
+    """SQLite本地数据库配置测试类"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_urls_and_pools(self):
+        """测试SQLite连接URL和连接池参数"""
+        sync_url, async_url = sqlite_urls(":memory:")
+        self.assertTrue(is_memory_sqlite(sync_url))
+        self.assertTrue(async_url.startswith("sqlite+aiosqlite:///file:quizarena?mode=memory"))
+        self.assertTrue(is_memory_sqlite("sqlite://"))
+        self.assertEqual(sqlite_urls("local.db"), ("sqlite:///local.db", "sqlite+aiosqlite:///local.db"))
+        self.assertFalse(is_memory_sqlite("sqlite:///local.db"))
+        self.assertEqual(pool_options("sqlite:///local.db", pool_metrics["sync"]), {})
+        self.assertIn("poolclass", pool_options(async_url, pool_metrics["async"]))
+
+    def test_sqlite_statement(self):
+        """测试迁移语句转换为SQLite语句"""
+        statements = run_migrations.split_statements(
+            "-- 注释; 不分割\n"
+            "INSERT INTO achievements (name) VALUES ('a;b') -- 行尾注释\n"
+            "ON DUPLICATE KEY UPDATE name = VALUES(name);\n"
+            "UPDATE player_stats ps JOIN game_sessions gs ON gs.user_id = ps.user_id SET ps.total_accuracy = 0;\n"
+            "UPDATE achievements SET icon = 'x';\n"
+            "ALTER TABLE achievements ADD COLUMN x INT;\n"
+            "SELECT 'done' AS message;"
+        )
+        self.assertEqual(len(statements), 5)
+        converted = [run_migrations.sqlite_statement(stmt) for stmt in statements]
+        self.assertEqual(converted[0], "INSERT INTO achievements (name) VALUES ('a;b')")
+        self.assertIsNone(converted[1])
+        self.assertEqual(converted[2], "UPDATE achievements SET icon = 'x';")
+        self.assertEqual(converted[3:], [None, None])
+
+    def test_migrations(self):
+        """测试在SQLite库上建表并应用迁移（成就种子数据），重复执行不会重复应用"""
+        engine = create_engine(f"sqlite:///{self.tmpdir.name}/local.db")
+        try:
+            applied = run_migrations.run_sqlite_migrations(engine)
+            self.assertEqual(applied, [f"{v:03d}" for v in range(1, len(applied) + 1)])
+            self.assertGreaterEqual(len(applied), 7)
+            with engine.connect() as conn:
+                counts = dict(conn.execute(
+                    select(Achievement.game_type, func.count(Achievement.id)).group_by(Achievement.game_type)
+                ).all())
+            self.assertEqual(counts, {"same_pattern_hunt": 7, "memorial_banquet": 15})
+            self.assertEqual(run_migrations.run_sqlite_migrations(engine), [])
+        finally:
+            engine.dispose()
+
+    def _run_profile(self, sqlite_path):
+        env = dict(os.environ, DATABASE_PROFILE="sqlite", SQLITE_PATH=sqlite_path, PYTHONIOENCODING="utf-8",
+                   GAME_RESULT_SPOOL=os.path.join(self.tmpdir.name, "results.spool.jsonl"))
+        env.pop("ASYNC_DATABASE_URL", None)
+        result = subprocess.run([sys.executable, "-c", PROFILE_SCRIPT], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_memory_profile(self):
+        """测试内存库配置：同步、异步引擎共享同一个库，应用不依赖任何外部服务"""
+        output = self._run_profile(":memory:")
+        self.assertIn("mode=memory", output["async_url"])
+        self.assertEqual(output["stats"][0]["total_games"], 1)
+        self.assertEqual(output["stats"][0]["best_score"], 18)
+        self.assertEqual(output["achievements"], 22)
+
+    def test_file_profile(self):
+        """测试文件库配置使用WAL日志模式"""
+        output = self._run_profile(os.path.join(self.tmpdir.name, "local.db"))
+        self.assertEqual(output["journal_mode"], "wal")
+        self.assertEqual(output["stats"][0]["total_games"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
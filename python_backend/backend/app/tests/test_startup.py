@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+from app.database import AsyncSessionLocal
+from app.readiness import COLD_START_TARGET_MS, Readiness
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 在子进程中冷启动应用：导入、启动lifespan、接受第一个WebSocket，然后读取就绪状态
+COLD_START_SCRIPT = """
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.readiness import readiness
+
+with TestClient(app) as client:
+    with client.websocket_connect("/ws/cold-start/o2SPH") as ws:
+        ws.send_json({"id": "guest-1", "name": "游客", "avatar": ""})
+        ws.receive_json()
+    response = client.get("/api/health/ready")
+    print(json.dumps({"status": response.status_code, "report": readiness.report()}))
+"""
+
+
+class TestStartup(unittest.IsolatedAsyncioTestCase):
+    """启动与就绪状态测试类"""
+
+    def test_cold_start_without_database(self):
+        """测试数据库不可达时冷启动不被阻塞，就绪检查返回503"""
+        env = dict(os.environ, MYSQL_HOST="10.255.255.1", DB_CONNECT_TIMEOUT="30", PYTHONIOENCODING="utf-8")
+        env.pop("ASYNC_DATABASE_URL", None)
+        env.pop("DATABASE_PROFILE", None)
+        result = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        output = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(output["status"], 503)
+        self.assertFalse(output["report"]["checks"]["database"])
+        self.assertLess(output["report"]["cold_start"]["first_websocket_ms"], COLD_START_TARGET_MS)
+
+    async def test_warm_up(self):
+        """测试后台预热完成连通检查、建表和成就目录加载"""
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        AsyncSessionLocal.configure(bind=engine)
+        readiness = Readiness(schema_bootstrap=True, retry_seconds=0)
+        try:
+            with mock.patch.object(database, "async_engine", engine):
+                self.assertFalse(readiness.ready)
+                await readiness.warm_up()
+            self.assertTrue(readiness.ready)
+            async with engine.connect() as conn:
+                tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+            self.assertIn("game_sessions", tables)
+        finally:
+            AsyncSessionLocal.configure(bind=database.async_engine)
+            await engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import unittest
+
+from app.games.state_sync import StateSync, merge_diff, apply_patch
+from app.games.o2_SamePatternHunt.game import o2SPHGame
+from app.models.player import Player
+
+
+class FakeWebSocket:
+    """记录收到的消息的模拟WebSocket"""
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+
+class TestMergeDiff(unittest.TestCase):
+    """状态差量计算测试类"""
+
+    def test_only_changed_fields(self):
+        """测试补丁只包含变化的字段"""
+        old = {"state": "player_turn", "gameInfo": {"a": {"score": 1, "idx": 0}, "b": {"score": 2, "idx": 0}}}
+        new = {"state": "player_turn", "gameInfo": {"a": {"score": 2, "idx": 1}, "b": {"score": 2, "idx": 0}}}
+        patch = merge_diff(old, new)
+        self.assertEqual(patch, {"gameInfo": {"a": {"score": 2, "idx": 1}}})
+        self.assertEqual(apply_patch(old, patch), new)
+
+    def test_removed_key(self):
+        """测试删除的键在补丁中为None"""
+        patch = merge_diff({"a": 1, "b": 2}, {"a": 1})
+        self.assertEqual(patch, {"b": None})
+        self.assertEqual(apply_patch({"a": 1, "b": 2}, patch), {"a": 1})
+
+    def test_value_changed_to_none(self):
+        """测试值变为None时不生成会被当作删除的补丁"""
+        old = {"gameInfo": {"a": {"score": 3, "next_pattern": 7}}}
+        new = {"gameInfo": {"a": {"score": 4, "next_pattern": None}}}
+        self.assertIsNone(merge_diff(old, new))
+        self.assertIsNone(merge_diff({"a": 1}, {"a": 1, "b": None}))
+        # 始终为None的字段不影响补丁
+        old["gameInfo"]["a"]["next_pattern"] = None
+        patch = merge_diff(old, new)
+        self.assertEqual(apply_patch(old, patch), new)
+        # None 变为其他值可以用补丁表达
+        self.assertEqual(apply_patch(new, merge_diff(new, {"gameInfo": {"a": {"score": 4, "next_pattern": 1}}})),
+                         {"gameInfo": {"a": {"score": 4, "next_pattern": 1}}})
+
+    def test_none_change_sends_snapshot(self):
+        """测试值变为None时广播完整快照，客户端状态与新状态一致"""
+        sync = StateSync()
+        sync.update({"round": 1, "gameInfo": {"a": {"next_pattern": 7}}})
+        message = sync.update({"round": 1, "gameInfo": {"a": {"next_pattern": None}}})
+        self.assertEqual(message["type"], "game_state")
+        self.assertEqual(message["version"], 2)
+        self.assertEqual(message["gameInfo"], {"a": {"next_pattern": None}})
+
+    def test_version_increases_only_on_change(self):
+        """测试只有状态变化时版本号递增"""
+        sync = StateSync()
+        state = {"round": 1, "cards": {"A1": {"number": 1}}}
+        self.assertEqual(sync.update(state)["type"], "game_state")
+        self.assertIsNone(sync.update(state))
+        state["cards"]["A1"]["number"] = 2
+        message = sync.update(state)
+        self.assertEqual(message["type"], "game_state_patch")
+        self.assertEqual(message["version"], 2)
+        self.assertEqual(message["base_version"], 1)
+        self.assertEqual(message["patch"], {"cards": {"A1": {"number": 2}}})
+
+
+class TestSPHStateSync(unittest.IsolatedAsyncioTestCase):
+    """SPH游戏状态同步测试类"""
+
+    async def test_flip_sends_patch(self):
+        """测试翻牌后只广播变化的字段，并且可以请求完整快照"""
+        game = o2SPHGame("room-1")
+        sockets = {}
+        for pid in ("p1", "p2"):
+            ws = FakeWebSocket()
+            sockets[pid] = ws
+            game.players[pid] = Player(pid, pid, "")
+            game._index_connection(ws, pid)
+        await game.start_game(mode="multi")
+
+        ws = sockets["p1"]
+        states = [m for m in ws.messages if m["type"] in ("game_state", "game_state_patch")]
+        self.assertEqual(states[0]["type"], "game_state")
+        local = states[0]
+        for message in states[1:]:
+            self.assertEqual(message["base_version"], local["version"])
+            local = apply_patch(local, message["patch"])
+            local["version"] = message["version"]
+
+        ws.messages.clear()
+        current = game.current_player
+        target = game.player_targets[current][0]
+        card_id = next(cid for cid, card in game.cards.items() if card["patternId"] == target)
+        await game.process_action(current, {"type": "flip", "cardId": card_id})
+
+        patches = [m for m in ws.messages if m["type"] == "game_state_patch"]
+        self.assertEqual(len(patches), 1)
+        self.assertEqual(set(patches[0]["patch"]), {"gameInfo"})
+        self.assertEqual(set(patches[0]["patch"]["gameInfo"]), {current})
+
+        ws.messages.clear()
+        await game.handle_event(ws, {"type": "request_snapshot"}, "p1")
+        self.assertEqual(ws.messages[-1]["type"], "game_state")
+        self.assertEqual(ws.messages[-1]["version"], patches[0]["version"])
+
+
+if __name__ == '__main__':
+    unittest.main()
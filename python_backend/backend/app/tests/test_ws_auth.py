@@ -0,0 +1,80 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import auth, routes
+from app.auth import create_access_token
+from app.models.user import User
+
+
+class TestWebSocketAuth(unittest.TestCase):
+    """WebSocket握手认证测试类"""
+
+    def setUp(self):
+        # 用户行直接放入认证缓存，握手时不访问数据库
+        auth._token_cache.clear()
+        auth._user_cache.clear()
+        auth._user_cache.set("alice", User(id=7, username="alice", email="alice@example.com", hashed_password="x"))
+        self.token = create_access_token({"sub": "alice"})
+        app = FastAPI()
+        app.include_router(routes.router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        auth._token_cache.clear()
+        auth._user_cache.clear()
+        for room in list(routes.rooms):
+            routes.rooms.remove(room)
+
+    def connect(self, room_id: str, player_id: str, cookies=None, query: str = "", game_type: str = "o2SPH"):
+        """连接房间并发送玩家信息，返回收到的第一条消息"""
+        self.client.cookies.clear()
+        for key, value in (cookies or {}).items():
+            self.client.cookies.set(key, value)
+        with self.client.websocket_connect(f"/ws/{room_id}/{game_type}{query}") as ws:
+            ws.send_json({"id": player_id, "name": "alice", "avatar": ""})
+            return ws.receive_json()
+
+    def assert_rejected(self, message, **kwargs):
+        with self.assertRaises(WebSocketDisconnect) as ctx:
+            with self.client.websocket_connect(f"/ws/room-x/o2SPH{kwargs.get('query', '')}") as ws:
+                ws.send_json({"id": kwargs["player_id"], "name": "alice", "avatar": ""})
+                self.assertEqual(ws.receive_json(), {"type": "error", "message": message})
+                ws.receive_json()
+        self.assertEqual(ctx.exception.code, routes.WS_CLOSE_UNAUTHORIZED)
+
+    def test_cookie_token(self):
+        """测试cookie中的令牌验证通过后，账号ID保存在玩家上"""
+        self.connect("room-1", "7", cookies={"access_token": self.token})
+        # 连接关闭后玩家已离开，账号ID仍保留用于记录游戏结果
+        self.assertEqual(routes.rooms.get("room-1").game.account_of("7"), 7)
+
+    def test_query_token(self):
+        """测试查询参数中的令牌"""
+        self.connect("room-2", "7", query=f"?token={self.token}")
+        self.assertEqual(routes.rooms.get("room-2").game.account_of("7"), 7)
+
+    def test_guest(self):
+        """测试未登录的游客可以连接，但没有账号ID"""
+        self.client.cookies.clear()
+        self.connect("room-3", "guest-1")
+        self.assertIsNone(routes.rooms.get("room-3").game.account_of("guest-1"))
+
+    def test_quiz_keeps_client_id(self):
+        """测试答题游戏的登录玩家使用前端生成的ID连接，并附加账号ID"""
+        message = self.connect("room-4", "user-abc", cookies={"access_token": self.token}, game_type="quiz")
+        self.assertNotEqual(message.get("type"), "error")
+        self.assertEqual(routes.rooms.get("room-4").game.account_of("user-abc"), 7)
+
+    def test_rejections(self):
+        """测试无效令牌、身份不一致和游客冒用用户ID都会被拒绝"""
+        self.client.cookies.clear()
+        self.assert_rejected("认证失败，请重新登录", player_id="7", query="?token=bad")
+        self.assert_rejected("玩家身份与登录用户不一致", player_id="8", query=f"?token={self.token}")
+        self.assert_rejected("请先登录", player_id="7")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""出站消息的JSON编码层
+
+每条出站消息只序列化一次，得到的文本被所有接收者复用。
+安装了 orjson 时优先使用，否则回退到标准库 json。
+"""
+import json
+import os
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+# 编码器选择：auto（有orjson则用orjson）/ orjson / json
+JSON_ENCODER = os.getenv('WS_JSON_ENCODER', 'auto')
+
+
+def _encode_stdlib(data: Any) -> str:
+    return json.dumps(data)
+
+
+def _encode_orjson(data: Any) -> str:
+    # 前端统一按文本帧解析，这里把 orjson 输出的 bytes 解码一次
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+def _select_encoder(name: str) -> Callable[[Any], str]:
+    if name == 'json':
+        return _encode_stdlib
+    if name == 'orjson':
+        if orjson is None:
+            raise RuntimeError("WS_JSON_ENCODER=orjson 但未安装 orjson")
+        return _encode_orjson
+    return _encode_orjson if orjson is not None else _encode_stdlib
+
+
+_encoder: Callable[[Any], str] = _select_encoder(JSON_ENCODER)
+
+
+def set_encoder(encoder: Callable[[Any], str]) -> None:
+    """替换全局编码器（用于测试或接入其他编码库）"""
+    global _encoder
+    _encoder = encoder
+
+
+def encoder_name() -> str:
+    """当前使用的编码器名称"""
+    return 'orjson' if _encoder is _encode_orjson else getattr(_encoder, '__name__', 'custom')
+
+
+def encode_message(data: Any) -> str:
+    """把出站消息序列化为JSON文本，调用方应对同一消息只调用一次"""
+    return _encoder(data)
@@ -0,0 +1,152 @@
+"""WebSocket 并发广播（fan-out）引擎"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket
+
+from .outbound import ConnectionWriter, OUTBOUND_POLICY, OUTBOUND_QUEUE_SIZE
+
+# 单个连接发送的截止时间（秒），超时的连接会被关闭
+SEND_TIMEOUT = float(os.getenv('WS_SEND_TIMEOUT', '2.0'))
+# 慢广播告警阈值（毫秒）
+SLOW_BROADCAST_MS = float(os.getenv('WS_SLOW_BROADCAST_MS', '200'))
+
+
+class FanoutEngine:
+    """并发向一组连接发送同一条消息
+
+    所有连接同时发送，每个连接有独立的截止时间，
+    广播耗时取决于最慢的健康连接，而不是所有连接耗时之和。
+    - 发送超时的连接可能只发出了半个帧，直接关闭（1008），客户端重连后重新获取快照；
+      关闭期间的广播跳过它
+    - 发送异常的连接放入 dropped，由调用方清理
+    - 已 attach 出站队列的连接只入队，不等待网络I/O
+    """
+    def __init__(
+        self,
+        send_timeout: float = SEND_TIMEOUT,
+        queue_size: int = OUTBOUND_QUEUE_SIZE,
+        policy: str = OUTBOUND_POLICY
+    ):
+        self.send_timeout = send_timeout
+        self.queue_size = queue_size
+        self.policy = policy
+        self.closing: Set[WebSocket] = set()  # 发送超时、正在关闭的连接
+        self.writers: Dict[WebSocket, ConnectionWriter] = {}  # 连接 -> 出站队列
+        self.last_stats: Dict[str, Any] = {}  # 最近一次广播的统计信息
+
+    def attach(self, websocket: WebSocket, policy: Optional[str] = None) -> ConnectionWriter:
+        """为连接创建出站队列和写协程，之后发往该连接的消息都经过队列"""
+        writer = self.writers.get(websocket)
+        if writer is None or writer.closed:
+            writer = ConnectionWriter(websocket, maxsize=self.queue_size, policy=policy or self.policy)
+            self.writers[websocket] = writer
+        return writer
+
+    async def detach(self, websocket: WebSocket) -> None:
+        """连接断开时调用，停止写协程并清除关闭记录"""
+        self.release(websocket)
+        writer = self.writers.pop(websocket, None)
+        if writer:
+            await writer.close()
+
+    def is_closing(self, websocket: WebSocket) -> bool:
+        """检查连接是否因发送超时正在关闭"""
+        return websocket in self.closing
+
+    def release(self, websocket: WebSocket) -> None:
+        """连接断开时调用，清除关闭记录"""
+        self.closing.discard(websocket)
+
+    async def _send_one(self, websocket: WebSocket, text: str) -> float:
+        start = time.perf_counter()
+        await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+        return time.perf_counter() - start
+
+    async def _close(self, websocket: WebSocket) -> None:
+        """关闭发送超时的连接，接收循环会随之收到断开事件"""
+        try:
+            await asyncio.wait_for(websocket.close(code=1008), self.send_timeout)
+        except Exception:
+            pass
+
+    async def send(self, websocket: WebSocket, text: str, msg_type: Optional[str] = None) -> bool:
+        """向单个连接发送消息，返回是否成功（入队或发送）"""
+        stats = await self.send_all([websocket], text, msg_type)
+        return not stats["dropped"] and not stats["timed_out"]
+
+    def enqueue_all(self, websockets: Iterable[WebSocket], text: str, msg_type: Optional[str] = None) -> List[WebSocket]:
+        """同步把消息放入已attach连接的出站队列，返回失败的连接
+
+        不经过事件循环调度，可在同步回调中调用并保证消息顺序；未attach的连接视为失败。
+        """
+        dropped: List[WebSocket] = []
+        for websocket in websockets:
+            writer = self.writers.get(websocket)
+            if writer is None or not writer.put(text, msg_type):
+                dropped.append(websocket)
+        return dropped
+
+    async def send_all(self, websockets: Iterable[WebSocket], text: str, msg_type: Optional[str] = None) -> Dict[str, Any]:
+        """并发发送并返回本次广播的统计信息
+
+        返回字典中的 dropped 为发送失败的连接列表，timed_out 为本次发送超时、被关闭的连接列表，
+        msg_type 用于出站队列合并过期的快照消息
+        """
+        start = time.perf_counter()
+        targets: List[WebSocket] = []
+        dropped: List[WebSocket] = []
+        queued = 0
+        skipped = 0
+        for websocket in websockets:
+            writer = self.writers.get(websocket)
+            if writer is not None:
+                if writer.put(text, msg_type):
+                    queued += 1
+                else:
+                    dropped.append(websocket)
+            elif self.is_closing(websocket):
+                skipped += 1
+            else:
+                targets.append(websocket)
+
+        results = await asyncio.gather(
+            *(self._send_one(websocket, text) for websocket in targets),
+            return_exceptions=True
+        )
+
+        timed_out: List[WebSocket] = []
+        failed = 0
+        slowest = 0.0
+        for websocket, result in zip(targets, results):
+            if isinstance(result, asyncio.TimeoutError):
+                timed_out.append(websocket)
+                self.closing.add(websocket)
+                asyncio.create_task(self._close(websocket))
+            elif isinstance(result, BaseException):
+                dropped.append(websocket)
+                failed += 1
+                print(f"广播消息失败: {result!r}")
+            else:
+                slowest = max(slowest, result)
+
+        stats = {
+            "recipients": len(targets) + queued + len(dropped) - failed,
+            "queued": queued,
+            "sent": len(targets) - failed - len(timed_out),
+            "skipped": skipped,
+            "dropped": dropped,
+            "timed_out": timed_out,
+            "slowest_ms": round(slowest * 1000, 3),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        self.last_stats = stats
+        if timed_out or stats["elapsed_ms"] >= SLOW_BROADCAST_MS:
+            print(f"⚠️ 慢广播: 接收者 {stats['recipients']}, 超时 {len(timed_out)}, 失败 {len(dropped)}, 耗时 {stats['elapsed_ms']}ms")
+        return stats
+
+
+# 进程内共享的广播引擎
+fanout = FanoutEngine()
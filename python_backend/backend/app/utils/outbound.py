@@ -0,0 +1,119 @@
+"""每个WebSocket连接独立的出站队列和写协程"""
+import asyncio
+import os
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from fastapi import WebSocket
+
+# 出站队列长度上限
+OUTBOUND_QUEUE_SIZE = int(os.getenv('WS_OUTBOUND_QUEUE_SIZE', '256'))
+# 队列满时的处理策略：drop_oldest / coalesce / disconnect
+OUTBOUND_POLICY = os.getenv('WS_OUTBOUND_POLICY', 'coalesce')
+# 写协程单次发送的截止时间（秒），超时视为客户端卡死并断开
+WRITER_SEND_TIMEOUT = float(os.getenv('WS_WRITER_SEND_TIMEOUT', '10'))
+
+# 快照类消息：新消息会覆盖队列中尚未发送的旧消息
+# 完整的 game_state 快照同时覆盖排在它之前的 game_state_patch 差量补丁
+SUPERSEDES = {
+    "game_state": {"game_state", "game_state_patch"},
+    "room_state": {"room_state"},
+}
+
+POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+class ConnectionWriter:
+    """单个连接的出站队列
+
+    游戏逻辑只调用 put() 入队，不等待网络I/O；
+    由独立的写协程按顺序把消息发送到客户端。
+    """
+    def __init__(
+        self,
+        websocket: WebSocket,
+        maxsize: int = OUTBOUND_QUEUE_SIZE,
+        policy: str = OUTBOUND_POLICY,
+        send_timeout: float = WRITER_SEND_TIMEOUT
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"不支持的出站队列策略: {policy}")
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.queue: Deque[Tuple[Optional[str], str]] = deque()  # (消息类型, 文本)
+        self.closed = False
+        self.dropped_messages = 0  # 因队列满或被覆盖而丢弃的消息数
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, text: str, msg_type: Optional[str] = None) -> bool:
+        """消息入队，返回连接是否仍然可用"""
+        if self.closed:
+            return False
+
+        superseded_types = SUPERSEDES.get(msg_type)
+        if self.policy == "coalesce" and superseded_types:
+            superseded = [item for item in self.queue if item[0] in superseded_types]
+            for item in superseded:
+                self.queue.remove(item)
+            self.dropped_messages += len(superseded)
+
+        if len(self.queue) >= self.maxsize:
+            if self.policy == "disconnect":
+                print(f"⚠️ 出站队列已满({self.maxsize})，断开连接")
+                self._abort()
+                return False
+            # drop_oldest 以及 coalesce 合并后仍然满的情况，丢弃最旧的消息
+            self.queue.popleft()
+            self.dropped_messages += 1
+
+        self.queue.append((msg_type, text))
+        self._wakeup.set()
+        return True
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                _, text = self.queue.popleft()
+                await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            print(f"⚠️ 出站发送超时({self.send_timeout}s)，断开连接")
+            self._abort()
+        except Exception as e:
+            # 连接已断开，停止写协程，由接收循环负责清理房间状态
+            print(f"出站发送失败: {e}")
+            self.closed = True
+            self.queue.clear()
+
+    def _abort(self) -> None:
+        """停止写协程并主动关闭连接，接收循环会随之收到断开事件"""
+        self.closed = True
+        self.queue.clear()
+        asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self) -> None:
+        if not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+        try:
+            await self.websocket.close(code=1008)
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        """连接断开时调用，停止写协程"""
+        self.closed = True
+        self.queue.clear()
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,73 @@
+"""密码哈希工作线程池
+
+bcrypt 每次计算需要 100ms 以上的 CPU 时间，直接在事件循环中执行会阻塞同一进程中
+所有房间的 WebSocket 消息。哈希计算交给固定大小的线程池（bcrypt 计算期间释放 GIL），
+并限制同时排队的任务数：超出上限的请求立即被拒绝（接口返回 503），
+登录高峰只会让登录变慢，不会拖慢游戏。
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# 工作线程数，默认取 CPU 核数的一半（至少1个）
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(max((os.cpu_count() or 2) // 2, 1))))
+# 排队和执行中的任务上限，超出后直接拒绝
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', str(PASSWORD_HASH_WORKERS * 16)))
+
+
+class PasswordPoolBusy(Exception):
+    """哈希任务过多，拒绝新任务"""
+
+
+class PasswordPool:
+    """有界的密码哈希线程池"""
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0}
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """在线程池中执行 func(*args)，任务数达到上限时抛出 PasswordPoolBusy
+
+        调用方被取消时线程中的计算仍会执行完，任务数在计算真正结束后才减少
+        """
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise PasswordPoolBusy(f"密码哈希任务过多（{self._pending}）")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+        future = self._executor.submit(func, *args)
+        self._pending += 1
+        future.add_done_callback(functools.partial(self._on_done, asyncio.get_running_loop()))
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, loop: asyncio.AbstractEventLoop, future: Future) -> None:
+        # 在工作线程中调用，计数交回事件循环线程更新
+        try:
+            loop.call_soon_threadsafe(self._finish, future)
+        except RuntimeError:
+            pass  # 事件循环已关闭
+
+    def _finish(self, future: Future) -> None:
+        self._pending -= 1
+        if future.cancelled() or future.exception() is not None:
+            self.stats["failed"] += 1
+        else:
+            self.stats["completed"] += 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局密码哈希线程池
+password_pool = PasswordPool()
@@ -0,0 +1,94 @@
+"""数据库连接池指标
+
+在连接池取连接（checkout）处计时，记录：
+- 取连接次数、等待次数（没有空闲连接且溢出连接已用完，只能排队）、超时次数
+- 取连接耗时（总计、最大值、直方图）
+- 溢出连接的当前数和峰值
+
+用于根据生产数据调整 DB_POOL_SIZE / DB_MAX_OVERFLOW。
+"""
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# 取连接耗时直方图的桶上限（毫秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """一个连接池的取连接统计"""
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None  # 最近一次使用的连接池（engine.dispose() 后会换成新的池）
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.peak_overflow = 0
+
+    def observe(self, pool: QueuePool, elapsed_ms: float, waited: bool, timed_out: bool) -> None:
+        self.pool = pool
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        if waited:
+            self.waits += 1
+        self.peak_overflow = max(self.peak_overflow, max(pool.overflow(), 0))
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.pool
+        return {
+            "name": self.name,
+            "pool": {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout()
+            } if pool is not None else None,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "checkout_ms": {
+                "avg": round(self.total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "max": round(self.max_ms, 3),
+                "buckets": {
+                    **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                    "le_inf": self.buckets[-1]
+                }
+            },
+            "peak_overflow": self.peak_overflow
+        }
+
+
+def instrumented_pool_class(base: Type[QueuePool], metrics: PoolMetrics) -> Type[QueuePool]:
+    """创建在取连接时记录指标的连接池类（QueuePool 或 AsyncAdaptedQueuePool 的子类）
+
+    engine.dispose() 重建连接池时使用同一个类，指标不会丢失
+    """
+    def _do_get(self):
+        # 与 QueuePool._do_get 中的判断一致：没有空闲连接且溢出连接已用完时需要排队
+        waited = self.checkedin() == 0 and -1 < self._max_overflow <= self._overflow
+        started = time.perf_counter()
+        try:
+            entry = base._do_get(self)
+        except exc.TimeoutError:
+            metrics.observe(self, (time.perf_counter() - started) * 1000, waited, True)
+            raise
+        metrics.observe(self, (time.perf_counter() - started) * 1000, waited, False)
+        return entry
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get, "metrics": metrics})
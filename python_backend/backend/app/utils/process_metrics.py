@@ -0,0 +1,45 @@
+"""当前进程的CPU时间和内存占用
+
+负载测试按前后两次采样的 cpu_seconds 差值除以 wall_time 差值计算CPU使用率。
+resource 模块只在类Unix系统上可用，其他系统上 CPU 时间回退到 time.process_time()，内存为 None。
+"""
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _current_rss() -> Optional[int]:
+    """当前常驻内存（字节），读取 /proc/self/statm，不可用时返回 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def process_snapshot() -> Dict[str, Any]:
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_seconds = usage.ru_utime + usage.ru_stime
+        # Linux 上 ru_maxrss 单位为KB，macOS 上为字节
+        max_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    else:
+        cpu_seconds = time.process_time()
+        max_rss = None
+    rss = _current_rss()
+    return {
+        "pid": os.getpid(),
+        "wall_time": time.time(),
+        "cpu_seconds": round(cpu_seconds, 4),
+        "rss_bytes": rss if rss is not None else max_rss,
+        "max_rss_bytes": max_rss,
+        "threads": threading.active_count()
+    }
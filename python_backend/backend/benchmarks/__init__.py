@@ -0,0 +1,15 @@
+"""游戏引擎基准测试（进程内，不经过网络）
+
+用模拟WebSocket直接驱动 Room、o2SPHGame、o3MBGame 和 QuizGame，
+测量单个事件在服务端的开销（1~64名玩家、o3MB全部难度），结果与 JSON 基线比较。
+
+在 python_backend/backend 目录下运行：
+
+    python -m benchmarks                 # 运行全部用例
+    python -m benchmarks -k o3MB         # 只运行名称包含 o3MB 的用例
+    python -m benchmarks --check         # 与 benchmarks/baseline.json 比较，有回归时返回1
+    python -m benchmarks --save          # 把本次结果保存为新基线
+
+修改 RoundBaseGame、广播或状态同步等热路径后先运行 --check；
+确认性能变化符合预期（或更换了测试机器）后用 --save 更新基线。
+"""
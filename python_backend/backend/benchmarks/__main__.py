@@ -0,0 +1,101 @@
+"""命令行入口：python -m benchmarks --help"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from .cases import all_cases
+from .harness import DEFAULT_ROUNDS, DEFAULT_TOLERANCE, MAX_TIME, compare, load_baseline, run_all, save_baseline
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="QuizArena 游戏引擎基准测试")
+    parser.add_argument("-k", dest="keyword", action="append", default=[], help="只运行名称包含该字符串的用例，可重复")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="每个用例的最大计时轮数")
+    parser.add_argument("--max-time", type=float, default=MAX_TIME, help="每个用例的计时预算（秒）")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("--check", action="store_true", help="与基线比较，有回归时返回1")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的变慢比例")
+    parser.add_argument("--confirm", type=int, default=3, help="疑似回归的用例最多复测几次（取最快的一次）")
+    parser.add_argument("--save", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--json", dest="json_path", help="把本次结果写入JSON文件")
+    return parser.parse_args(argv)
+
+
+def print_result(name, result) -> None:
+    print(f"{name:<52} {result['median_us']:>10.1f}µs  ±{result['stddev_us']:<9.1f} "
+          f"rel={result['relative']:<8} msgs={result['messages']:<6} n={result['rounds']}")
+
+
+def print_comparison(rows, tolerance) -> int:
+    regressions = [row for row in rows if row["status"] == "regression"]
+    for row in rows:
+        if row["status"] in ("regression", "improved"):
+            mark = "❌" if row["status"] == "regression" else "🚀"
+            print(f"{mark} {row['name']}: {row['baseline']} → {row['current']}（×{row['ratio']}）")
+        elif row["status"] in ("new", "missing"):
+            print(f"⚠️ {row['name']}: {'基线中没有该用例' if row['status'] == 'new' else '本次未运行'}")
+    ok = sum(1 for row in rows if row["status"] == "ok")
+    print(f"\n📊 与基线比较（容差 {tolerance:.0%}）：{ok} 个持平，{len(regressions)} 个回归")
+    return len(regressions)
+
+
+async def confirm_regressions(args, cases, report, baseline):
+    """复测疑似回归的用例，每个用例保留最快的一次结果
+
+    机器负载的干扰只会让用例变慢，多测几次取最快值可以排除大部分误报。
+    """
+    rows = compare(report, baseline, args.tolerance)
+    for _ in range(args.confirm):
+        suspects = {row["name"] for row in rows if row["status"] == "regression"}
+        if not suspects:
+            break
+        print(f"🔁 复测 {len(suspects)} 个疑似回归的用例")
+        rerun = await run_all([case for case in cases if case.name in suspects], args.rounds, args.max_time)
+        for name, result in rerun["results"].items():
+            if result["relative"] < report["results"][name]["relative"]:
+                report["results"][name] = result
+        rows = compare(report, baseline, args.tolerance)
+    return rows
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    cases = [case for case in all_cases() if not args.keyword or any(k in case.name for k in args.keyword)]
+    if not cases:
+        print("❌ 没有匹配的用例", file=sys.stderr)
+        return 2
+    baseline = None
+    if args.check:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            print(f"❌ 基线文件不存在: {args.baseline}，先运行 --save", file=sys.stderr)
+            return 2
+
+    report = asyncio.run(run_all(cases, args.rounds, args.max_time, progress=print_result))
+    print(f"\n校准值 {report['meta']['calibration_us']}µs（{report['meta']['implementation']} {report['meta']['python']}）")
+
+    regressions = 0
+    if baseline is not None:
+        if args.keyword:
+            # 只运行了部分用例，不报告其余用例缺失
+            baseline = dict(baseline, results={
+                name: result for name, result in baseline["results"].items() if name in report["results"]
+            })
+        rows = asyncio.run(confirm_regressions(args, cases, report, baseline))
+        regressions = print_comparison(rows, args.tolerance)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save:
+        save_baseline(args.baseline, report)
+        print(f"📝 基线已保存到 {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""基准用例：直接驱动 Room 和各游戏引擎，不经过网络
+
+- room.*：连接、断开、广播房间状态、准备状态切换（Room.handle_event）
+- o2SPH.* / o3MB.*：process_action 和 broadcast_game_state，o3MB 覆盖全部难度
+- quiz.handle_event.*：出题、作答、判题
+
+每类用例覆盖 1~64 名玩家。o3MB 的 upgrade_card 在服务端固定等待2秒，不适合计时，未包含在内。
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+from app.games.factory import GameFactory
+from app.models.player import Player
+from app.rooms import Room
+from app.utils.fanout import fanout
+
+from .harness import Case, FakeWebSocket
+
+PLAYER_COUNTS = (1, 2, 4, 8, 16, 32, 64)
+MB_DIFFICULTIES = ("normal", "hard", "extreme")
+
+
+class Table:
+    """一个房间、它的游戏实例和模拟连接"""
+    def __init__(self, game_type: str, difficulty: Optional[str] = None):
+        self.game = GameFactory.create_game(game_type, "bench")
+        if difficulty:
+            self.game.config["difficulty"] = difficulty
+        if game_type == "o3MB":
+            self.game.preview_duration = 0
+        self.room = Room("bench", self.game, gameType=game_type)
+        self.sockets: List[FakeWebSocket] = []
+        self.by_player: Dict[str, FakeWebSocket] = {}
+        self.extra: Optional[FakeWebSocket] = None  # connect/disconnect 用例中进出房间的连接
+        self.state: Dict[str, Any] = {}  # 用例自己的数据
+
+    async def join(self, player_id: str) -> FakeWebSocket:
+        ws = FakeWebSocket()
+        self.sockets.append(ws)
+        self.by_player[player_id] = ws
+        await self.room.connect(ws, Player(player_id, player_id, ""))
+        return ws
+
+    async def leave(self, ws: FakeWebSocket) -> None:
+        await self.room.disconnect(ws)
+
+    async def close(self) -> None:
+        for ws in self.sockets:
+            await fanout.detach(ws)
+
+
+async def make_table(game_type: str, players: int, difficulty: Optional[str] = None,
+                     start: bool = False, prefix: str = "p") -> Table:
+    table = Table(game_type, difficulty)
+    for k in range(players):
+        await table.join(f"{prefix}{k}")
+    if start:
+        await table.room.start_game(mode="single" if players == 1 else "multi")
+    return table
+
+
+def _label(players: int, difficulty: Optional[str] = None) -> str:
+    return f"[{difficulty},players={players}]" if difficulty else f"[players={players}]"
+
+
+# ---- Room ----
+
+def room_cases(players: int) -> List[Case]:
+    async def room_fixture():
+        return await make_table("o2SPH", players)
+
+    async def before_connect(table, i):
+        if table.extra is not None:
+            await table.leave(table.extra)
+            table.extra = None
+
+    async def connect(table, i):
+        # 每轮使用新的玩家ID，走新玩家加入而不是重连
+        table.extra = await table.join(f"join-{i}")
+
+    async def connect_fixture():
+        return await make_table("o2SPH", players - 1)
+
+    async def before_disconnect(table, i):
+        table.extra = await table.join(f"leave-{i}")
+
+    async def disconnect(table, i):
+        await table.leave(table.extra)
+        table.extra = None
+
+    async def broadcast_state(table, i):
+        await table.room.broadcast_state()
+
+    async def toggle_ready(table, i):
+        await table.room.handle_event(table.sockets[-1], {"type": "toggle_ready"})
+
+    label = _label(players)
+    cases = [
+        Case(f"room.connect{label}", connect_fixture, connect, before_connect),
+        Case(f"room.disconnect{label}", connect_fixture, disconnect, before_disconnect),
+        Case(f"room.broadcast_state{label}", room_fixture, broadcast_state),
+    ]
+    if players >= 2:
+        # 房主不能切换准备状态，需要至少一名其他玩家
+        cases.append(Case(f"room.handle_event.toggle_ready{label}", room_fixture, toggle_ready))
+    return cases
+
+
+# ---- o2SPH ----
+
+def sph_cases(players: int) -> List[Case]:
+    async def fixture():
+        return await make_table("o2SPH", players, start=True)
+
+    def reset(game):
+        # 分数和目标进度复位，保证游戏不会结束
+        game.state = "player_turn"
+        for pid in game.player_order:
+            game.scores[pid] = 10
+            game.player_target_index[pid] = 0
+
+    async def before_flip(table, i):
+        reset(table.game)
+
+    async def flip(table, i):
+        # 偶数轮翻对目标（继续本回合），奇数轮翻错（轮到下一位玩家）
+        game = table.game
+        pid = game.current_player
+        target = game.player_targets[pid][game.player_target_index[pid]]
+        card_id = next(cid for cid, card in game.cards.items() if (card["patternId"] == target) == (i % 2 == 0))
+        await game.process_action(pid, {"type": "flip", "cardId": card_id})
+
+    async def before_broadcast(table, i):
+        reset(table.game)
+        table.game.scores[table.game.current_player] += 1 if i % 2 else -1
+
+    async def broadcast_game_state(table, i):
+        await table.game.broadcast_game_state()
+
+    label = _label(players)
+    return [
+        Case(f"o2SPH.process_action{label}", fixture, flip, before_flip),
+        Case(f"o2SPH.broadcast_game_state{label}", fixture, broadcast_game_state, before_broadcast),
+    ]
+
+
+# ---- o3MB ----
+
+def mb_cases(players: int, difficulty: str) -> List[Case]:
+    async def fixture():
+        table = await make_table("o3MB", players, difficulty, start=True)
+        cards = table.game.cards
+        first = next(iter(cards))
+        second = next(cid for cid, card in cards.items() if card["number"] != cards[first]["number"])
+        table.state["pair"] = (first, second)  # 一对不匹配的卡牌
+        return table
+
+    def reset(game):
+        # 清空翻牌状态、分数和错误次数，保证游戏不会结束
+        game.state = "player_turn"
+        game.current_flip_cards = []
+        game.locked = False
+        game.pending_upgrade = None
+        game.flip_start_times = {}
+        game.global_flipping_cards = {}
+        for pid in game.player_order:
+            game.scores[pid] = -10
+            game.error_counts[pid] = 0
+
+    async def before_flip(table, i):
+        reset(table.game)
+
+    async def flip(table, i):
+        game = table.game
+        await game.process_action(game.current_player, {"type": "flip", "cardId": table.state["pair"][0]})
+
+    async def before_flip_pair(table, i):
+        reset(table.game)
+        await flip(table, i)
+
+    async def flip_pair(table, i):
+        # 翻开第二张牌：判断匹配、计分、轮换玩家并同步状态
+        game = table.game
+        await game.process_action(game.current_player, {"type": "flip", "cardId": table.state["pair"][1]})
+
+    async def before_broadcast(table, i):
+        reset(table.game)
+        card = table.game.cards[table.state["pair"][0]]
+        card["number"] += 1 if i % 2 else -1
+
+    async def broadcast_game_state(table, i):
+        await table.game.broadcast_game_state()
+
+    label = _label(players, difficulty)
+    return [
+        Case(f"o3MB.process_action.flip{label}", fixture, flip, before_flip),
+        Case(f"o3MB.process_action.flip_pair{label}", fixture, flip_pair, before_flip_pair),
+        Case(f"o3MB.broadcast_game_state{label}", fixture, broadcast_game_state, before_broadcast),
+    ]
+
+
+# ---- quiz ----
+
+def quiz_cases(players: int) -> List[Case]:
+    """players 包含一名提问者"""
+    async def fixture():
+        table = Table("quiz")
+        await table.join("questioner-0")
+        for k in range(1, players):
+            await table.join(f"user-{k}")
+        table.game.mode = "scoring"
+        return table
+
+    def send(table, player_id, event):
+        return table.game.handle_event(table.by_player[player_id], event, player_id)
+
+    async def question(table, i):
+        await send(table, "questioner-0", {
+            "type": "question", "questionId": f"q{i}", "content": {"text": f"第{i}题", "answer": "A"}
+        })
+
+    async def before_answer(table, i):
+        table.game.judgement_pending = True
+
+    async def answer(table, i):
+        player_id = f"user-{i % (players - 1) + 1}"
+        await send(table, player_id, {"type": "answer", "text": "A", "timestamp": time.time() * 1000})
+
+    async def judgement(table, i):
+        results = {f"user-{k}": {"correct": k % 2 == 0, "score": k % 2} for k in range(1, players)}
+        await send(table, "questioner-0", {
+            "type": "judgement", "results": results, "correct_answer": "A", "explanation": "", "currentRound": i
+        })
+
+    label = _label(players)
+    cases = [Case(f"quiz.handle_event.question{label}", fixture, question)]
+    if players >= 2:
+        cases.append(Case(f"quiz.handle_event.answer{label}", fixture, answer, before_answer))
+        cases.append(Case(f"quiz.handle_event.judgement{label}", fixture, judgement))
+    return cases
+
+
+def all_cases() -> List[Case]:
+    cases: List[Case] = []
+    for players in PLAYER_COUNTS:
+        cases.extend(room_cases(players))
+    for players in PLAYER_COUNTS:
+        cases.extend(sph_cases(players))
+    for difficulty in MB_DIFFICULTIES:
+        for players in PLAYER_COUNTS:
+            cases.extend(mb_cases(players, difficulty))
+    for players in PLAYER_COUNTS:
+        cases.extend(quiz_cases(players))
+    return cases
@@ -0,0 +1,204 @@
+"""基准测试工具：计时、校准、基线读写和回归比较
+
+每个用例的 fixture 只创建一次，before 每轮执行且不计时，target 计时。
+计时区间包含把本轮产生的消息经出站队列送到模拟连接，即一个事件在服务端的完整开销。
+和 timeit 一样，计时期间关闭垃圾回收。
+
+不同机器的绝对耗时没有可比性，因此每个用例运行前都测一次固定纯Python负载的耗时（校准值），
+回归比较使用 中位数 / 校准值 的相对耗时；逐个用例校准也能抵消运行期间机器负载的变化。
+"""
+import asyncio
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.fanout import fanout
+
+DEFAULT_ROUNDS = 200
+MIN_ROUNDS = 20
+WARMUP_ROUNDS = 5
+MAX_TIME = 0.25  # 每个用例的计时预算（秒），达到 MIN_ROUNDS 后超出预算即停止
+DEFAULT_TOLERANCE = 0.25  # 相对耗时比基线慢超过25%视为回归
+
+
+class FakeWebSocket:
+    """不做网络I/O的模拟WebSocket，只统计收到的消息"""
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_text(self, text: str):
+        self.messages += 1
+        self.bytes += len(text)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+class Case:
+    """一个基准用例"""
+    def __init__(
+        self,
+        name: str,
+        fixture: Callable[[], Awaitable[Any]],
+        target: Callable[[Any, int], Awaitable[None]],
+        before: Optional[Callable[[Any, int], Awaitable[None]]] = None
+    ):
+        self.name = name
+        self.fixture = fixture  # 创建被测对象，返回的对象需要有 sockets 列表和 close()
+        self.target = target  # 计时的操作，参数为 fixture 返回的对象和轮次
+        self.before = before  # 每轮计时前的准备（不计时）
+
+
+class _NullWriter:
+    """丢弃服务端调试输出"""
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+async def drain() -> None:
+    """等待所有出站队列发送完毕"""
+    while any(writer.queue for writer in fanout.writers.values()):
+        await asyncio.sleep(0)
+
+
+async def run_case(case: Case, rounds: int = DEFAULT_ROUNDS, max_time: float = MAX_TIME) -> Dict[str, Any]:
+    random.seed(0)
+    ctx = await case.fixture()
+    samples: List[int] = []
+    messages = 0
+    try:
+        started = time.perf_counter()
+        for i in range(WARMUP_ROUNDS + rounds):
+            if case.before is not None:
+                await case.before(ctx, i)
+            await drain()
+            sent_before = sum(ws.messages for ws in ctx.sockets)
+            gc.disable()
+            try:
+                t0 = time.perf_counter_ns()
+                await case.target(ctx, i)
+                await drain()
+                elapsed = time.perf_counter_ns() - t0
+            finally:
+                gc.enable()
+            if i < WARMUP_ROUNDS:
+                continue
+            samples.append(elapsed)
+            messages += sum(ws.messages for ws in ctx.sockets) - sent_before
+            if len(samples) >= MIN_ROUNDS and time.perf_counter() - started > max_time:
+                break
+    finally:
+        await ctx.close()
+    return summarize(samples, messages)
+
+
+def summarize(samples_ns: List[int], messages: int = 0) -> Dict[str, Any]:
+    samples = [ns / 1000 for ns in samples_ns]
+    return {
+        "rounds": len(samples),
+        "min_us": round(min(samples), 2),
+        "median_us": round(statistics.median(samples), 2),
+        "mean_us": round(statistics.fmean(samples), 2),
+        "stddev_us": round(statistics.stdev(samples), 2) if len(samples) > 1 else 0.0,
+        "messages": round(messages / len(samples), 2)  # 每个事件平均送达的消息数
+    }
+
+
+def calibrate(repeat: int = 25) -> float:
+    """固定纯Python负载（序列化、排序、字典操作）的最短耗时（微秒），代表机器当前的速度"""
+    payload = {f"p{i}": {"score": i, "ready": i % 2 == 0, "name": f"player-{i}"} for i in range(64)}
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        for _ in range(20):
+            text = json.dumps(payload, ensure_ascii=False)
+            ordered = sorted(payload.items(), key=lambda item: item[1]["score"], reverse=True)
+            merged = {k: dict(v, rank=n) for n, (k, v) in enumerate(ordered)}
+            len(text) + len(merged)
+        timings.append(time.perf_counter_ns() - t0)
+    return round(min(timings) / 1000, 2)
+
+
+async def run_all(cases: List[Case], rounds: int = DEFAULT_ROUNDS, max_time: float = MAX_TIME,
+                  progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """依次运行用例，返回带环境信息和校准值的结果"""
+    results: Dict[str, Dict[str, Any]] = {}
+    calibrations: List[float] = []
+    real_stdout = sys.stdout
+    for case in cases:
+        calibration = calibrate()
+        calibrations.append(calibration)
+        sys.stdout = _NullWriter()
+        try:
+            result = await run_case(case, rounds, max_time)
+        finally:
+            sys.stdout = real_stdout
+        result["calibration_us"] = calibration
+        result["relative"] = round(result["median_us"] / calibration, 4)
+        results[case.name] = result
+        if progress is not None:
+            progress(case.name, result)
+    return {
+        "meta": {
+            "created": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "calibration_us": round(statistics.median(calibrations), 2)
+        },
+        "results": results
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path: str, report: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """逐个用例比较相对耗时
+
+    status: ok / regression（慢于基线超过容差）/ improved（快于基线超过容差）/
+    new（基线中没有）/ missing（本次没有运行）
+    """
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, result in current["results"].items():
+        base = base_results.get(name)
+        if base is None:
+            rows.append({"name": name, "status": "new", "current": result["relative"]})
+            continue
+        ratio = result["relative"] / base["relative"] if base["relative"] else float("inf")
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 / (1 + tolerance):
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({
+            "name": name, "status": status, "baseline": base["relative"],
+            "current": result["relative"], "ratio": round(ratio, 3)
+        })
+    for name in base_results:
+        if name not in current["results"]:
+            rows.append({"name": name, "status": "missing", "baseline": base_results[name]["relative"]})
+    return rows
@@ -0,0 +1,16 @@
+"""无界面机器人负载测试
+
+用大量 asyncio 机器人模拟真实玩家：通过 /api/new-room-id-short 创建房间、加入、准备、开始游戏，
+按游戏规则进行 o2SPH 翻牌、o3MB 翻牌/升级和答题游戏的出题/作答/判题，
+统计消息吞吐、事件到广播的延迟分位数（p50/p95/p99）以及服务器CPU和内存占用。
+
+在 python_backend/backend 目录下运行：
+
+    # 连接真实服务器（需要 pip install -r loadtest/requirements.txt）
+    python -m loadtest --url http://127.0.0.1:8000 --games o2SPH,o3MB,quiz --rooms 500 --duration 60
+
+    # 在当前进程内运行服务端，不经过网络（服务器CPU会包含机器人自身的开销）
+    python -m loadtest --in-process --rooms 20 --duration 30
+
+上千个连接时注意提高文件描述符上限（ulimit -n），并用 --ramp-up 分散建房时间。
+"""
@@ -0,0 +1,97 @@
+"""命令行入口：python -m loadtest --help"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+
+from .bots import BotSettings
+from .runner import GAME_TYPES, LoadTest
+from .transport import ASGITransport, WebSocketsTransport
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="QuizArena 机器人负载测试")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default=os.getenv("QUIZARENA_BASE_URL", "http://127.0.0.1:8000"), help="服务器地址")
+    target.add_argument("--in-process", action="store_true", help="在当前进程内运行服务端，不经过网络")
+    parser.add_argument("--games", default=",".join(GAME_TYPES), help="游戏类型，逗号分隔（o2SPH,o3MB,quiz）")
+    parser.add_argument("--rooms", type=int, default=10, help="每种游戏的并发房间数")
+    parser.add_argument("--players", type=int, default=2, help="每个房间的玩家数（答题游戏含一名提问者）")
+    parser.add_argument("--games-per-room", type=int, default=0, help="每个房间连续进行的局数，0表示直到测试结束")
+    parser.add_argument("--duration", type=float, default=60, help="测试时长上限（秒）")
+    parser.add_argument("--ramp-up", type=float, default=0, help="在多少秒内陆续创建全部房间")
+    parser.add_argument("--think-ms", type=float, default=300, help="平均思考时间（毫秒）")
+    parser.add_argument("--skill", type=float, default=0.7, help="知道正确答案时按正确答案操作的概率")
+    parser.add_argument("--quiz-rounds", type=int, default=5, help="答题游戏每局的题数")
+    parser.add_argument("--mb-difficulty", default="normal", choices=["normal", "hard", "extreme", "mixed"],
+                        help="o3MB 难度，mixed 表示各局轮换")
+    parser.add_argument("--request-timeout", type=float, default=15, help="等待广播的超时（秒）")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="服务器进程指标采样间隔（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--json", dest="json_path", help="把完整报告写入JSON文件")
+    parser.add_argument("--server-log", action="store_true", help="进程内运行时保留服务端日志输出")
+    return parser.parse_args(argv)
+
+
+def print_report(report) -> None:
+    config = report["config"]
+    print(f"\n📊 负载测试报告（{', '.join(config['game_types'])}，"
+          f"每种{config['rooms_per_game']}个房间 × {config['players_per_room']}人，共{config['connections']}个连接）")
+    print(f"   时长: {report['duration_seconds']}s")
+    print(f"   发送: {report['messages_sent']} 条（{report['sent_per_second']}/s）")
+    print(f"   接收: {report['messages_received']} 条（{report['received_per_second']}/s）")
+    print(f"   完成局数: {report['games_completed']}")
+    latency = report["latency_ms"]
+    print(f"   事件到广播延迟(ms): p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+    for event, summary in report["latency_ms_by_event"].items():
+        print(f"     {event:<18} n={summary['count']:<7} p50={summary['p50']} p95={summary['p95']} p99={summary['p99']}")
+    server = report["server"]
+    if server:
+        print(f"   服务器(pid {server['pid']}): CPU {server['cpu_percent']}%  "
+              f"RSS {server['rss_mb_start']} → 峰值 {server['rss_mb_peak']} → {server['rss_mb_end']} MB")
+    else:
+        print("   服务器: 未取得进程指标（/api/metrics/process）")
+    if report["errors"]:
+        print(f"   错误: {report['errors']}")
+
+
+async def run(args: argparse.Namespace):
+    if args.in_process:
+        from app.main import app
+        transport = ASGITransport(app)
+    else:
+        transport = WebSocketsTransport(args.url)
+    settings = BotSettings(think_ms=args.think_ms, skill=args.skill, quiz_rounds=args.quiz_rounds,
+                           request_timeout=args.request_timeout)
+    load_test = LoadTest(
+        transport, [g.strip() for g in args.games.split(",") if g.strip()], rooms=args.rooms, players=args.players,
+        games=args.games_per_room, duration=args.duration, ramp_up=args.ramp_up, settings=settings,
+        mb_difficulty=args.mb_difficulty, sample_interval=args.sample_interval, seed=args.seed
+    )
+    return await load_test.run()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        if args.in_process and not args.server_log:
+            # 服务端每条消息都有调试输出，进程内运行时丢弃
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                report = asyncio.run(run(args))
+        else:
+            report = asyncio.run(run(args))
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 报告已写入 {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,439 @@
+"""机器人客户端
+
+每个机器人一条 WebSocket 连接：接收协程维护房间状态和游戏状态（按版本应用 game_state_patch），
+行为协程按游戏规则发送事件。发送事件时登记期望的广播（类型 + 匹配条件），
+收到对应广播时记录从发送到收到的延迟（事件到广播延迟）。
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.games.state_sync import apply_patch
+
+from .stats import LoadStats
+from .transport import ConnectionClosed
+
+Message = Dict[str, Any]
+Matcher = Callable[[Message], bool]
+
+# SamePatternHunt 固定16张卡牌（见 o2SPHGame._init_cards）
+SPH_CARD_IDS = [f"A{i}" for i in range(1, 17)]
+MB_DIFFICULTIES = ("normal", "hard", "extreme")
+
+
+class BotSettings:
+    """机器人行为参数"""
+    __slots__ = ("think_ms", "skill", "quiz_rounds", "request_timeout")
+
+    def __init__(self, think_ms: float = 300, skill: float = 0.7, quiz_rounds: int = 5, request_timeout: float = 15.0):
+        self.think_ms = think_ms  # 两次操作之间的平均思考时间（毫秒），实际在 0.5~1.5 倍之间随机
+        self.skill = skill  # 知道正确答案时按正确答案操作的概率
+        self.quiz_rounds = quiz_rounds
+        self.request_timeout = request_timeout  # 等待广播或状态变化的超时（秒），超时视为卡住
+
+
+class _Pending:
+    """已发送、等待对应广播的事件"""
+    __slots__ = ("msg_type", "match", "label", "sent_at", "future")
+
+    def __init__(self, msg_type: str, match: Optional[Matcher], label: str):
+        self.msg_type = msg_type
+        self.match = match
+        self.label = label
+        self.sent_at = time.perf_counter()
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class Bot:
+    """机器人基类：连接、收发消息、状态跟踪和延迟统计"""
+    def __init__(self, transport, stats: LoadStats, settings: BotSettings, player_id: str, rng: random.Random):
+        self.transport = transport
+        self.stats = stats
+        self.settings = settings
+        self.player_id = player_id
+        self.name = player_id
+        self.rng = rng
+        self.conn = None
+        self.room_state: Optional[Message] = None
+        self.game: Message = {}  # 合并补丁后的游戏状态
+        self.version = 0
+        self.closed = False
+        self._pending: List[_Pending] = []
+        self._snapshot_requested = False
+        self._seq = 0  # 收到的消息序号，用于等待状态变化
+        self._changed = asyncio.Condition()
+        self._reader: Optional[asyncio.Task] = None
+
+    async def join(self, room_id: str, game_type: str) -> bool:
+        """连接房间并发送玩家信息，收到房间状态后返回True"""
+        try:
+            self.conn = await self.transport.connect(f"/ws/{room_id}/{game_type}")
+        except Exception as e:
+            self.stats.record_error(f"connect:{type(e).__name__}")
+            self.closed = True
+            return False
+        self._reader = asyncio.create_task(self._read_loop())
+        reply = await self.request(
+            {"id": self.player_id, "name": self.name, "avatar": ""}, "room_state",
+            match=lambda m: self.player_id in m.get("players", {}), label="join"
+        )
+        if reply is None:
+            self.stats.record_error("join_failed")
+        return reply is not None
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            try:
+                await self.conn.close()
+            except Exception:
+                pass
+        self.closed = True
+        if self._reader is not None:
+            try:
+                await asyncio.wait_for(self._reader, 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._reader.cancel()
+
+    # ---- 收发 ----
+
+    async def send(self, event: Message) -> None:
+        await self.conn.send(json.dumps(event))
+        self.stats.sent += 1
+
+    async def request(self, event: Message, expect: str, match: Optional[Matcher] = None, label: Optional[str] = None) -> Optional[Message]:
+        """发送事件并等待期望的广播，返回该广播；收到错误、超时或连接关闭时返回None"""
+        pending = _Pending(expect, match, label or event.get("type", expect))
+        self._pending.append(pending)
+        try:
+            await self.send(event)
+            return await asyncio.wait_for(pending.future, self.settings.request_timeout)
+        except asyncio.TimeoutError:
+            self.stats.record_error(f"timeout:{pending.label}")
+            return None
+        except ConnectionClosed:
+            return None
+        finally:
+            if pending in self._pending:
+                self._pending.remove(pending)
+
+    async def wait_until(self, predicate: Callable[[], bool], timeout: Optional[float] = None) -> bool:
+        """等待条件成立（每收到一条消息检查一次），超时或连接关闭时返回当前结果"""
+        try:
+            async with self._changed:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self.closed or predicate()),
+                    timeout or self.settings.request_timeout
+                )
+        except asyncio.TimeoutError:
+            pass
+        return predicate()
+
+    async def wait_for_message(self, timeout: Optional[float] = None) -> bool:
+        """等待下一条消息"""
+        seq = self._seq
+        return await self.wait_until(lambda: self._seq > seq, timeout)
+
+    async def think(self) -> None:
+        await asyncio.sleep(self.settings.think_ms * self.rng.uniform(0.5, 1.5) / 1000)
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                message = json.loads(await self.conn.recv())
+                self.stats.received += 1
+                self._dispatch(message)
+                async with self._changed:
+                    self._seq += 1
+                    self._changed.notify_all()
+        except ConnectionClosed:
+            pass
+        finally:
+            self.closed = True
+            for pending in self._pending:
+                if not pending.future.done():
+                    pending.future.set_result(None)
+            async with self._changed:
+                self._changed.notify_all()
+
+    def _dispatch(self, message: Message) -> None:
+        msg_type = message.get("type")
+        if msg_type == "room_state":
+            self.room_state = message
+        elif msg_type == "game_state":
+            self.game = {k: v for k, v in message.items() if k not in ("type", "version")}
+            self.version = message.get("version", 0)
+            self._snapshot_requested = False
+        elif msg_type == "game_state_patch":
+            self._apply_patch(message)
+        elif msg_type == "error":
+            self._on_error(message)
+        self.on_message(message)
+
+        for pending in self._pending:
+            if pending.msg_type == msg_type and not pending.future.done() and (pending.match is None or pending.match(message)):
+                self.stats.record_latency(pending.label, (time.perf_counter() - pending.sent_at) * 1000)
+                pending.future.set_result(message)
+                break
+
+    def _apply_patch(self, message: Message) -> None:
+        if message.get("base_version") == self.version:
+            self.game = apply_patch(self.game, message["patch"])
+            self.version = message["version"]
+        elif message.get("version", 0) > self.version and not self._snapshot_requested:
+            # 出站队列合并或丢弃了补丁，按协议请求完整快照
+            self.stats.record_error("state_gap")
+            self._snapshot_requested = True
+            asyncio.create_task(self._request_snapshot())
+
+    async def _request_snapshot(self) -> None:
+        try:
+            await self.send({"type": "request_snapshot"})
+        except ConnectionClosed:
+            pass
+
+    def _on_error(self, message: Message) -> None:
+        """服务器拒绝了事件：记录错误并让最早的等待中事件失败"""
+        self.stats.record_error(f"server:{message.get('message') or message.get('msg')}")
+        for pending in self._pending:
+            if not pending.future.done():
+                pending.future.set_result(None)
+                break
+
+    def on_message(self, message: Message) -> None:
+        """子类处理游戏消息"""
+
+
+class RoundGameBot(Bot):
+    """回合制游戏（o2SPH、o3MB）机器人：准备、开始游戏，轮到自己时操作"""
+    game_type = ""
+
+    def finished(self) -> bool:
+        return self.game.get("state") == "finished"
+
+    def my_turn(self) -> bool:
+        return self.game.get("state") == "player_turn" and self.game.get("current_player") == self.player_id
+
+    async def prepare(self, is_owner: bool, player_count: int, room_settings: Dict[str, Any]) -> bool:
+        """房主：修改设置、等待全员准备后开始游戏；其他玩家：切换为准备状态"""
+        if not is_owner:
+            reply = await self.request(
+                {"type": "toggle_ready"}, "room_state",
+                match=lambda m: m["players"].get(self.player_id, {}).get("ready", False), label="toggle_ready"
+            )
+            return reply is not None
+
+        if room_settings:
+            if await self.request({"type": "update_settings", "settings": room_settings}, "settings_updated") is None:
+                return False
+        all_ready = await self.wait_until(lambda: self.room_state is not None
+                                          and len(self.room_state["players"]) >= player_count
+                                          and all(p["ready"] for p in self.room_state["players"].values()))
+        if not all_ready:
+            self.stats.record_error("ready_timeout")
+            return False
+        return await self.request({"type": "start_game"}, "game_state", label="start_game") is not None
+
+    async def play(self) -> bool:
+        """玩到本局结束，返回是否正常结束"""
+        if not await self.wait_until(lambda: bool(self.game)):
+            self.stats.record_error("start_timeout")
+            return False
+        await self.before_play()
+        while not self.closed and not self.finished():
+            if not self.my_turn():
+                if not await self.wait_for_message():
+                    if self.closed or self.finished():
+                        break
+                    self.stats.record_error("stalled")
+                    return False
+                continue
+            await self.think()
+            if self.my_turn():
+                await self.take_turn()
+        return self.finished()
+
+    async def before_play(self) -> None:
+        pass
+
+    async def take_turn(self) -> None:
+        raise NotImplementedError
+
+
+class SPHBot(RoundGameBot):
+    """SamePatternHunt：按目标序列翻牌，记住翻开过的卡牌图案"""
+    game_type = "o2SPH"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.known: Dict[str, str] = {}  # patternId -> cardId
+
+    def on_message(self, message: Message) -> None:
+        if message.get("type") == "card_flipped":
+            result = message["result"]
+            self.known[result["patternId"]] = result["cardId"]
+
+    async def take_turn(self) -> None:
+        target = self.game.get("gameInfo", {}).get(self.player_id, {}).get("next_pattern")
+        card_id = self.known.get(target) if self.rng.random() < self.settings.skill else None
+        if card_id is None:
+            unknown = [c for c in SPH_CARD_IDS if c not in self.known.values()]
+            card_id = self.rng.choice(unknown or SPH_CARD_IDS)
+        version = self.version
+        reply = await self.request(
+            {"type": "action", "action": {"type": "flip", "cardId": card_id}}, "card_flipped",
+            match=lambda m: m["result"]["cardId"] == card_id, label="flip"
+        )
+        if reply is not None:
+            await self.wait_until(lambda: self.version > version or self.finished())
+
+
+class MBBot(RoundGameBot):
+    """MemorialBanquet：预览结束后每回合翻两张牌，匹配成功后升级其中一张"""
+    game_type = "o3MB"
+    UPGRADE_FLIP_BACK = 2.0  # 升级后服务器等待2秒才翻回卡牌
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upgrade_pending = False
+        self.flip_back_at = 0.0  # 场上卡牌全部翻回的时间（事件循环时钟）
+
+    def on_message(self, message: Message) -> None:
+        # 像真实客户端一样等翻牌动画和升级展示结束再翻下一张，避免被服务器拒绝
+        msg_type = message.get("type")
+        now = asyncio.get_running_loop().time()
+        if msg_type == "card_flipped":
+            self.flip_back_at = max(self.flip_back_at, now + message["result"].get("flipBack", 1000) / 1000)
+        elif msg_type == "flip_result":
+            self.upgrade_pending = message["result"].get("pendingUpgrade", False)
+        elif msg_type == "card_upgraded":
+            self.upgrade_pending = False
+            self.flip_back_at = max(self.flip_back_at, now + self.UPGRADE_FLIP_BACK)
+
+    async def _wait_flip_back(self) -> None:
+        await self.wait_until(lambda: not self.upgrade_pending)
+        delay = self.flip_back_at - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def before_play(self) -> None:
+        # 开局有预览期，预览期内翻牌会被拒绝
+        if self.game.get("isPreview"):
+            await asyncio.sleep(self.game.get("previewRemaining", 0))
+
+    def _pick_pair(self) -> List[str]:
+        cards = self.game.get("cards", {})
+        if self.rng.random() < self.settings.skill:
+            by_number: Dict[Any, List[str]] = {}
+            for card_id, card in cards.items():
+                by_number.setdefault(card["number"], []).append(card_id)
+            pairs = [ids for ids in by_number.values() if len(ids) >= 2]
+            if pairs:
+                return self.rng.choice(pairs)[:2]
+        return self.rng.sample(list(cards), 2)
+
+    async def take_turn(self) -> None:
+        await self._wait_flip_back()
+        if not self.my_turn():
+            return
+        first, second = self._pick_pair()
+        version = self.version
+        reply = await self.request(
+            {"type": "action", "action": {"type": "flip", "cardId": first}}, "card_flipped",
+            match=lambda m: m["result"]["cardId"] == first, label="flip"
+        )
+        if reply is None:
+            # 上一次翻牌的动画未结束，稍后重试
+            await asyncio.sleep(0.2)
+            return
+        await self.think()
+        result = await self.request(
+            {"type": "action", "action": {"type": "flip", "cardId": second}}, "flip_result",
+            match=lambda m: m["result"]["card2Id"] == second, label="flip_pair"
+        )
+        if result is None:
+            return
+        if result["result"]["matched"]:
+            await self.think()
+            await self.request(
+                {"type": "action", "action": {"type": "upgrade_card", "cardId": first}}, "card_upgraded",
+                match=lambda m: m["result"]["cardId"] == first, label="upgrade_card"
+            )
+        await self.wait_until(lambda: self.version > version or self.finished())
+
+
+class QuizQuestionerBot(Bot):
+    """答题游戏的提问者：出题、收集答案、判题，最后结算"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.answers: Dict[str, str] = {}  # 玩家ID -> 本题答案
+
+    def on_message(self, message: Message) -> None:
+        if message.get("type") == "answer":
+            self.answers[message["playerId"]] = message["text"]
+
+    async def run(self, room_id: str, player_count: int) -> bool:
+        if not await self.wait_until(lambda: self.room_state is not None and len(self.room_state["players"]) >= player_count):
+            self.stats.record_error("join_timeout")
+            return False
+        if await self.request({"type": "mode_change", "mode": "scoring"}, "mode_change") is None:
+            return False
+        await self.request({"type": "initialize_scores", "score": 0}, "player_list", label="initialize_scores")
+        answerers = player_count - 1
+        rounds = self.settings.quiz_rounds
+        for current in range(1, rounds + 1):
+            await self.request({"type": "round_update", "currentRound": current, "totalRounds": rounds}, "round")
+            question_id = f"{room_id}-{current}"
+            self.answers = {}
+            reply = await self.request(
+                {"type": "question", "questionId": question_id, "content": {"text": f"第{current}题", "answer": "A"}},
+                "question", match=lambda m: m["questionId"] == question_id
+            )
+            if reply is None:
+                return False
+            if not await self.wait_until(lambda: len(self.answers) >= answerers):
+                self.stats.record_error("answer_timeout")
+            await self.think()
+            results = {
+                pid: {"correct": text == "A", "score": 1 if text == "A" else 0}
+                for pid, text in self.answers.items()
+            }
+            if await self.request({"type": "judgement", "results": results, "correct_answer": "A",
+                                   "explanation": "", "currentRound": current}, "judgement_complete") is None:
+                return False
+        return await self.request({"type": "congratulations"}, "congratulations_complete") is not None
+
+
+class QuizPlayerBot(Bot):
+    """答题游戏的答题者：每出一题思考后作答"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.question_id: Optional[str] = None
+        self.done = False
+
+    def on_message(self, message: Message) -> None:
+        if message.get("type") == "question":
+            self.question_id = message["questionId"]
+        elif message.get("type") == "congratulations_complete":
+            self.done = True
+
+    async def run(self) -> bool:
+        answered = None
+        while not self.closed:
+            # 提问者判题、思考都需要时间，按两倍超时等待下一题
+            await self.wait_until(lambda: self.done or self.question_id != answered, self.settings.request_timeout * 2)
+            if self.done:
+                return True
+            if self.question_id == answered:
+                self.stats.record_error("stalled")
+                return False
+            question_id = self.question_id
+            await self.think()
+            text = "A" if self.rng.random() < self.settings.skill else "B"
+            await self.request(
+                {"type": "answer", "text": text, "timestamp": time.time() * 1000}, "answer",
+                match=lambda m: m["playerId"] == self.player_id
+            )
+            answered = question_id
+        return self.done
@@ -0,0 +1,141 @@
+"""负载测试编排：按房间创建机器人，循环开局直到达到局数或测试时长"""
+import asyncio
+import random
+from typing import Any, Dict, List, Optional, Sequence
+
+from .bots import (
+    MB_DIFFICULTIES, BotSettings, MBBot, QuizPlayerBot, QuizQuestionerBot, RoundGameBot, SPHBot
+)
+from .stats import LoadStats, ServerSampler
+
+GAME_TYPES = ("o2SPH", "o3MB", "quiz")
+ROUND_GAME_BOTS = {"o2SPH": SPHBot, "o3MB": MBBot}
+
+
+class LoadTest:
+    """rooms 为每种游戏的并发房间数，players 为每个房间的连接数（答题游戏含一名提问者）"""
+    def __init__(self, transport, game_types: Sequence[str] = GAME_TYPES, rooms: int = 10, players: int = 2,
+                 games: int = 0, duration: float = 60, ramp_up: float = 0, settings: Optional[BotSettings] = None,
+                 mb_difficulty: str = "normal", sample_interval: float = 1.0, seed: Optional[int] = None):
+        unknown = set(game_types) - set(GAME_TYPES)
+        if unknown:
+            raise ValueError(f"不支持的游戏类型: {', '.join(sorted(unknown))}")
+        if players < 2:
+            raise ValueError("每个房间至少需要2名玩家")
+        self.transport = transport
+        self.game_types = list(game_types)
+        self.rooms = rooms
+        self.players = players
+        self.games = games  # 每个房间连续进行的局数，0表示直到测试时长结束
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.settings = settings or BotSettings()
+        self.mb_difficulty = mb_difficulty
+        self.sample_interval = sample_interval
+        self.rng = random.Random(seed)
+        self.stats = LoadStats()
+        self.server: Optional[Dict[str, Any]] = None
+        self.http = None
+
+    async def run(self) -> Dict[str, Any]:
+        async with self.transport.http_client() as http:
+            self.http = http
+            sampler = ServerSampler(http, self.sample_interval)
+            await sampler.start()
+            self.stats = LoadStats()
+            total = self.rooms * len(self.game_types)
+            tasks = [
+                asyncio.create_task(self._room_loop(game_type, index, self.ramp_up * slot / total))
+                for slot, (game_type, index) in enumerate(
+                    (game_type, index) for index in range(self.rooms) for game_type in self.game_types
+                )
+            ]
+            _, unfinished = await asyncio.wait(tasks, timeout=self.duration)
+            # 到达时长后停止计时，再取消未结束的房间并关闭连接
+            self.stats.stop()
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await sampler.stop()
+            self.server = sampler.report()
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        report = self.stats.report()
+        report["config"] = {
+            "game_types": self.game_types,
+            "rooms_per_game": self.rooms,
+            "players_per_room": self.players,
+            "connections": self.rooms * self.players * len(self.game_types),
+            "think_ms": self.settings.think_ms,
+            "skill": self.settings.skill
+        }
+        report["server"] = self.server
+        return report
+
+    async def _room_loop(self, game_type: str, index: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        played = 0
+        while not self.games or played < self.games:
+            try:
+                await self._play_room(game_type, index, played)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.record_error(f"bot:{type(e).__name__}")
+                print(f"❌ {game_type} 房间 {index} 第{played + 1}局异常: {e!r}")
+            played += 1
+
+    async def _play_room(self, game_type: str, index: int, game_no: int) -> None:
+        response = await self.http.get(f"/api/new-room-id-short/{game_type}")
+        room_id = response.json()["room_id"]
+        bots = self._make_bots(game_type, f"{game_type}-{index}-{game_no}")
+        try:
+            # 依次加入，第一个加入的机器人成为房主
+            for bot in bots:
+                if not await bot.join(room_id, game_type):
+                    return
+            if game_type == "quiz":
+                results = await asyncio.gather(
+                    bots[0].run(room_id, len(bots)), *(bot.run() for bot in bots[1:])
+                )
+                finished = results[0]
+            else:
+                finished = await self._play_round_game(game_type, bots, game_no)
+            if finished:
+                self.stats.record_game(game_type)
+        finally:
+            await asyncio.gather(*(bot.close() for bot in bots), return_exceptions=True)
+
+    async def _play_round_game(self, game_type: str, bots: List[RoundGameBot], game_no: int) -> bool:
+        room_settings: Dict[str, Any] = {}
+        if len(bots) > 2:
+            room_settings["max_players"] = len(bots)
+        if game_type == "o3MB":
+            difficulty = self.mb_difficulty
+            if difficulty == "mixed":
+                difficulty = MB_DIFFICULTIES[game_no % len(MB_DIFFICULTIES)]
+            room_settings["difficulty"] = difficulty
+
+        owner, others = bots[0], bots[1:]
+        ready = await asyncio.gather(*(bot.prepare(False, len(bots), {}) for bot in others))
+        if not all(ready) or not await owner.prepare(True, len(bots), room_settings):
+            return False
+        results = await asyncio.gather(*(bot.play() for bot in bots))
+        return any(results)
+
+    def _make_bots(self, game_type: str, prefix: str) -> list:
+        def bot_rng():
+            return random.Random(self.rng.random())
+
+        if game_type == "quiz":
+            # 答题游戏的访客ID需要 questioner-/user- 前缀区分身份
+            return [QuizQuestionerBot(self.transport, self.stats, self.settings, f"questioner-{prefix}", bot_rng())] + [
+                QuizPlayerBot(self.transport, self.stats, self.settings, f"user-{prefix}-{k}", bot_rng())
+                for k in range(1, self.players)
+            ]
+        bot_class = ROUND_GAME_BOTS[game_type]
+        return [
+            bot_class(self.transport, self.stats, self.settings, f"bot-{prefix}-{k}", bot_rng())
+            for k in range(self.players)
+        ]
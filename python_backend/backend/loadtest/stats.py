@@ -0,0 +1,118 @@
+"""负载测试指标：消息吞吐、事件到广播的延迟分位数、服务器CPU和内存"""
+import asyncio
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """最近秩法分位数，sorted_values 需已升序排列"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    ordered = sorted(values)
+    summary = {"count": len(ordered)}
+    for p in PERCENTILES:
+        value = percentile(ordered, p)
+        summary[f"p{p}"] = round(value, 2) if value is not None else None
+    summary["max"] = round(ordered[-1], 2) if ordered else None
+    return summary
+
+
+class LoadStats:
+    """全部机器人共享的计数器和延迟样本"""
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.sent = 0
+        self.received = 0
+        self.latencies: Dict[str, List[float]] = {}  # 事件类型 -> 毫秒
+        self.games: Dict[str, int] = {}  # 游戏类型 -> 完成局数
+        self.errors: Dict[str, int] = {}  # 错误类别 -> 次数
+
+    def record_latency(self, event: str, ms: float) -> None:
+        self.latencies.setdefault(event, []).append(ms)
+
+    def record_game(self, game_type: str) -> None:
+        self.games[game_type] = self.games.get(game_type, 0) + 1
+
+    def record_error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def stop(self) -> None:
+        self.finished = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = max(self.elapsed, 1e-9)
+        all_latencies = [ms for values in self.latencies.values() for ms in values]
+        return {
+            "duration_seconds": round(elapsed, 2),
+            "messages_sent": self.sent,
+            "messages_received": self.received,
+            "sent_per_second": round(self.sent / elapsed, 1),
+            "received_per_second": round(self.received / elapsed, 1),
+            "latency_ms": summarize(all_latencies),
+            "latency_ms_by_event": {event: summarize(values) for event, values in sorted(self.latencies.items())},
+            "games_completed": dict(self.games),
+            "errors": dict(self.errors)
+        }
+
+
+class ServerSampler:
+    """定期读取服务器的 /api/metrics/process，计算测试期间的CPU使用率和内存峰值"""
+    def __init__(self, http_client, interval: float = 1.0):
+        self.http_client = http_client
+        self.interval = interval
+        self.samples: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def sample(self) -> None:
+        try:
+            response = await self.http_client.get("/api/metrics/process")
+            if response.status_code == 200:
+                self.samples.append(response.json())
+        except Exception as e:
+            print(f"⚠️ 读取服务器进程指标失败: {e!r}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.sample()
+
+    async def start(self) -> None:
+        await self.sample()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.sample()
+
+    def report(self) -> Optional[Dict[str, Any]]:
+        if len(self.samples) < 2:
+            return None
+        first, last = self.samples[0], self.samples[-1]
+        wall = max(last["wall_time"] - first["wall_time"], 1e-9)
+        rss = [s["rss_bytes"] for s in self.samples if s.get("rss_bytes") is not None]
+        return {
+            "pid": last["pid"],
+            "cpu_percent": round((last["cpu_seconds"] - first["cpu_seconds"]) / wall * 100, 1),
+            "rss_mb_start": round(rss[0] / 2 ** 20, 1) if rss else None,
+            "rss_mb_peak": round(max(rss) / 2 ** 20, 1) if rss else None,
+            "rss_mb_end": round(rss[-1] / 2 ** 20, 1) if rss else None,
+            "samples": len(self.samples)
+        }
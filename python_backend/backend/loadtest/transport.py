@@ -0,0 +1,142 @@
+"""机器人客户端的连接方式
+
+- WebSocketsTransport：通过网络连接真实服务器（需要安装 websockets，见 loadtest/requirements.txt）
+- ASGITransport：在当前进程内直接调用 ASGI 应用，不经过网络，用于冒烟测试和本地调试
+
+两者提供相同的接口：connect(path) 返回的连接有 send(text)、recv() 和 close()，
+连接被服务器关闭后 recv() 抛出 ConnectionClosed。
+"""
+import asyncio
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import websockets
+except ImportError:  # websockets 为负载测试的可选依赖
+    websockets = None
+
+
+class ConnectionClosed(Exception):
+    """连接已被关闭"""
+
+
+class WebSocketsTransport:
+    """连接真实服务器"""
+    def __init__(self, base_url: str):
+        if websockets is None:
+            raise RuntimeError("连接真实服务器需要安装 websockets：pip install -r loadtest/requirements.txt")
+        self.base_url = base_url.rstrip("/")
+        parts = urlsplit(self.base_url)
+        self.ws_url = f"{'wss' if parts.scheme == 'https' else 'ws'}://{parts.netloc}"
+
+    def http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=self.base_url, timeout=30)
+
+    async def connect(self, path: str) -> "_WebSocketsConnection":
+        return _WebSocketsConnection(await websockets.connect(self.ws_url + path, max_size=None))
+
+
+class _WebSocketsConnection:
+    def __init__(self, ws):
+        self.ws = ws
+
+    async def send(self, text: str) -> None:
+        try:
+            await self.ws.send(text)
+        except websockets.ConnectionClosed as e:
+            raise ConnectionClosed(str(e)) from e
+
+    async def recv(self) -> str:
+        try:
+            message = await self.ws.recv()
+        except websockets.ConnectionClosed as e:
+            raise ConnectionClosed(str(e)) from e
+        return message if isinstance(message, str) else message.decode("utf-8")
+
+    async def close(self) -> None:
+        await self.ws.close()
+
+
+class ASGITransport:
+    """在当前进程内调用 ASGI 应用（服务端逻辑和机器人共用一个事件循环）"""
+    def __init__(self, app, base_url: str = "http://loadtest"):
+        self.app = app
+        self.base_url = base_url
+
+    def http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url=self.base_url)
+
+    async def connect(self, path: str) -> "_ASGIConnection":
+        connection = _ASGIConnection(self.app, path)
+        await connection.open()
+        return connection
+
+
+class _ASGIConnection:
+    """一条进程内的 WebSocket 连接：客户端和服务端之间各有一个消息队列"""
+    def __init__(self, app, path: str):
+        self.app = app
+        path, _, query = path.partition("?")
+        self.scope: Dict[str, Any] = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"loadtest")],
+            "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80),
+            "subprotocols": [],
+            "state": {},
+        }
+        self._to_server: asyncio.Queue = asyncio.Queue()
+        self._to_client: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    async def open(self) -> None:
+        self._to_server.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self._serve())
+        message = await self._to_client.get()
+        if message["type"] != "websocket.accept":
+            self.closed = True
+            raise ConnectionClosed(f"握手被拒绝: {message}")
+
+    async def _serve(self) -> None:
+        try:
+            await self.app(self.scope, self._to_server.get, self._to_client.put)
+        except Exception as e:
+            print(f"❌ 进程内WebSocket应用异常: {e!r}")
+        finally:
+            # 应用退出后唤醒正在等待消息的客户端
+            self._to_client.put_nowait({"type": "websocket.close", "code": 1006})
+
+    async def send(self, text: str) -> None:
+        if self.closed:
+            raise ConnectionClosed("连接已关闭")
+        self._to_server.put_nowait({"type": "websocket.receive", "text": text})
+
+    async def recv(self) -> str:
+        while True:
+            if self.closed:
+                raise ConnectionClosed("连接已关闭")
+            message = await self._to_client.get()
+            if message["type"] == "websocket.send":
+                return message.get("text") or message.get("bytes", b"").decode("utf-8")
+            if message["type"] == "websocket.close":
+                self.closed = True
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        if not self._task.done():
+            self._to_server.put_nowait({"type": "websocket.disconnect", "code": 1000})
+            try:
+                await asyncio.wait_for(self._task, 5)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+        self.closed = True
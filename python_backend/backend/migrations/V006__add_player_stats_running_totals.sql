@@ -0,0 +1,19 @@
+-- 版本：V006
+-- 描述：player_stats 增加准确率累计列，支持每局结束后增量更新统计
+-- 创建日期：2026-10-18
+
+-- 平均准确率 = total_accuracy / total_games，每局结束只做一次累加，不再扫描全部历史
+ALTER TABLE player_stats
+ADD COLUMN total_accuracy DECIMAL(14, 2) NOT NULL DEFAULT 0.00 AFTER best_score;
+
+-- 用现有历史数据回填累计值
+UPDATE player_stats ps
+JOIN (
+    SELECT user_id, game_type, SUM(accuracy) AS total_accuracy
+    FROM game_sessions
+    WHERE status = 'completed'
+    GROUP BY user_id, game_type
+) gs ON gs.user_id = ps.user_id AND gs.game_type = ps.game_type
+SET ps.total_accuracy = gs.total_accuracy;
+
+SELECT 'V006 player_stats.total_accuracy 已添加并回填' AS message;
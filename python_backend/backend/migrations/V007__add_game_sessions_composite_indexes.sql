@@ -0,0 +1,18 @@
+-- 版本：V007
+-- 描述：为game_sessions热点查询添加复合索引
+-- 创建日期：2026-10-18
+
+-- 按玩家+游戏类型计数、胜利次数统计（status = 'completed' AND score > 0）
+-- InnoDB二级索引包含主键，COUNT(id) 只读索引即可完成
+CREATE INDEX ix_game_sessions_user_type_status_score
+ON game_sessions (user_id, game_type, status, score);
+
+-- 玩家游戏记录列表：按游戏类型筛选，按开始时间倒序分页
+CREATE INDEX ix_game_sessions_user_type_start
+ON game_sessions (user_id, game_type, start_time);
+
+-- 玩家游戏记录列表：不筛选游戏类型，按开始时间倒序分页
+CREATE INDEX ix_game_sessions_user_start
+ON game_sessions (user_id, start_time);
+
+SELECT 'V007 game_sessions复合索引已添加' AS message;
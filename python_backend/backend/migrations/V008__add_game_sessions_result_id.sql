@@ -0,0 +1,12 @@
+-- 版本：V008
+-- 描述：game_sessions 添加 result_id，游戏结果暂存文件重放时按它跳过已写入的结果
+-- 创建日期：2026-10-18
+
+-- 已有的记录保持 NULL（唯一索引允许多个 NULL）
+ALTER TABLE game_sessions
+ADD COLUMN result_id VARCHAR(32) NULL AFTER status;
+
+CREATE UNIQUE INDEX ux_game_sessions_result_id
+ON game_sessions (result_id);
+
+SELECT 'V008 game_sessions.result_id已添加' AS message;
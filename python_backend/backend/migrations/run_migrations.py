@@ -3,15 +3,21 @@
 """
 数据库迁移工具
 用于按顺序执行migrations目录下的SQL迁移脚本
+
+用法：
+    python backend/migrations/run_migrations.py                               # MySQL，配置读取 .env
+    python backend/migrations/run_migrations.py --url sqlite:///quizarena.db  # 本地 SQLite 库
+    DATABASE_PROFILE=sqlite python backend/migrations/run_migrations.py        # 使用 app.database 的 SQLite 配置
 """
 
+import argparse
 import os
 import re
 import sys
-import mysql.connector
-from mysql.connector import Error
 import logging
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -89,60 +95,68 @@ def get_migration_files():
     migration_files.sort(key=lambda x: x[0])
     return [file for _, file in migration_files]
 
+def split_statements(sql_script):
+    """分割SQL语句（处理分号，但忽略注释和字符串中的分号）"""
+    statements = []
+    current_statement = ''
+    in_string = None
+    in_comment_line = False
+    in_comment_block = False
+    skip_next = False
+
+    for i, char in enumerate(sql_script):
+        if skip_next:
+            skip_next = False
+            continue
+
+        if in_comment_block:
+            if char == '*' and i < len(sql_script) - 1 and sql_script[i+1] == '/':
+                in_comment_block = False
+                skip_next = True
+            continue
+
+        if in_comment_line:
+            if char == '\n':
+                in_comment_line = False
+                current_statement += char
+            continue
+
+        if in_string:
+            current_statement += char
+            if char == in_string and (i == 0 or sql_script[i-1] != '\\'):
+                in_string = None
+            continue
+
+        if char == '\'':
+            current_statement += char
+            in_string = char
+        elif char == '"':
+            current_statement += char
+            in_string = char
+        elif char == '-' and i < len(sql_script) - 1 and sql_script[i+1] == '-':
+            in_comment_line = True
+        elif char == '/' and i < len(sql_script) - 1 and sql_script[i+1] == '*':
+            in_comment_block = True
+            skip_next = True
+        elif char == ';':
+            current_statement += char
+            statements.append(current_statement.strip())
+            current_statement = ''
+        else:
+            current_statement += char
+
+    if current_statement.strip():
+        statements.append(current_statement.strip())
+    return statements
+
 def execute_migration_script(cursor, script_path):
     """执行单个SQL迁移脚本"""
     try:
         with open(script_path, 'r', encoding='utf-8') as f:
             sql_script = f.read()
-        
-        # 分割SQL语句（处理分号，但忽略注释和字符串中的分号）
-        statements = []
-        current_statement = ''
-        in_string = None
-        in_comment_line = False
-        in_comment_block = False
-        
-        for i, char in enumerate(sql_script):
-            if in_comment_block:
-                if char == '*' and i < len(sql_script) - 1 and sql_script[i+1] == '/':
-                    in_comment_block = False
-                continue
-            
-            if in_comment_line:
-                if char == '\n':
-                    in_comment_line = False
-                continue
-            
-            if in_string:
-                current_statement += char
-                if char == in_string and (i == 0 or sql_script[i-1] != '\\'):
-                    in_string = None
-                continue
-            
-            if char == '\'':
-                current_statement += char
-                in_string = char
-            elif char == '"':
-                current_statement += char
-                in_string = char
-            elif char == '-' and i < len(sql_script) - 1 and sql_script[i+1] == '-':
-                in_comment_line = True
-                current_statement += char
-            elif char == '/' and i < len(sql_script) - 1 and sql_script[i+1] == '*':
-                in_comment_block = True
-                current_statement += char
-            elif char == ';':
-                current_statement += char
-                statements.append(current_statement.strip())
-                current_statement = ''
-            else:
-                current_statement += char
-        
-        if current_statement.strip():
-            statements.append(current_statement.strip())
-        
+
         # 执行每个语句
-        for stmt in statements:
+        for stmt in split_statements(sql_script):
             cursor.execute(stmt)
         
         logger.info(f"成功执行迁移脚本: {os.path.basename(script_path)}")
@@ -189,8 +203,97 @@ def record_migration(cursor, version, filename):
     except Exception as e:
         logger.error(f"记录迁移失败: {e}")
 
-def main():
+def sqlite_statement(stmt):
+    """把迁移语句转换为SQLite语句，不需要在SQLite上执行时返回None
+
+    SQLite库的表结构由模型 create_all 创建（与 SCHEMA_BOOTSTRAP 相同），迁移脚本中只执行数据语句：
+    - INSERT：去掉 MySQL 的 ON DUPLICATE KEY UPDATE 子句
+    - DELETE、单表 UPDATE：原样执行
+    - 多表 UPDATE ... JOIN（回填已有数据）以及 DDL、DELIMITER、SELECT 等：跳过
+    """
+    if not stmt.strip():
+        return None
+    keyword = stmt.split(None, 1)[0].upper()
+    if keyword == 'INSERT':
+        return re.split(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', stmt, flags=re.IGNORECASE)[0].strip().rstrip(';')
+    if keyword == 'DELETE':
+        return stmt
+    if keyword == 'UPDATE' and not re.search(r'\bJOIN\b', stmt, re.IGNORECASE):
+        return stmt
+    return None
+
+def run_sqlite_migrations(engine):
+    """在SQLite库上建表并按版本号顺序应用未执行的迁移，返回本次应用的版本号列表"""
+    from sqlalchemy import text
+    from app.models import Base
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS migration_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                version VARCHAR(20) NOT NULL UNIQUE,
+                filename VARCHAR(255) NOT NULL,
+                applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        applied_migrations = {row[0] for row in conn.execute(text("SELECT version FROM migration_history"))}
+
+    migrations_dir = os.path.dirname(os.path.abspath(__file__))
+    applied = []
+    for filename in get_migration_files():
+        version = re.match(r'^V(\d+)__', filename).group(1)
+        if version in applied_migrations:
+            continue
+        with open(os.path.join(migrations_dir, filename), 'r', encoding='utf-8') as f:
+            statements = [sqlite_statement(stmt) for stmt in split_statements(f.read())]
+        # 每个迁移一个事务，失败时整体回滚
+        with engine.begin() as conn:
+            for stmt in statements:
+                if stmt:
+                    conn.exec_driver_sql(stmt)
+            conn.execute(
+                text("INSERT INTO migration_history (version, filename) VALUES (:version, :filename)"),
+                {"version": version, "filename": filename}
+            )
+        logger.info(f"成功应用迁移: {filename}")
+        applied.append(version)
+    return applied
+
+def main_sqlite(url):
+    """SQLite库迁移"""
+    from sqlalchemy import create_engine
+
+    engine = create_engine(url)
+    try:
+        applied = run_sqlite_migrations(engine)
+    finally:
+        engine.dispose()
+    if applied:
+        logger.info(f"成功应用 {len(applied)} 个迁移脚本")
+    else:
+        logger.info("没有需要应用的迁移脚本")
+
+def main(argv=None):
     """主函数"""
+    parser = argparse.ArgumentParser(description="按顺序执行数据库迁移脚本")
+    parser.add_argument("--url", default=None, help="SQLite库的SQLAlchemy连接URL，如 sqlite:///quizarena.db（不指定时使用MySQL）")
+    args = parser.parse_args(argv)
+
+    url = args.url
+    if url is None:
+        from app.database import DATABASE_PROFILE, SQLALCHEMY_DATABASE_URL
+        if DATABASE_PROFILE == 'sqlite':
+            url = SQLALCHEMY_DATABASE_URL
+    if url is not None:
+        if not url.startswith('sqlite'):
+            parser.error("--url 只支持SQLite库，MySQL配置请写在 .env 中")
+        main_sqlite(url)
+        return
+
+    import mysql.connector
+    from mysql.connector import Error
+
     # 加载环境配置
     load_env_config()
     
@@ -3,6 +3,8 @@ import { connectSPHSocket, sendSPHMessage, closeSPHSocket } from '../ws/samePatt
 import { useUserStore } from './userStore';
 import axios from 'axios';
 import { inject } from 'vue';
+import { applyMergePatch } from '../utils/mergePatch';
+import { connectLobbySocket, closeLobbySocket, applyLobbyMessage } from '../ws/lobbySocket';
 
 // 从userStore获取用户信息
 function getUserData() {
@@ -81,6 +83,10 @@ export const useMemorialBanquetStore = defineStore('memorialBanquet', {
         isPreview: false,
         previewRemaining: 0
       },
+      // 版本化状态同步：最近一次完整的 game_state 及其版本号
+      stateVersion: null,
+      rawGameState: null,
+      snapshotRequested: false,
       cards: initializeCards(),
       flippedCards: [],
       matchedCards: [],
@@ -116,6 +122,16 @@ export const useMemorialBanquetStore = defineStore('memorialBanquet', {
   },
 
   actions: {
+    // 订阅大厅：先收到完整快照，之后只接收房间增量事件，不再轮询房间列表
+    subscribeLobby() {
+      if (this.mockEnabled) return;
+      connectLobbySocket('o3MB', (data) => {
+        this.rooms = applyLobbyMessage(this.rooms, data);
+      });
+    },
+    unsubscribeLobby() {
+      closeLobbySocket();
+    },
     // 同步用户数据从userStore
     syncUserData() {
       try {
@@ -330,12 +346,9 @@ export const useMemorialBanquetStore = defineStore('memorialBanquet', {
           }
         }
         else if (message.type === 'get_room_list') {
-          try {
-            const response = await axios.get(`${import.meta.env.VITE_URL}/api/room-list/o3MB`);
-            this.rooms = response.data.rooms;
-          } catch (error) {
-            console.error('获取房间列表失败:', error);
-          }
+          // 重新订阅大厅，服务器会推送完整的 lobby_snapshot，不再一次性拉取全部房间
+          this.unsubscribeLobby();
+          this.subscribeLobby();
         } else {
           console.log("尝试发送消息：", message)
           sendSPHMessage(message);
@@ -381,6 +394,14 @@ export const useMemorialBanquetStore = defineStore('memorialBanquet', {
           }
           break;
         case 'game_state':
+          this.stateVersion = data.version ?? null;
+          this.rawGameState = data;
+          // 开局和重连的完整快照同步全部卡牌；对局中的卡牌变化由 card_upgraded 处理，
+          // 因版本落后而补发的快照不覆盖已翻回的卡牌
+          if (data.cards && data.syncCards !== false && (!this.snapshotRequested || data.state === 'finished')) {
+            this.handleCardsSync(data.cards);
+          }
+          this.snapshotRequested = false;
           this.gameState = {
             state: data.state,
             current_player: data.current_player,
@@ -390,6 +411,24 @@ export const useMemorialBanquetStore = defineStore('memorialBanquet', {
             previewRemaining: data.previewRemaining || 0
           };
           break;
+        case 'game_state_patch':
+          // 版本不连续（丢包或重连）时请求完整快照
+          if (this.rawGameState === null || data.base_version !== this.stateVersion) {
+            this.snapshotRequested = true;
+            sendSPHMessage({ type: 'request_snapshot' });
+            break;
+          }
+          {
+            const merged = applyMergePatch(this.rawGameState, data.patch);
+            this.handleMessage({
+              ...merged,
+              type: 'game_state',
+              version: data.version,
+              // 进入终局时同步全部卡牌
+              syncCards: merged.state === 'finished' && this.rawGameState.state !== 'finished'
+            });
+          }
+          break;
         case 'card_flipped':
           this.handleCardFlipped(data.result);
           break;
@@ -423,7 +462,10 @@ export const useMemorialBanquetStore = defineStore('memorialBanquet', {
           break;
         case 'achievement_unlocked':
           console.log('🏆 收到成就解锁消息:', data);
-          this.handleAchievementUnlocked(data.achievement);
+          // 同一局解锁的多个成就合并在一条消息中
+          (data.achievements || [data.achievement]).forEach(achievement => {
+            this.handleAchievementUnlocked(achievement);
+          });
           break;
         default:
           console.warn('Unknown message type:', data.type);
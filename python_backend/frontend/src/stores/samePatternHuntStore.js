@@ -3,6 +3,8 @@ import { connectSPHSocket, sendSPHMessage, closeSPHSocket } from '../ws/samePatt
 import { useUserStore } from './userStore';
 import axios from 'axios';
 import { inject } from 'vue';
+import { applyMergePatch } from '../utils/mergePatch';
+import { connectLobbySocket, closeLobbySocket, applyLobbyMessage } from '../ws/lobbySocket';
 
 // 从userStore获取用户信息
 function getUserData() {
@@ -79,6 +81,9 @@ export const useSamePatternHuntStore = defineStore('samePatternHunt', {
         gameInfo: {},
         round: 999,
       },
+      // 版本化状态同步：最近一次完整的 game_state 及其版本号
+      stateVersion: null,
+      rawGameState: null,
       cards: initializeCards(),
       flippedCards: [],     // 当前已翻面的卡片 ID
       matchedCards: [],     // 已匹配成功的卡片 ID
@@ -116,6 +121,16 @@ export const useSamePatternHuntStore = defineStore('samePatternHunt', {
   },
 
   actions: {
+      // 订阅大厅：先收到完整快照，之后只接收房间增量事件，不再轮询房间列表
+      subscribeLobby() {
+        if (this.mockEnabled) return;
+        connectLobbySocket('o2SPH', (data) => {
+          this.rooms = applyLobbyMessage(this.rooms, data);
+        });
+      },
+      unsubscribeLobby() {
+        closeLobbySocket();
+      },
       // 同步用户数据从userStore
       syncUserData() {
         try {
@@ -334,12 +349,9 @@ export const useSamePatternHuntStore = defineStore('samePatternHunt', {
                     }
                 }
                 else if (message.type === 'get_room_list') {
-                  try {
-                    const response = await axios.get(`${import.meta.env.VITE_URL}/api/room-list/o2SPH`);
-                    this.rooms = response.data.rooms;
-                  }catch (error) {
-                        console.error('获取房间列表失败:', error);
-                  }
+                  // 重新订阅大厅，服务器会推送完整的 lobby_snapshot，不再一次性拉取全部房间
+                  this.unsubscribeLobby();
+                  this.subscribeLobby();
                 }else{
                   console.log("尝试发送消息：",message)
                   sendSPHMessage(message);
@@ -372,6 +384,8 @@ export const useSamePatternHuntStore = defineStore('samePatternHunt', {
           console.log(`📊 房间配置更新: min_players=${data.min_players}, max_players=${data.max_players}`);
           break;
         case 'game_state':
+          this.stateVersion = data.version ?? null;
+          this.rawGameState = data;
           this.gameState = {
             state: data.state, 
             current_player: data.current_player,
@@ -385,6 +399,18 @@ export const useSamePatternHuntStore = defineStore('samePatternHunt', {
           //   // 可播放音效或 UI 动画
           // }
 
+          break;
+        case 'game_state_patch':
+          // 版本不连续（丢包或重连）时请求完整快照
+          if (this.rawGameState === null || data.base_version !== this.stateVersion) {
+            sendSPHMessage({ type: 'request_snapshot' });
+            break;
+          }
+          this.handleMessage({
+            ...applyMergePatch(this.rawGameState, data.patch),
+            type: 'game_state',
+            version: data.version
+          });
           break;
         case 'card_flipped':
           this.handleCardFlipped(data.result);
@@ -410,7 +436,10 @@ export const useSamePatternHuntStore = defineStore('samePatternHunt', {
           break;
         case 'achievement_unlocked':
           console.log('🏆 收到成就解锁消息:', data);
-          this.handleAchievementUnlocked(data.achievement);
+          // 同一局解锁的多个成就合并在一条消息中
+          (data.achievements || [data.achievement]).forEach(achievement => {
+            this.handleAchievementUnlocked(achievement);
+          });
           break;
         default:
           console.warn('Unknown message type:', data.type);
@@ -0,0 +1,16 @@
+// 应用 JSON Merge Patch（RFC 7386），与后端 game_state_patch 的差量格式对应
+// 补丁中值为 null 的键表示删除，对象逐层合并，其他类型整体替换
+export function applyMergePatch(target, patch) {
+  const result = { ...(target || {}) };
+  for (const [key, value] of Object.entries(patch)) {
+    if (value === null) {
+      delete result[key];
+    } else if (typeof value === 'object' && !Array.isArray(value)
+      && typeof result[key] === 'object' && result[key] !== null && !Array.isArray(result[key])) {
+      result[key] = applyMergePatch(result[key], value);
+    } else {
+      result[key] = value;
+    }
+  }
+  return result;
+}
@@ -0,0 +1,58 @@
+// 大厅订阅连接：连接后收到一次 lobby_snapshot，之后只接收房间增量事件
+let socket = null;
+let currentGameType = null;
+let isManualClose = false;
+const RECONNECT_DELAY = 3000;
+
+export function connectLobbySocket(gameType, onMessage) {
+  if (socket && currentGameType === gameType && socket.readyState <= WebSocket.OPEN) {
+    return;
+  }
+  closeLobbySocket();
+  isManualClose = false;
+  currentGameType = gameType;
+
+  socket = new WebSocket(`${import.meta.env.VITE_WEBSOCKET_URL}/lobby/${gameType}`);
+  socket.onmessage = e => onMessage(JSON.parse(e.data));
+  socket.onclose = (event) => {
+    console.log('Lobby WebSocket closed', event.code);
+    socket = null;
+    // 非主动关闭时自动重连，重连后服务器会重新发送快照
+    if (!isManualClose) {
+      setTimeout(() => {
+        if (!isManualClose && !socket) {
+          connectLobbySocket(gameType, onMessage);
+        }
+      }, RECONNECT_DELAY);
+    }
+  };
+  socket.onerror = (error) => {
+    console.error('Lobby WebSocket error:', error);
+  };
+}
+
+export function closeLobbySocket() {
+  isManualClose = true;
+  if (socket) {
+    socket.onclose = null;
+    socket.close(1000, 'Normal closure');
+    socket = null;
+  }
+  currentGameType = null;
+}
+
+// 把大厅消息应用到房间列表上，返回新的列表
+export function applyLobbyMessage(rooms, data) {
+  switch (data.type) {
+    case 'lobby_snapshot':
+      return data.rooms;
+    case 'room_created':
+      return [...rooms.filter(r => r.id !== data.room.id), data.room];
+    case 'room_updated':
+      return rooms.map(r => (r.id === data.room.id ? data.room : r));
+    case 'room_destroyed':
+      return rooms.filter(r => r.id !== data.room_id);
+    default:
+      return rooms;
+  }
+}